@@ -3,10 +3,9 @@ from streamlit_option_menu import option_menu
 import auth
 from controllers.predictions_controllers import format_time_left, get_next_round_info, get_predicted_match_count
 from modules import profile, predictions, leaderboard, achievement, manage, cup
-from streamlit_autorefresh import st_autorefresh
 from datetime import datetime, timedelta
-from controllers.players_controller import get_player_id_by_username
 from send_email import send_reminder_email_to_all
+from status_engine import start_status_engine
 
 # Page Configuration
 st.set_page_config(
@@ -60,26 +59,16 @@ if "username" not in st.session_state:
 if "role" not in st.session_state:
     st.session_state.role = "player"
 
+# ⏱️ Match statuses (upcoming -> live -> finished) move in the background, not on render
+start_status_engine()
+
 # Main Dashboard (Tabs)
 def main_page():
-    # Refresh every 5000 milliseconds (1 second)
-    st_autorefresh(interval=5000, limit=None, key="refresh")
+    # No full-page autorefresh: countdowns and live scores are fragments that refresh themselves
     show_tabs = ["Profile", "Predictions", "Leaderboard", "Achievement", "Cup"]
     icons = ["person-circle", "lightning", "trophy", "award", "trophy"]
     round_name, deadline, match_time, match_count = get_next_round_info()
-    # Convert strings to datetime if needed
-    # if isinstance(deadline, str):
-    #     deadline = datetime.fromisoformat(deadline)
-    # if isinstance(match_time, str):
-    #     match_time = datetime.fromisoformat(match_time)
-    # now = datetime.now()
-    # if now.date() == (deadline - timedelta(days=2)).date():
-    #     send_reminder_email_to_all(round_name, deadline, match_time, match_count, "2days")
-    # elif now.date() == (deadline - timedelta(days=1)).date():
-    #     send_reminder_email_to_all(round_name, deadline, match_time, match_count, "1day")
-    # elif now.strftime("%Y-%m-%d %H:%M") == deadline.strftime("%Y-%m-%d %H:%M"):
-    #     send_reminder_email_to_all(round_name, deadline, match_time, match_count, "2hours")
-        
+    # Deadline reminders are sent by reminder_scheduler.py, which runs as its own process.
     if not round_name:
         st.warning("No upcoming rounds found.")
     else:
@@ -121,7 +110,11 @@ def main_page():
             }
         }
     )
-    player_id = get_player_id_by_username(st.session_state.username)
+    identity = auth.current_identity()
+    if identity is None:
+        # The account was deleted (or the session predates it): back to the login page
+        auth.logout()
+    player_id = identity["player_id"]
     if selected_tab == "Profile":
         profile.render(player_id)
         #profile.render(st.session_state.username)
@@ -0,0 +1,188 @@
+# asset_store.py
+"""
+Content-addressed store for team and league logos.
+
+An uploaded file is saved once under ASSET_STORE_DIR as
+<sha256[:2]>/<sha256>.<ext>; uploading identical bytes again returns the
+same key, so duplicates cost nothing. The key is an ordinary relative
+path, so st.image and os.path.exists keep working on it.
+
+Small renditions (LOGO_RENDITION_SIZES, aspect ratio kept) are written
+next to the original at upload time, or lazily the first time an older
+asset is asked for one. logo_image() serves them from an in-memory LRU
+bounded by ASSET_CACHE_BYTES, so a page of match cards does no disk I/O
+after the first render.
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageOps
+
+from thumbnails import encode_image, webp_supported
+
+ASSET_STORE_DIR = os.getenv("ASSET_STORE_DIR", "assets/store")
+ASSET_CACHE_BYTES = int(os.getenv("ASSET_CACHE_BYTES", str(32 * 1024 * 1024)))
+LOGO_RENDITION_SIZES = (40, 45, 150)
+
+_lock = threading.Lock()
+_cache = OrderedDict()  # (key, size) -> bytes (b"" when unreadable)
+_cache_bytes = 0
+_stats = {"hits": 0, "misses": 0, "stored": 0, "deduplicated": 0}
+
+
+def is_store_key(path):
+    return bool(path) and path.replace("\\", "/").startswith(ASSET_STORE_DIR.rstrip("/") + "/")
+
+
+def _key_for(digest, ext):
+    return f"{ASSET_STORE_DIR.rstrip('/')}/{digest[:2]}/{digest}{ext}"
+
+
+def rendition_path(key, size):
+    stem, _ = os.path.splitext(key)
+    return f"{stem}_{size}.webp" if webp_supported() else f"{stem}_{size}.png"
+
+
+def _make_rendition(source, size):
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(source))).convert("RGBA")
+    image.thumbnail((size, size), Image.LANCZOS)
+    data, _ = encode_image(image)
+    return data
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def put_bytes(data, filename="", sizes=LOGO_RENDITION_SIZES):
+    """Store `data` (deduplicated by content) and return its key."""
+    digest = hashlib.sha256(data).hexdigest()
+    ext = os.path.splitext(filename)[1].lower() or ".png"
+    key = _key_for(digest, ext)
+
+    if os.path.exists(key):
+        with _lock:
+            _stats["deduplicated"] += 1
+    else:
+        _write_atomic(key, data)
+        with _lock:
+            _stats["stored"] += 1
+
+    for size in sizes:
+        path = rendition_path(key, size)
+        if not os.path.exists(path):
+            try:
+                _write_atomic(path, _make_rendition(data, size))
+            except (OSError, Image.DecompressionBombError, ValueError) as e:
+                print(f"[asset_store] no {size}px rendition for {key}: {e}")
+                break
+    return key
+
+
+def put_file(path, sizes=LOGO_RENDITION_SIZES):
+    with open(path, "rb") as f:
+        return put_bytes(f.read(), os.path.basename(path), sizes)
+
+
+def store_upload(uploaded_file):
+    """Store a Streamlit UploadedFile; returns its key (None for no file)."""
+    if uploaded_file is None:
+        return None
+    return put_bytes(uploaded_file.getvalue(), uploaded_file.name)
+
+
+def _read(path, size):
+    # Store keys get a (lazily created) rendition; anything else is resized in memory.
+    if size and is_store_key(path):
+        rendition = rendition_path(path, size)
+        if not os.path.exists(rendition):
+            with open(path, "rb") as f:
+                _write_atomic(rendition, _make_rendition(f.read(), size))
+        with open(rendition, "rb") as f:
+            return f.read()
+    with open(path, "rb") as f:
+        data = f.read()
+    return _make_rendition(data, size) if size else data
+
+
+def logo_image(path, size=None):
+    """Encoded bytes of `path` at `size` px (original when None), or None if unreadable."""
+    global _cache_bytes
+    if not path:
+        return None
+    key = (path.replace("\\", "/"), size)
+    with _lock:
+        data = _cache.get(key)
+        if data is not None:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return data or None
+        _stats["misses"] += 1
+
+    try:
+        data = _read(key[0], size)
+    except (OSError, Image.DecompressionBombError, ValueError) as e:
+        print(f"[asset_store] cannot load {path}: {e}")
+        data = b""
+
+    with _lock:
+        if key not in _cache:
+            _cache[key] = data
+            _cache_bytes += len(data)
+        while _cache_bytes > ASSET_CACHE_BYTES and len(_cache) > 1:
+            _, evicted = _cache.popitem(last=False)
+            _cache_bytes -= len(evicted)
+    return data or None
+
+
+def asset_stats():
+    with _lock:
+        return {**_stats, "entries": len(_cache), "bytes": _cache_bytes, "max_bytes": ASSET_CACHE_BYTES}
+
+
+def _database_dir(conn):
+    # Stored logo paths are relative to the app's root, where the database lives
+    for _, name, path in conn.execute("PRAGMA database_list"):
+        if name == "main" and path:
+            return os.path.dirname(os.path.abspath(path))
+    return os.getcwd()
+
+
+def migrate_logo_paths(conn):
+    """
+    Copy every existing team/league logo into the store and point the row
+    at its key. The original files are left where they are. Paths are
+    resolved against the database's directory, not the working directory.
+
+    Rows whose file does not exist are listed and left alone (there is
+    nothing to copy); any other failure raises, so the migration is not
+    recorded while convertible rows remain. Returns (migrated, missing).
+    """
+    root = _database_dir(conn)
+    migrated, missing = 0, []
+    for table in ("teams", "leagues"):
+        paths = [row[0] for row in conn.execute(
+            f"SELECT DISTINCT logo_path FROM {table} WHERE logo_path IS NOT NULL AND logo_path != ''"
+        )]
+        for path in paths:
+            if is_store_key(path):
+                continue
+            source = os.path.join(root, path.replace("\\", "/"))
+            if not os.path.isfile(source):
+                missing.append((table, path))
+                continue
+            key = put_file(source, sizes=())  # renditions are made lazily on first use
+            conn.execute(f"UPDATE {table} SET logo_path = ? WHERE logo_path = ?", (key, path))
+            migrated += 1
+
+    for table, path in missing:
+        print(f"⚠️ [asset_store] {table} logo not found, left as is: {path}")
+    print(f"[asset_store] {migrated} logo(s) moved to the store, {len(missing)} missing.")
+    return migrated, len(missing)
@@ -3,6 +3,7 @@ import os
 import streamlit as st
 from dotenv import load_dotenv
 from utils import execute_query, fetch_one, hash_password, verify_password
+from data_version import current_versions
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
@@ -26,6 +27,44 @@ def update_last_login(username):
     query = "UPDATE players SET last_login_at = ? WHERE username = ?"
     execute_query(query, (now, username))
     
+# ---------- session identity ----------
+# Who is logged in, kept in st.session_state["identity"] so reruns resolve the
+# player with a dict read. It is re-read from `players` only when that table's
+# data version moved (e.g. update_player_info or delete_player, from any session).
+
+def _players_version():
+    return current_versions().get("players", 0)
+
+def set_identity(user):
+    st.session_state.identity = {
+        "player_id": user["id"],
+        "username": user["username"],
+        "role": user["role"],
+        "avatar_key": user["avatar_path"],
+        "version": _players_version(),
+    }
+    st.session_state.username = user["username"]
+    st.session_state.role = user["role"]
+    return st.session_state.identity
+
+def current_identity():
+    """The logged-in player's identity, or None if not logged in or the account is gone."""
+    if not st.session_state.get("logged_in"):
+        return None
+    identity = st.session_state.get("identity")
+    if identity is None:
+        # Session started before identities existed: resolve it once by username
+        user = get_user_by_username(st.session_state.get("username", ""))
+        return set_identity(user) if user else None
+    if identity["version"] == _players_version():
+        return identity
+
+    user = fetch_one("SELECT id, username, role, avatar_path FROM players WHERE id = ?", (identity["player_id"],))
+    if not user:
+        st.session_state.pop("identity", None)
+        return None
+    return set_identity(user)
+
 def login():
     st.markdown("<h1 style='text-align: center;'>🔐 Login</h1>", unsafe_allow_html=True)
     st.markdown("---")
@@ -46,8 +85,7 @@ def login():
                     
                     st.success(f"✅ Welcome back, **{username}**! ⚽")
                     st.session_state.logged_in = True
-                    st.session_state.username = username
-                    st.session_state.role = user["role"]
+                    set_identity(user)
                     st.balloons()
                     st.rerun()
                 else:
@@ -97,4 +135,5 @@ def logout():
     st.session_state.logged_in = False
     st.session_state.username = ""
     st.session_state.role = "player"
+    st.session_state.pop("identity", None)
     st.rerun()
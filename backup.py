@@ -0,0 +1,419 @@
+# backup.py
+"""
+Incremental SQLite snapshots.
+
+A snapshot is taken with the online backup API (sqlite3.Connection.backup),
+so it is consistent even while the app is writing. The copy is cut into
+blocks of BACKUP_BLOCK_SIZE bytes (a whole number of database pages); each
+block is stored once, compressed, under its SHA-256:
+
+    blocks/<sha[:2]>/<sha>.zst|.gz      zstd when `zstandard` is installed, else gzip
+    snapshots/<snapshot id>.json        manifest: block list, size, sha256 of the file
+
+Pages that did not change since the previous snapshot map to blocks that
+already exist, so each snapshot only adds the blocks that changed. Old
+snapshots are pruned by a retention policy (the newest BACKUP_KEEP_LAST,
+plus the newest of each day for BACKUP_KEEP_DAILY days) and blocks no
+manifest references any more are deleted.
+
+Where the blocks live is a sink: LocalDirectorySink writes to a folder,
+GitSink does the same inside a git checkout and pushes the new files.
+Snapshots and prunes hold the sink's lock while they look at blocks, so a
+prune never deletes a block that a running snapshot has chosen to reuse.
+
+    python backup.py snapshot           # take a snapshot (and prune)
+    python backup.py list
+    python backup.py verify [ID]
+    python backup.py restore [ID] [--target PATH]
+    python backup.py prune
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from db import DB_FILE, connection
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip is used instead
+    zstandard = None
+
+BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+BACKUP_BLOCK_SIZE = int(os.getenv("BACKUP_BLOCK_SIZE", str(64 * 1024)))
+BACKUP_CODEC = os.getenv("BACKUP_CODEC", "zstd" if zstandard else "gzip")
+BACKUP_KEEP_LAST = int(os.getenv("BACKUP_KEEP_LAST", "10"))
+BACKUP_KEEP_DAILY = int(os.getenv("BACKUP_KEEP_DAILY", "14"))
+BACKUP_LOCK_TIMEOUT = float(os.getenv("BACKUP_LOCK_TIMEOUT", "600"))
+BACKUP_LOCK_STALE_SECONDS = 3600  # a lock this old was left behind by a crashed process
+
+_EXTENSIONS = {"zstd": ".zst", "gzip": ".gz"}
+
+
+class BackupError(Exception):
+    pass
+
+
+# ---------- compression ----------
+
+def _compress(data, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise BackupError("zstd requested but the zstandard package is not installed")
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _decompress(data, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise BackupError("this backup uses zstd but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+# ---------- sinks ----------
+
+class LocalDirectorySink:
+    """Stores backup objects as files under `root`."""
+
+    def __init__(self, root=BACKUP_DIR):
+        self.root = root
+
+    def _path(self, name):
+        return os.path.join(self.root, *name.split("/"))
+
+    def exists(self, name):
+        return os.path.exists(self._path(name))
+
+    def put(self, name, data):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get(self, name):
+        with open(self._path(name), "rb") as f:
+            return f.read()
+
+    def delete(self, name):
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix):
+        base = self._path(prefix)
+        names = []
+        for folder, _, files in os.walk(base):
+            for file in files:
+                if file.endswith(".tmp"):
+                    continue
+                rel = os.path.relpath(os.path.join(folder, file), self.root)
+                names.append(rel.replace(os.sep, "/"))
+        return sorted(names)
+
+    def flush(self, message):
+        """Publish what was written; nothing to do for a plain directory."""
+
+    @contextmanager
+    def lock(self, timeout=BACKUP_LOCK_TIMEOUT):
+        """
+        Exclusive lock on the backup directory across processes: a lock file
+        next to `root` (outside it, so GitSink never commits it).
+        """
+        path = os.path.normpath(os.path.abspath(self.root)) + ".lock"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(path) > BACKUP_LOCK_STALE_SECONDS:
+                        os.remove(path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.monotonic() >= deadline:
+                    raise BackupError(f"{path} is held by another backup")
+                time.sleep(0.1)
+        try:
+            os.write(fd, str(os.getpid()).encode())
+        finally:
+            os.close(fd)
+        try:
+            yield
+        finally:
+            os.remove(path)
+
+
+class GitSink(LocalDirectorySink):
+    """
+    A LocalDirectorySink inside a git checkout; flush() commits `root` (plus
+    any `extra_paths`) and pushes.
+    """
+
+    def __init__(self, root=BACKUP_DIR, remote_url=None, extra_paths=()):
+        super().__init__(root)
+        self.remote_url = remote_url
+        self.paths = [root] + [p for p in extra_paths if os.path.exists(p)]
+
+    def flush(self, message):
+        subprocess.run(["git", "add", "-A", "--", *self.paths], check=True)
+        if subprocess.run(["git", "diff", "--cached", "--quiet", "--", *self.paths]).returncode == 0:
+            return  # nothing new to publish
+        subprocess.run(["git", "commit", "-m", message, "--", *self.paths], check=True)
+        subprocess.run(["git", "push"] + ([self.remote_url] if self.remote_url else []), check=True)
+
+
+# ---------- snapshots ----------
+
+def _block_name(digest, codec):
+    return f"blocks/{digest[:2]}/{digest}{_EXTENSIONS[codec]}"
+
+
+def _find_block(sink, digest):
+    for codec in _EXTENSIONS:
+        name = _block_name(digest, codec)
+        if sink.exists(name):
+            return name, codec
+    return None, None
+
+
+def list_snapshots(sink=None):
+    """Manifests of every snapshot, oldest first."""
+    sink = sink or LocalDirectorySink()
+    manifests = [json.loads(sink.get(name)) for name in sink.list("snapshots") if name.endswith(".json")]
+    manifests.sort(key=lambda m: m["created_at"])
+    return manifests
+
+
+def load_manifest(snapshot_id=None, sink=None):
+    """The manifest for `snapshot_id` (the newest snapshot when None)."""
+    sink = sink or LocalDirectorySink()
+    if snapshot_id in (None, "latest"):
+        snapshots = list_snapshots(sink)
+        if not snapshots:
+            raise BackupError("no snapshots found")
+        return snapshots[-1]
+    name = f"snapshots/{snapshot_id}.json"
+    if not sink.exists(name):
+        raise BackupError(f"snapshot {snapshot_id} not found")
+    return json.loads(sink.get(name))
+
+
+def create_snapshot(sink=None, codec=BACKUP_CODEC, block_size=BACKUP_BLOCK_SIZE):
+    """Take a consistent snapshot of the live database; returns its manifest."""
+    sink = sink or LocalDirectorySink()
+    if codec not in _EXTENSIONS:
+        raise BackupError(f"unknown codec {codec!r}")
+
+    fd, tmp_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        target = sqlite3.connect(tmp_path)
+        try:
+            with connection() as conn:
+                page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+                conn.backup(target)
+            # A standalone file: no WAL to carry around with the snapshot
+            target.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target.close()
+
+        block_size = max(page_size, block_size - block_size % page_size)
+        file_hash = hashlib.sha256()
+        blocks, new_blocks, stored_bytes = [], 0, 0
+        # Held until the manifest references every reused block, so a prune cannot delete one meanwhile
+        with sink.lock():
+            with open(tmp_path, "rb") as f:
+                while True:
+                    data = f.read(block_size)
+                    if not data:
+                        break
+                    file_hash.update(data)
+                    digest = hashlib.sha256(data).hexdigest()
+                    blocks.append(digest)
+                    if _find_block(sink, digest)[0] is None:
+                        compressed = _compress(data, codec)
+                        sink.put(_block_name(digest, codec), compressed)
+                        new_blocks += 1
+                        stored_bytes += len(compressed)
+            size = os.path.getsize(tmp_path)
+
+            created = datetime.now(timezone.utc)
+            manifest = {
+                "id": f"{created:%Y%m%dT%H%M%S%fZ}",
+                "created_at": created.isoformat(),
+                "size": size,
+                "sha256": file_hash.hexdigest(),
+                "page_size": page_size,
+                "block_size": block_size,
+                "blocks": blocks,
+                "new_blocks": new_blocks,
+                "stored_bytes": stored_bytes,
+            }
+            sink.put(f"snapshots/{manifest['id']}.json", json.dumps(manifest, indent=1).encode())
+    finally:
+        os.remove(tmp_path)
+    return manifest
+
+
+def _assemble(manifest, sink, out):
+    file_hash = hashlib.sha256()
+    for i, digest in enumerate(manifest["blocks"]):
+        name, codec = _find_block(sink, digest)
+        if name is None:
+            raise BackupError(f"block {i} ({digest[:12]}) is missing")
+        try:
+            data = _decompress(sink.get(name), codec)
+        except BackupError:
+            raise
+        except Exception as e:
+            raise BackupError(f"block {i} ({digest[:12]}) cannot be decompressed: {e}")
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise BackupError(f"block {i} ({digest[:12]}) is corrupt")
+        file_hash.update(data)
+        if out is not None:
+            out.write(data)
+    if file_hash.hexdigest() != manifest["sha256"]:
+        raise BackupError("checksum mismatch for the restored file")
+
+
+def verify_snapshot(snapshot_id=None, sink=None):
+    """Check every block and the whole-file checksum; raises BackupError on failure."""
+    sink = sink or LocalDirectorySink()
+    manifest = load_manifest(snapshot_id, sink)
+    _assemble(manifest, sink, None)
+    return manifest
+
+
+def restore_snapshot(snapshot_id=None, target=DB_FILE, sink=None):
+    """
+    Rebuild a snapshot, verify its checksums and integrity, then install it
+    at `target`. The live database is overwritten through the backup API so
+    open connections see the restored data; any other path is replaced.
+    """
+    sink = sink or LocalDirectorySink()
+    manifest = load_manifest(snapshot_id, sink)
+
+    folder = os.path.dirname(os.path.abspath(target))
+    fd, tmp_path = tempfile.mkstemp(suffix=".restore", dir=folder)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            _assemble(manifest, sink, out)
+        restored = sqlite3.connect(tmp_path)
+        try:
+            result = restored.execute("PRAGMA integrity_check").fetchone()[0]
+            if result != "ok":
+                raise BackupError(f"integrity check failed: {result}")
+            if os.path.abspath(target) == os.path.abspath(DB_FILE):
+                with connection() as conn:
+                    restored.backup(conn)
+                _forget_cached_reads()
+                return manifest
+        finally:
+            restored.close()
+        os.replace(tmp_path, target)
+        return manifest
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _forget_cached_reads():
+    from query_cache import get_cache
+    from round_calendar import invalidate_round_calendar
+    get_cache().invalidate(None)
+    invalidate_round_calendar()
+
+
+# ---------- retention ----------
+
+def prune_snapshots(sink=None, keep_last=BACKUP_KEEP_LAST, keep_daily=BACKUP_KEEP_DAILY, now=None):
+    """
+    Delete snapshots outside the retention policy and the blocks only they
+    used. Returns (snapshots removed, blocks removed).
+    """
+    sink = sink or LocalDirectorySink()
+    with sink.lock():
+        return _prune(sink, keep_last, keep_daily, now or datetime.now(timezone.utc))
+
+
+def _prune(sink, keep_last, keep_daily, now):
+    snapshots = list_snapshots(sink)
+
+    keep = {m["id"] for m in snapshots[-keep_last:]} if keep_last > 0 else set()
+    newest_per_day = {}
+    for m in snapshots:
+        newest_per_day[m["created_at"][:10]] = m["id"]  # oldest first, so the last one wins
+    oldest_day = (now - timedelta(days=keep_daily)).date().isoformat()
+    keep.update(snapshot_id for day, snapshot_id in newest_per_day.items() if day > oldest_day)
+
+    removed = [m for m in snapshots if m["id"] not in keep]
+    for m in removed:
+        sink.delete(f"snapshots/{m['id']}.json")
+
+    referenced = {digest for m in snapshots if m["id"] in keep for digest in m["blocks"]}
+    orphaned = 0
+    for name in sink.list("blocks"):
+        digest = os.path.basename(name).split(".", 1)[0]
+        if digest not in referenced:
+            sink.delete(name)
+            orphaned += 1
+    return len(removed), orphaned
+
+
+def backup_now(sink=None):
+    """Snapshot, prune and publish in one go; returns the new manifest."""
+    sink = sink or LocalDirectorySink()
+    manifest = create_snapshot(sink)
+    prune_snapshots(sink)
+    sink.flush(f"Backup snapshot {manifest['id']}")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite snapshot backups")
+    parser.add_argument("command", choices=["snapshot", "list", "verify", "restore", "prune"])
+    parser.add_argument("snapshot_id", nargs="?", default=None)
+    parser.add_argument("--dir", default=BACKUP_DIR, help="backup directory (default: %(default)s)")
+    parser.add_argument("--target", default=DB_FILE, help="where to restore (default: the live database)")
+    args = parser.parse_args()
+    sink = LocalDirectorySink(args.dir)
+
+    try:
+        if args.command == "snapshot":
+            m = backup_now(sink)
+            print(f"✅ Snapshot {m['id']}: {m['size']} bytes, "
+                  f"{m['new_blocks']}/{len(m['blocks'])} new blocks ({m['stored_bytes']} bytes stored)")
+        elif args.command == "list":
+            for m in list_snapshots(sink):
+                print(f"{m['id']}  {m['size']:>10} bytes  +{m['new_blocks']} blocks  {m['sha256'][:12]}")
+        elif args.command == "verify":
+            m = verify_snapshot(args.snapshot_id, sink)
+            print(f"✅ Snapshot {m['id']} verified ({len(m['blocks'])} blocks).")
+        elif args.command == "restore":
+            m = restore_snapshot(args.snapshot_id, args.target, sink)
+            print(f"✅ Restored snapshot {m['id']} to {args.target}.")
+        elif args.command == "prune":
+            snapshots, blocks = prune_snapshots(sink)
+            print(f"🧹 Removed {snapshots} snapshots and {blocks} unused blocks.")
+    except BackupError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+# benchmark.py
+"""
+Micro-benchmarks for the database layer.
+
+Run against a throw-away copy of the game database, never the live file:
+
+    python benchmark.py sessions --sessions 20 --seconds 10
+    python benchmark.py scoring --players 10000 --matches 400
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from db import DB_FILE, DB_PROFILE, LEGACY_PROFILE, ConnectionPool, apply_profile
+from scoring import create_dirty_matches_schema, score_matches
+from standings import create_standings_schema, rebuild_player_standings
+
+# ===== Concurrent sessions: WAL profile vs rollback journal =====
+
+READ_QUERIES = [
+    "SELECT * FROM rounds WHERE start_date <= ? AND end_date >= ?",
+    "SELECT p.id, COALESCE(SUM(pr.score), 0) AS total_points FROM players p "
+    "LEFT JOIN predictions pr ON pr.player_id = p.id GROUP BY p.id ORDER BY total_points DESC",
+    "SELECT * FROM matches WHERE round_id = (SELECT MAX(id) FROM rounds) ORDER BY match_datetime",
+]
+
+
+def _copy_db(src, workdir):
+    dst = os.path.join(workdir, "bench.db")
+    source, target = sqlite3.connect(src), sqlite3.connect(dst)
+    source.backup(target)
+    source.close()
+    target.close()
+    return dst
+
+
+def _prepare_bench_table(db_file):
+    conn = sqlite3.connect(db_file)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS bench_writes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session INTEGER, value INTEGER, written_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+
+def _session(pool, session_id, stop_at, write_ratio, results):
+    latencies, reads, writes, errors = [], 0, 0, 0
+    today = time.strftime("%Y-%m-%d")
+    rng = random.Random(session_id)
+    while time.monotonic() < stop_at:
+        started = time.perf_counter()
+        try:
+            with pool.connection() as conn:
+                if rng.random() < write_ratio:
+                    conn.execute(
+                        "INSERT INTO bench_writes (session, value) VALUES (?, ?)",
+                        (session_id, rng.randint(0, 10)),
+                    )
+                    conn.commit()
+                    writes += 1
+                else:
+                    query = rng.choice(READ_QUERIES)
+                    params = (today, today) if query.count("?") == 2 else ()
+                    conn.execute(query, params).fetchall()
+                    reads += 1
+        except sqlite3.OperationalError:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+    results[session_id] = (latencies, reads, writes, errors)
+
+
+def bench_sessions(sessions=20, seconds=10.0, write_ratio=0.05, source=DB_FILE):
+    """Run `sessions` concurrent reader/writer threads under each profile."""
+    report = {}
+    for name, profile in (("legacy", LEGACY_PROFILE), ("tuned", DB_PROFILE)):
+        workdir = tempfile.mkdtemp(prefix="bench_db_")
+        try:
+            db_file = _copy_db(source, workdir)
+            _prepare_bench_table(db_file)
+            pool = ConnectionPool(db_file, size=sessions, profile=profile, checkpoint_interval=1)
+            results = {}
+            stop_at = time.monotonic() + seconds
+            threads = [
+                threading.Thread(target=_session, args=(pool, i, stop_at, write_ratio, results))
+                for i in range(sessions)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            pool.close()
+
+            latencies = sorted(l for r in results.values() for l in r[0])
+            report[name] = {
+                "reads/s": round(sum(r[1] for r in results.values()) / seconds, 1),
+                "writes/s": round(sum(r[2] for r in results.values()) / seconds, 1),
+                "locked_errors": sum(r[3] for r in results.values()),
+                "p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+                "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 2) if latencies else None,
+            }
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+# ===== Scoring: set-based engine vs per-row updates =====
+
+SCORING_SCHEMA = [
+    "CREATE TABLE players (id INTEGER PRIMARY KEY, username TEXT)",
+    "CREATE TABLE teams (id INTEGER PRIMARY KEY, name TEXT)",
+    """
+    CREATE TABLE matches (
+        id INTEGER PRIMARY KEY, home_team_id INTEGER, away_team_id INTEGER,
+        home_score INTEGER, away_score INTEGER, penalty_winner INTEGER
+    )
+    """,
+    """
+    CREATE TABLE predictions (
+        id INTEGER PRIMARY KEY, player_id INTEGER, match_id INTEGER,
+        predicted_home_score INTEGER, predicted_away_score INTEGER,
+        predicted_penalty_winner TEXT, score INTEGER DEFAULT 0,
+        UNIQUE (player_id, match_id)
+    )
+    """,
+    "CREATE TABLE legs (id INTEGER PRIMARY KEY, match_id INTEGER, home_score INTEGER, away_score INTEGER, winner_team_id INTEGER)",
+    "CREATE INDEX idx_predictions_match ON predictions(match_id)",
+]
+
+
+def _build_scoring_db(db_file, players, matches, teams=20, seed=7):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_file)
+    apply_profile(conn)
+    for statement in SCORING_SCHEMA:
+        conn.execute(statement)
+    create_standings_schema(conn)
+    create_dirty_matches_schema(conn)
+    conn.executemany("INSERT INTO teams (id, name) VALUES (?, ?)", [(i, f"Team {i}") for i in range(1, teams + 1)])
+    conn.executemany("INSERT INTO players (id, username) VALUES (?, ?)", [(i, f"player{i}") for i in range(1, players + 1)])
+
+    match_rows = []
+    for match_id in range(1, matches + 1):
+        home, away = rng.sample(range(1, teams + 1), 2)
+        home_score, away_score = rng.randint(0, 4), rng.randint(0, 4)
+        penalty_winner = rng.choice((home, away)) if home_score == away_score and rng.random() < 0.2 else None
+        match_rows.append((match_id, home, away, home_score, away_score, penalty_winner))
+    conn.executemany("INSERT INTO matches VALUES (?, ?, ?, ?, ?, ?)", match_rows)
+
+    def predictions():
+        for player_id in range(1, players + 1):
+            for match_id, home, away, *_ in match_rows:
+                h, a = rng.randint(0, 4), rng.randint(0, 4)
+                winner = f"Team {rng.choice((home, away))}" if h == a else ""
+                yield player_id, match_id, h, a, winner
+
+    conn.executemany(
+        "INSERT INTO predictions (player_id, match_id, predicted_home_score, predicted_away_score, "
+        "predicted_penalty_winner) VALUES (?, ?, ?, ?, ?)",
+        predictions(),
+    )
+    rebuild_player_standings(conn)
+    conn.commit()
+    return conn
+
+
+def _legacy_score_match(conn, match_id):
+    # The old update_scores_for_match: a team lookup, UPDATE and commit per prediction.
+    match = conn.execute("SELECT * FROM matches WHERE id = ?", (match_id,)).fetchone()
+    predictions = conn.execute("SELECT * FROM predictions WHERE match_id = ?", (match_id,)).fetchall()
+    for pred in predictions:
+        h, a = match["home_score"], match["away_score"]
+        ph, pa = pred["predicted_home_score"], pred["predicted_away_score"]
+        outcome = lambda x, y: (x > y) - (x < y)
+        score = 3 if (h, a) == (ph, pa) else 1 if outcome(h, a) == outcome(ph, pa) else 0
+        if match["penalty_winner"]:
+            team = conn.execute("SELECT name FROM teams WHERE id = ?", (match["penalty_winner"],)).fetchone()
+            if team and team["name"] == pred["predicted_penalty_winner"]:
+                score += 1
+        conn.execute("UPDATE predictions SET score = ? WHERE id = ?", (score, pred["id"]))
+        conn.commit()
+    return len(predictions)
+
+
+def bench_scoring(players=10000, matches=400, legacy_sample=2):
+    """Score players x matches predictions with the engine; time a sample the old way."""
+    workdir = tempfile.mkdtemp(prefix="bench_scoring_")
+    try:
+        started = time.perf_counter()
+        conn = _build_scoring_db(os.path.join(workdir, "scoring.db"), players, matches)
+        conn.row_factory = sqlite3.Row
+        build_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        changed = score_matches(conn, list(range(1, matches + 1)))
+        engine_seconds = time.perf_counter() - started
+
+        # Reset a sample and score it per row, then extrapolate to all matches
+        sample = list(range(1, min(legacy_sample, matches) + 1))
+        conn.execute(f"UPDATE predictions SET score = 0 WHERE match_id IN ({','.join('?' for _ in sample)})", sample)
+        conn.commit()
+        started = time.perf_counter()
+        for match_id in sample:
+            _legacy_score_match(conn, match_id)
+        legacy_seconds = (time.perf_counter() - started) * matches / max(len(sample), 1)
+        conn.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "engine": {
+            "predictions": players * matches,
+            "changed": changed,
+            "seconds": round(engine_seconds, 2),
+            "setup_seconds": round(build_seconds, 2),
+        },
+        "per-row": {
+            "predictions": players * matches,
+            "seconds_estimated": round(legacy_seconds, 2),
+            "sampled_matches": len(sample),
+        },
+    }
+
+
+def _print_report(report):
+    for name, row in report.items():
+        print(f"{name:>8}: " + ", ".join(f"{k}={v}" for k, v in row.items()))
+
+
+# ===== MENU DRIVER =====
+def main():
+    parser = argparse.ArgumentParser(description="Database benchmarks")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p_sessions = sub.add_parser("sessions", help="concurrent Streamlit-like sessions")
+    p_sessions.add_argument("--sessions", type=int, default=20)
+    p_sessions.add_argument("--seconds", type=float, default=10.0)
+    p_sessions.add_argument("--write-ratio", type=float, default=0.05)
+    p_sessions.add_argument("--db", default=DB_FILE)
+
+    p_scoring = sub.add_parser("scoring", help="bulk prediction scoring")
+    p_scoring.add_argument("--players", type=int, default=10000)
+    p_scoring.add_argument("--matches", type=int, default=400)
+    p_scoring.add_argument("--legacy-sample", type=int, default=2)
+
+    args = parser.parse_args()
+    if args.bench == "sessions":
+        _print_report(bench_sessions(args.sessions, args.seconds, args.write_ratio, args.db))
+    elif args.bench == "scoring":
+        _print_report(bench_scoring(args.players, args.matches, args.legacy_sample))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+# changelog.py
+"""
+Logical change log for replicating the game database.
+
+Triggers on the replicated tables (CHANGE_LOG_TABLES) append one row per
+insert, update and delete to `change_log`, whose `seq` only ever grows.
+Inserts and updates carry the full new row as JSON (BLOBs as
+{"$blob": hex}); deletes carry just the id.
+
+A replica starts from a snapshot (backup.py) and then catches up by
+applying only the changes after its last sequence number:
+
+    python changelog.py export changes.jsonl.gz --since 1200
+    python changelog.py apply changes.jsonl.gz --db replica.db
+    python changelog.py status [--db replica.db]
+    python changelog.py triggers      # regenerate after a tracked table gains a column
+    python changelog.py truncate 1200 # drop entries every replica already has
+
+The triggers list the columns a table had when they were created, so run
+`triggers` after an ALTER TABLE on a tracked table.
+"""
+import argparse
+import gzip
+import json
+import sqlite3
+
+from db import connection
+from standings import refresh_standings_ranks
+
+CHANGE_LOG_TABLES = ("predictions", "matches", "legs", "two_legged_ties", "players", "rounds")
+EXPORT_FETCH_SIZE = 1000
+
+CHANGE_LOG_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        op TEXT NOT NULL CHECK (op IN ('insert', 'update', 'delete')),
+        row_id INTEGER NOT NULL,
+        row_data TEXT,
+        changed_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    # A row here (only ever visible inside the writer's own transaction)
+    # stops the triggers logging, e.g. while a replica applies changes.
+    "CREATE TABLE IF NOT EXISTS change_log_suspended (id INTEGER PRIMARY KEY CHECK (id = 1))",
+    # The last sequence number this database applied as a replica.
+    """
+    CREATE TABLE IF NOT EXISTS change_log_replica (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        last_seq INTEGER NOT NULL,
+        applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+]
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _row_json(columns):
+    pairs = ", ".join(
+        f"'{c}', CASE typeof(NEW.{c}) WHEN 'blob' THEN json_object('$blob', hex(NEW.{c})) ELSE NEW.{c} END"
+        for c in columns
+    )
+    return f"json_object({pairs})"
+
+
+def _trigger_sql(conn, table):
+    row = _row_json(_columns(conn, table))
+    guard = "WHEN NOT EXISTS (SELECT 1 FROM change_log_suspended)"
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_change_log_{table}_insert
+        AFTER INSERT ON {table} {guard}
+        BEGIN
+            INSERT INTO change_log (table_name, op, row_id, row_data) VALUES ('{table}', 'insert', NEW.id, {row});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_change_log_{table}_update
+        AFTER UPDATE ON {table} {guard}
+        BEGIN
+            INSERT INTO change_log (table_name, op, row_id, row_data) VALUES ('{table}', 'update', NEW.id, {row});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_change_log_{table}_delete
+        AFTER DELETE ON {table} {guard}
+        BEGIN
+            INSERT INTO change_log (table_name, op, row_id) VALUES ('{table}', 'delete', OLD.id);
+        END
+        """,
+    ]
+
+
+def create_change_log_schema(conn):
+    for statement in CHANGE_LOG_SCHEMA:
+        conn.execute(statement)
+    for table in CHANGE_LOG_TABLES:
+        for statement in _trigger_sql(conn, table):
+            conn.execute(statement)
+
+
+def recreate_change_log_triggers(conn):
+    for table in CHANGE_LOG_TABLES:
+        for op in ("insert", "update", "delete"):
+            conn.execute(f"DROP TRIGGER IF EXISTS trg_change_log_{table}_{op}")
+    create_change_log_schema(conn)
+
+
+# ---------- export ----------
+
+def export_changes(path, since_seq=0):
+    """
+    Stream every change after `since_seq` to `path` as gzip'd JSONL.
+    Returns (changes written, last seq written, or since_seq if none).
+    """
+    written, last_seq = 0, since_seq
+    with connection() as conn, gzip.open(path, "wt", encoding="utf-8") as out:
+        cursor = conn.execute(
+            "SELECT seq, table_name, op, row_id, row_data, changed_at FROM change_log WHERE seq > ? ORDER BY seq",
+            (since_seq,),
+        )
+        while True:
+            rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                break
+            for seq, table, op, row_id, row_data, changed_at in rows:
+                out.write(json.dumps({
+                    "seq": seq,
+                    "table": table,
+                    "op": op,
+                    "id": row_id,
+                    "row": json.loads(row_data) if row_data else None,
+                    "at": changed_at,
+                }, separators=(",", ":")) + "\n")
+                written += 1
+                last_seq = seq
+    return written, last_seq
+
+
+def truncate_change_log(upto_seq):
+    """Delete entries up to and including `upto_seq`; returns how many went."""
+    with connection() as conn:
+        deleted = conn.execute("DELETE FROM change_log WHERE seq <= ?", (upto_seq,)).rowcount
+        conn.commit()
+    return deleted
+
+
+# ---------- apply ----------
+
+# Replicated tables whose triggers on the replica move player_standings totals
+STANDINGS_TABLES = {"predictions", "players"}
+
+def replica_position(conn):
+    """
+    The last sequence number applied to this database. A fresh copy of the
+    primary starts from the newest entry in its own change log.
+    """
+    row = conn.execute("SELECT last_seq FROM change_log_replica WHERE id = 1").fetchone()
+    if row:
+        return row[0]
+    return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+
+
+def _decode(value):
+    if isinstance(value, dict) and "$blob" in value:
+        return bytes.fromhex(value["$blob"])
+    return value
+
+
+def _apply_one(conn, change, columns_by_table):
+    table = change["table"]
+    if table not in CHANGE_LOG_TABLES:
+        raise ValueError(f"change {change['seq']} targets untracked table {table!r}")
+    if change["op"] == "delete":
+        conn.execute(f"DELETE FROM {table} WHERE id = ?", (change["id"],))
+        return
+
+    if table not in columns_by_table:
+        columns_by_table[table] = set(_columns(conn, table))
+    row = {c: _decode(v) for c, v in change["row"].items() if c in columns_by_table[table]}
+    names = [c for c in row if c != "id"]
+    # UPDATE-then-INSERT rather than an upsert: an upsert's conflict policy
+    # would override the OR REPLACE inside the replica's own triggers.
+    updated = conn.execute(
+        f"UPDATE {table} SET {', '.join(f'{c} = ?' for c in names)} WHERE id = ?",
+        [row[c] for c in names] + [change["id"]],
+    ).rowcount
+    if not updated:
+        names.append("id")
+        conn.execute(
+            f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})",
+            [row.get(c, change["id"]) for c in names],
+        )
+
+
+def apply_changes(path, conn):
+    """
+    Apply an exported change file to `conn` in one transaction, skipping
+    anything at or below the replica's position, and re-rank the standings
+    the replica's own triggers updated. Returns (applied, last seq).
+    """
+    create_change_log_schema(conn)
+    conn.commit()
+    position = replica_position(conn)
+    applied, columns_by_table, tables = 0, {}, set()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("INSERT OR IGNORE INTO change_log_suspended (id) VALUES (1)")
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                change = json.loads(line)
+                if change["seq"] <= position:
+                    continue
+                _apply_one(conn, change, columns_by_table)
+                tables.add(change["table"])
+                position = change["seq"]
+                applied += 1
+        if tables & STANDINGS_TABLES:
+            refresh_standings_ranks(conn)
+        conn.execute("DELETE FROM change_log_suspended")
+        if applied:
+            conn.execute(
+                "INSERT INTO change_log_replica (id, last_seq) VALUES (1, ?) "
+                "ON CONFLICT(id) DO UPDATE SET last_seq = excluded.last_seq, applied_at = CURRENT_TIMESTAMP",
+                (position,),
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return applied, position
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Change log export/apply for replicas")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export")
+    export.add_argument("path")
+    export.add_argument("--since", type=int, default=0)
+    apply = sub.add_parser("apply")
+    apply.add_argument("path")
+    apply.add_argument("--db", required=True, help="replica database to update")
+    status = sub.add_parser("status")
+    status.add_argument("--db", help="replica database (default: the live database)")
+    sub.add_parser("triggers")
+    truncate = sub.add_parser("truncate")
+    truncate.add_argument("upto_seq", type=int)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        written, last_seq = export_changes(args.path, args.since)
+        print(f"✅ Exported {written} changes to {args.path} (last seq {last_seq}).")
+    elif args.command == "apply":
+        replica = sqlite3.connect(args.db, isolation_level=None)
+        try:
+            applied, last_seq = apply_changes(args.path, replica)
+        finally:
+            replica.close()
+        print(f"✅ Applied {applied} changes to {args.db} (now at seq {last_seq}).")
+    elif args.command == "status":
+        if args.db:
+            conn = sqlite3.connect(args.db)
+            try:
+                print(f"Replica position: {replica_position(conn)}")
+            finally:
+                conn.close()
+        else:
+            with connection() as conn:
+                first, last, count = conn.execute("SELECT MIN(seq), MAX(seq), COUNT(*) FROM change_log").fetchone()
+            print(f"Change log: {count} entries (seq {first} to {last}).")
+    elif args.command == "triggers":
+        with connection() as conn:
+            recreate_change_log_triggers(conn)
+            conn.commit()
+        print("✅ Change log triggers recreated.")
+    elif args.command == "truncate":
+        print(f"🧹 Removed {truncate_change_log(args.upto_seq)} change log entries.")
+
+
+if __name__ == '__main__':
+    main()
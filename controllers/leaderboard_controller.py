@@ -0,0 +1,56 @@
+from db import connection
+
+# One pass over players + player_standings: DENSE_RANK gives the tie-aware
+# rank shown to players, ROW_NUMBER gives a stable order for paging and for
+# the neighbourhood, which stays 2 * radius + 1 rows however many are tied.
+LEADERBOARD_QUERY = """
+    WITH ranked AS (
+        SELECT
+            p.id AS player_id,
+            p.username,
+            p.avatar_path,
+            COALESCE(ps.total_points, 0) AS points,
+            DENSE_RANK() OVER (ORDER BY COALESCE(ps.total_points, 0) DESC) AS rank,
+            ROW_NUMBER() OVER (
+                ORDER BY COALESCE(ps.total_points, 0) DESC, p.username COLLATE NOCASE
+            ) AS position,
+            COUNT(*) OVER () AS total_players
+        FROM players p
+        LEFT JOIN player_standings ps ON ps.player_id = p.id
+    ),
+    me AS (
+        SELECT position FROM ranked WHERE player_id = :player_id
+    )
+    SELECT
+        ranked.*,
+        (position > :offset AND position <= :offset + :limit) AS in_page,
+        (player_id IS :player_id) AS is_you
+    FROM ranked
+    WHERE (position > :offset AND position <= :offset + :limit)
+       OR position BETWEEN (SELECT position FROM me) - :radius AND (SELECT position FROM me) + :radius
+    ORDER BY position
+"""
+
+
+def get_leaderboard(offset=0, limit=10, around_player_id=None, radius=2):
+    """
+    Ranked leaderboard rows in a single query.
+
+    Returns the page `offset`..`offset + limit` (by position) and, when
+    `around_player_id` is given, the `radius` players either side of that
+    player by position (ties broken by username). Each row is a dict with
+    player_id, username, avatar_path, points, rank, position,
+    total_players, in_page and is_you, ordered by position.
+    """
+    params = {
+        "offset": max(0, int(offset)),
+        "limit": max(0, int(limit)),
+        "player_id": around_player_id,
+        "radius": max(0, int(radius)),
+    }
+    with connection() as conn:
+        rows = conn.execute(LEADERBOARD_QUERY, params).fetchall()
+    return [
+        {**dict(row), "in_page": bool(row["in_page"]), "is_you": bool(row["is_you"])}
+        for row in rows
+    ]
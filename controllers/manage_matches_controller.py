@@ -1,61 +1,44 @@
-# controllers/manage_matches_controller.py
-from db import get_connection
+from db import connection
 from datetime import datetime, timedelta
 from utils import execute_query, fetch_one, fetch_all
 import streamlit as st
 import sqlite3
+from standings import refresh_standings_ranks
+from round_calendar import get_round_calendar, get_week_saturday_to_friday
 def execute_query(query, params=()):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(query, params)
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with connection() as conn:
+        conn.execute(query, params)
+        conn.commit()
 
 
 def fetch_all(query, params=()):
     """
     Fetch all rows for SELECT query.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-        return results
-    except sqlite3.Error as e:
-        print("SQL Error:", e)
-        raise e
-    finally:
-        cursor.close()
-        conn.close()
+    with connection() as conn:
+        try:
+            return conn.execute(query, params).fetchall()
+        except sqlite3.Error as e:
+            print("SQL Error:", e)
+            raise e
 
 def fetch_one(query, params=()):
     """
     Fetch a single row for SELECT query.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(query, params)
-        result = cursor.fetchone()
-        return result
-    except sqlite3.Error as e:
-        print("SQL Error:", e)
-        raise e
-    finally:
-        cursor.close()
-        conn.close()
+    with connection() as conn:
+        try:
+            return conn.execute(query, params).fetchone()
+        except sqlite3.Error as e:
+            print("SQL Error:", e)
+            raise e
 
 def execute_read_query(query, params=()):
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        columns = [column[0] for column in cursor.description]
-        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        conn.close()
-        return results
+        with connection() as conn:
+            cursor = conn.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
     except Exception as e:
         print(f"[ERROR] Failed to execute read query: {e}")
         return []
@@ -74,10 +57,8 @@ def get_teams_by_league(league_id):
 
 
 def get_round_by_date(match_date):
-    return fetch_one(
-        "SELECT id FROM rounds WHERE start_date <= ? AND end_date >= ?", 
-        (match_date, match_date)
-    )
+    round_info = get_round_calendar().round_for_date(match_date)
+    return {"id": round_info["id"]} if round_info else None
     
 
 
@@ -121,23 +102,6 @@ def check_duplicate_match(round_id, home_team_id, away_team_id):
     result = fetch_one(query, (round_id, home_team_id, away_team_id))
     return result is not None  # True if duplicate found
 
-def get_week_saturday_to_friday(date_str):
-    """
-    Given a date string 'YYYY-MM-DD', returns (start_date, end_date) of
-    the round week: Saturday to next Friday.
-    """
-    date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-
-    # Find last Saturday
-    # weekday(): Monday=0 ... Sunday=6
-    days_since_saturday = (date_obj.weekday() - 5) % 7  # Saturday=5
-    start_date = date_obj - timedelta(days=days_since_saturday)
-
-    # End date = start_date + 6 days (Friday)
-    end_date = start_date + timedelta(days=6)
-
-    return start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
-
 def get_round_id_by_date(match_date):
     """
     Returns round_id where match_date fits between start_date and end_date.
@@ -145,15 +109,10 @@ def get_round_id_by_date(match_date):
     """
     print(f"Looking for round containing date: {match_date}")
 
-    query_find = """
-    SELECT id, start_date, end_date FROM rounds
-    WHERE start_date <= ? AND end_date >= ?
-    LIMIT 1;
-    """
-    row = fetch_one(query_find, (match_date, match_date))
+    row = get_round_calendar().round_for_date(match_date)
     if row:
-        round_id = row['id'] if isinstance(row, dict) else row[0]
-        print(f"Found existing round with ID: {round_id}, start_date: {row['start_date'] if isinstance(row, dict) else row[1]}, end_date: {row['end_date'] if isinstance(row, dict) else row[2]}")
+        round_id = row['id']
+        print(f"Found existing round with ID: {round_id}, start_date: {row['start_date']}, end_date: {row['end_date']}")
         return round_id
 
     print("No existing round found, creating a new one.")
@@ -193,10 +152,10 @@ def get_round_id_by_date(match_date):
         print(f"Exception while inserting round: {e}")
         raise
 
-    # Fetch again the newly inserted round id
-    row = fetch_one(query_find, (match_date, match_date))
+    # Fetch again the newly inserted round id (the insert invalidated the calendar)
+    row = get_round_calendar().round_for_date(match_date)
     if row:
-        round_id = row['id'] if isinstance(row, dict) else row[0]
+        round_id = row['id']
         print(f"Created new round with ID: {round_id} named '{round_name}'")
         return round_id
     else:
@@ -305,6 +264,11 @@ def delete_match_by_id(match_id):
     query_delete_match = "DELETE FROM matches WHERE id = ?"
     execute_query(query_delete_match, (match_id,))
 
+    # Removing scored predictions can reorder the standings
+    with connection() as conn:
+        refresh_standings_ranks(conn)
+        conn.commit()
+
     # Check if any matches are still in this round
     query_check_round_empty = "SELECT COUNT(*) AS match_count FROM matches WHERE round_id = ?"
     count_result = fetch_one(query_check_round_empty, (round_id,))
@@ -354,18 +318,6 @@ def update_match_status(match_id, new_status):
     execute_query(query, (new_status, match_id))
 
 
-def change_match_status(match):
-    match_time = datetime.fromisoformat(match['match_datetime'])
-    now = datetime.now()
-
-    if match['status'] == 'upcoming' and now >= match_time:
-        update_match_status(match['id'], 'live')
-        #match['status'] = 'live'  # reflect change in UI immediately
-
-    elif match['status'] == 'live' and now >= match_time + timedelta(hours=3):
-        update_match_status(match['id'], 'finished')
-        #match['status'] = 'finished'  # reflect change in UI immediately
-        
 def fetch_legs_by_match_id(match_id):
     query = "SELECT * FROM legs WHERE match_id = ?"
     return execute_read_query(query, (match_id,))
@@ -1,12 +1,9 @@
-from db import get_connection
+from db import connection
 import hashlib
 from utils import hash_password, execute_query
 import streamlit as st
 
 def get_players(search=""):
-    conn = get_connection()
-    cur = conn.cursor()
-
     query = """
         SELECT 
             p.id, 
@@ -15,11 +12,11 @@ def get_players(search=""):
             p.role, 
             p.avatar_path,
             p.last_login_at,
-            IFNULL(SUM(pr.score), 0) AS total_points,
+            IFNULL(ps.total_points, 0) AS total_points,
             IFNULL(a.total_leagues_won, 0),
             IFNULL(a.total_cups_won, 0)
         FROM players p
-        LEFT JOIN predictions pr ON p.id = pr.player_id
+        LEFT JOIN player_standings ps ON p.id = ps.player_id
         LEFT JOIN achievements a ON p.id = a.player_id
     """
 
@@ -28,11 +25,8 @@ def get_players(search=""):
         query += " WHERE p.username LIKE ? OR p.email LIKE ?"
         params = [f"%{search}%", f"%{search}%"]
 
-    query += " GROUP BY p.id, p.username, p.email, p.role, p.avatar_path, p.last_login_at, a.total_leagues_won, a.total_cups_won"
-
-    cur.execute(query, params)
-    rows = cur.fetchall()
-    conn.close()
+    with connection() as conn:
+        rows = conn.execute(query, params).fetchall()
 
     return [{
         "id": r[0],
@@ -48,40 +42,33 @@ def get_players(search=""):
 
 
 def add_player(username, email, role, password):
-    conn = get_connection()
-    cur = conn.cursor()
     password_hash = hash_password(password)
-    cur.execute("INSERT INTO players (username, email, role, password_hash) VALUES (?, ?, ?, ?)",
-                (username, email, role, password_hash))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        conn.execute("INSERT INTO players (username, email, role, password_hash) VALUES (?, ?, ?, ?)",
+                     (username, email, role, password_hash))
+        conn.commit()
 
 def update_player(player_id, username, email, role, password=None):
-    conn = get_connection()
-    cur = conn.cursor()
     try:
-        if password:
-            password_hash = hash_password(password)
-            cur.execute("UPDATE players SET username=?, email=?, role=?, password_hash=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
-                        (username, email, role, password_hash, player_id))
-        else:
-            cur.execute("UPDATE players SET username=?, email=?, role=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
-                        (username, email, role, player_id))
-        conn.commit()
+        with connection() as conn:
+            if password:
+                password_hash = hash_password(password)
+                conn.execute("UPDATE players SET username=?, email=?, role=?, password_hash=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
+                             (username, email, role, password_hash, player_id))
+            else:
+                conn.execute("UPDATE players SET username=?, email=?, role=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
+                             (username, email, role, player_id))
+            conn.commit()
         return True  # ✅ Add this
     except Exception as e:
         print(f"❌ update_player error: {e}")
         return False  # ✅ Add error handling to reflect failure
-    finally:
-        conn.close()
 
 
 def delete_player(player_id):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM players WHERE id=?", (player_id,))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        conn.execute("DELETE FROM players WHERE id=?", (player_id,))
+        conn.commit()
 
 def update_achievements(player_id, total_leagues_won, total_cups_won):
     st.write(f"🔍 Updating achievements for player_id: {player_id}")
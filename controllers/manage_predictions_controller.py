@@ -1,18 +1,16 @@
-from db import get_connection
+from db import connection
 from utils import execute_query, fetch_one, fetch_all
-from utils_prediction import calculate_prediction_score
+from scoring import score_dirty_matches, score_matches
 
 def fetch_all_players():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, username FROM players ORDER BY username")
-    rows = cursor.fetchall()
-    return [dict(zip([column[0] for column in cursor.description], row)) for row in rows]
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, username FROM players ORDER BY username")
+        rows = cursor.fetchall()
+        return [dict(zip([column[0] for column in cursor.description], row)) for row in rows]
 
 
 def fetch_grouped_matches():
-    conn = get_connection()
-    cursor = conn.cursor()
     query = """
     SELECT m.id, m.round_id, r.name AS round_name, m.league_id, l.name AS league_name,
            ht.name AS home_team_name, at.name AS away_team_name,
@@ -24,9 +22,10 @@ def fetch_grouped_matches():
     JOIN teams at ON m.away_team_id = at.id
     ORDER BY r.start_date, l.name, m.match_datetime
     """
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    matches = [dict(zip([column[0] for column in cursor.description], row)) for row in rows]
+    with connection() as conn:
+        cursor = conn.execute(query)
+        rows = cursor.fetchall()
+        matches = [dict(zip([column[0] for column in cursor.description], row)) for row in rows]
 
     grouped = {}
     for match in matches:
@@ -44,69 +43,63 @@ def fetch_grouped_matches():
 
 
 def fetch_predictions_for_player(player_id):
-    conn = get_connection()
-    cursor = conn.cursor()
     query = """
     SELECT * FROM predictions WHERE player_id = ?
     """
-    cursor.execute(query, (player_id,))
-    rows = cursor.fetchall()
-    return [dict(zip([column[0] for column in cursor.description], row)) for row in rows]
+    with connection() as conn:
+        cursor = conn.execute(query, (player_id,))
+        rows = cursor.fetchall()
+        return [dict(zip([column[0] for column in cursor.description], row)) for row in rows]
 
 
 def upsert_prediction(player_id, match_id, predicted_home_score, predicted_away_score, predicted_penalty_winner):
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    # Check if exists
-    cursor.execute("SELECT id FROM predictions WHERE player_id = ? AND match_id = ?", (player_id, match_id))
-    exists = cursor.fetchone()
-
-    if exists:
-        query = """
-        UPDATE predictions
-        SET predicted_home_score = ?, predicted_away_score = ?, predicted_penalty_winner = ?
-        WHERE player_id = ? AND match_id = ?;
-
-        """
-        cursor.execute(query, (predicted_home_score, predicted_away_score, predicted_penalty_winner, player_id, match_id))
-    else:
-        query = """
-        INSERT INTO predictions (player_id, match_id, predicted_home_score, predicted_away_score, predicted_penalty_winner)
-        VALUES (?, ?, ?, ?, ?)
-        """
-        cursor.execute(query, (player_id, match_id, predicted_home_score, predicted_away_score, predicted_penalty_winner))
-    
-    conn.commit()
-    conn.close()
-    
+    with connection() as conn:
+        cursor = conn.cursor()
+
+        # Check if exists
+        cursor.execute("SELECT id FROM predictions WHERE player_id = ? AND match_id = ?", (player_id, match_id))
+        exists = cursor.fetchone()
+
+        if exists:
+            query = """
+            UPDATE predictions
+            SET predicted_home_score = ?, predicted_away_score = ?, predicted_penalty_winner = ?
+            WHERE player_id = ? AND match_id = ?;
+
+            """
+            cursor.execute(query, (predicted_home_score, predicted_away_score, predicted_penalty_winner, player_id, match_id))
+        else:
+            query = """
+            INSERT INTO predictions (player_id, match_id, predicted_home_score, predicted_away_score, predicted_penalty_winner)
+            VALUES (?, ?, ?, ?, ?)
+            """
+            cursor.execute(query, (player_id, match_id, predicted_home_score, predicted_away_score, predicted_penalty_winner))
+
+        conn.commit()
+
 def update_scores_for_match(match_id):
-    # Get match details
-    match_query = "SELECT * FROM matches WHERE id = ?;"
-    match_row = fetch_one(match_query, (match_id,))
-    
-    if not match_row or match_row['home_score'] is None or match_row['away_score'] is None:
-        return  # Match not finished
+    """Rescore every prediction for one match; see update_scores_for_matches."""
+    return update_scores_for_matches([match_id])
 
-    match = dict(match_row)  # Convert sqlite3.Row to a mutable dictionary
 
-    # Optional: add penalty winner info if needed
-    match['must_have_winner'] = 1  # <- Get from leagues if needed
-    match['can_be_draw'] = 0       # <- same
-    #match['actual_penalty_winner'] = fetch_actual_penalty_winner(match_id)  # implement if needed
+def update_scores_for_matches(match_ids=None):
+    """
+    Rescore predictions for many matches at once (all matches when None).
+    Unfinished matches are skipped. Returns how many prediction scores changed.
+    """
+    with connection() as conn:
+        return score_matches(conn, match_ids)
 
-    # Get all predictions for that match
-    pred_query = "SELECT * FROM predictions WHERE match_id = ?;"
-    predictions = fetch_all(pred_query, (match_id,))
 
-    for pred in predictions:
-        score = calculate_prediction_score(match, pred)
-        update_query = "UPDATE predictions SET score = ? WHERE id = ?;"
-        execute_query(update_query, (score, pred['id']))
+def update_scores_for_dirty_matches():
+    """
+    Rescore only matches whose result or predictions changed since they were
+    last scored. Returns (scored, skipped, changed).
+    """
+    with connection() as conn:
+        return score_dirty_matches(conn)
 
 def fetch_match_by_id(match_id):
-    conn = get_connection()
-    cursor = conn.cursor()
     query = """
     SELECT m.*, 
            ht.name AS home_team_name,
@@ -116,8 +109,9 @@ def fetch_match_by_id(match_id):
     JOIN teams at ON m.away_team_id = at.id
     WHERE m.id = ?
     """
-    cursor.execute(query, (match_id,))
-    row = cursor.fetchone()
-    if row:
-        return dict(zip([column[0] for column in cursor.description], row))
+    with connection() as conn:
+        cursor = conn.execute(query, (match_id,))
+        row = cursor.fetchone()
+        if row:
+            return dict(zip([column[0] for column in cursor.description], row))
     return None
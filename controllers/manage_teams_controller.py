@@ -1,7 +1,8 @@
 import os
 from typing import List, Dict
-from db import get_connection
+from db import connection
 import sqlite3
+from asset_store import store_upload
 from controllers.manage_leagues_controller import (
     save_uploaded_file,get_leagues,add_league, 
     update_league, delete_league
@@ -12,43 +13,30 @@ LOGO_DIR = "assets/teams"
 os.makedirs(LOGO_DIR, exist_ok=True)
 
 def save_uploaded_file(uploaded_file, upload_folder=LOGO_DIR):
-    if uploaded_file is None:
-        return None
-
-    os.makedirs(upload_folder, exist_ok=True)
-    file_path = os.path.join(upload_folder, uploaded_file.name)
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.read())
-
-    # Fix path: convert backslashes to slashes and add 'assets/' prefix
-    relative_path = os.path.relpath(file_path, start="assets")
-    normalized_path = f"assets/{relative_path.replace(os.sep, '/')}"
-    return normalized_path
+    # Logos now live in the content-addressed asset store; upload_folder is kept for old callers
+    return store_upload(uploaded_file)
 
 
 
 def execute_query(query, params=(), fetch_all=False, commit=False, return_lastrowid=False):
-    conn = get_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute(query, params)
+    with connection() as conn:
+        cursor = conn.execute(query, params)
 
-    result = None
-    if fetch_all:
-        result = [dict(row) for row in cursor.fetchall()]
-    elif cursor.description is not None:
-        fetched = cursor.fetchone()
-        result = dict(fetched) if fetched else None
+        result = None
+        if fetch_all:
+            result = [dict(row) for row in cursor.fetchall()]
+        elif cursor.description is not None:
+            fetched = cursor.fetchone()
+            result = dict(fetched) if fetched else None
 
-    if commit:
-        conn.commit()
+        if commit:
+            conn.commit()
 
-    if return_lastrowid:
-        result = cursor.lastrowid
+        if return_lastrowid:
+            result = cursor.lastrowid
 
-    cursor.close()
-    conn.close()
-    return result
+        cursor.close()
+        return result
 
 
 def get_leagues_map():
@@ -114,17 +102,15 @@ def update_team(team_id, name, league_ids, logo_file=None, nationality="Europe",
 
 
 def delete_team(team_id: int) -> bool:
-    conn = get_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM teams WHERE id = ?", (team_id,))
-        conn.commit()
-        return cursor.rowcount > 0
-    except Exception as e:
-        print(f"[delete_team error] {e}")
-        return False
-    finally:
-        conn.close()
+    with connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM teams WHERE id = ?", (team_id,))
+            conn.commit()
+            return cursor.rowcount > 0
+        except Exception as e:
+            print(f"[delete_team error] {e}")
+            return False
 
 def get_team_by_id(team_id, conn):
     # Get basic team info
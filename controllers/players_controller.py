@@ -1,45 +1,44 @@
 import sqlite3
-from db import get_connection  
+from db import connection
 import bcrypt
 from PIL import Image
-from utils import fetch_one, fetch_all
+from utils import fetch_one, fetch_all, hash_password
+from thumbnails import invalidate_thumbnails, warm_thumbnails
 import os
 
 def get_player_info(player_id):
-    conn = get_connection()
-    cur = conn.cursor()
-    
-    # Fetch player info + achievements using LEFT JOIN in case no achievements exist
-    cur.execute("""
-        SELECT 
-            players.id, 
-            players.username, 
-            players.email, 
-            players.avatar_path, 
-            players.created_at,
-            (SELECT COALESCE(SUM(score), 0) FROM predictions WHERE player_id = players.id) AS total_points,
-            COALESCE(achievements.total_leagues_won, 0),
-            COALESCE(achievements.total_cups_won, 0)
-        FROM players
-        LEFT JOIN achievements ON players.id = achievements.player_id
-        WHERE players.id = ?
-    """, (player_id,))
-    
-    row = cur.fetchone()
-    conn.close()
+    with connection() as conn:
+        cur = conn.cursor()
+
+        # Points and rank come from the materialized player_standings table
+        cur.execute("""
+            SELECT 
+                players.id, 
+                players.username, 
+                players.email, 
+                players.avatar_path, 
+                players.created_at,
+                COALESCE(ps.total_points, 0),
+                COALESCE(achievements.total_leagues_won, 0),
+                COALESCE(achievements.total_cups_won, 0),
+                ps.rank
+            FROM players
+            LEFT JOIN player_standings ps ON ps.player_id = players.id
+            LEFT JOIN achievements ON players.id = achievements.player_id
+            WHERE players.id = ?
+        """, (player_id,))
+
+        row = cur.fetchone()
 
     if not row:
         return None
 
-    # Fetch full leaderboard and determine rank
-    leaderboard = fetch_all("""
-        SELECT id, 
-               (SELECT COALESCE(SUM(score), 0) FROM predictions WHERE player_id = players.id) AS total_points
-        FROM players
-        ORDER BY total_points DESC
-    """)
-
-    rank = next((index + 1 for index, entry in enumerate(leaderboard) if entry[0] == player_id), None)
+    rank = row[8]
+    if rank is None:
+        # Ranks are refreshed per scoring batch; a brand-new player has none yet
+        rank = fetch_one("""
+            SELECT COUNT(DISTINCT total_points) + 1 FROM player_standings WHERE total_points > ?
+        """, (row[5],))[0]
 
     return {
         "id": row[0],
@@ -56,8 +55,6 @@ def get_player_info(player_id):
 
 
 def update_player_info(player_id, username, email, password=None, avatar_url=None, avatar_path=None):
-    conn = get_connection()
-    cur = conn.cursor()
     try:
         fields, params = [], []
         fields.append("username = ?");   params.append(username)
@@ -73,35 +70,35 @@ def update_player_info(player_id, username, email, password=None, avatar_url=Non
 
         sql = f"UPDATE players SET {', '.join(fields)} WHERE id = ?"
         params.append(player_id)
-        cur.execute(sql, params)
-        conn.commit()
+        # An uncommitted update is rolled back when the connection goes back to the pool
+        with connection() as conn:
+            conn.execute(sql, params)
+            conn.commit()
         return True
     except Exception as e:
         print("❌ update_player_info error:", e)
-        conn.rollback()
         return False
-    finally:
-        conn.close()
 
 
 def delete_player(player_id):
-    conn = get_connection()
-    cur = conn.cursor()
     try:
-        # Get avatar path from DB
-        cur.execute("SELECT avatar_path FROM players WHERE id = ?", (player_id,))
-        row = cur.fetchone()
-        avatar_path = row[0] if row else None
+        with connection() as conn:
+            cur = conn.cursor()
+            # Get avatar path from DB
+            cur.execute("SELECT avatar_path FROM players WHERE id = ?", (player_id,))
+            row = cur.fetchone()
+            avatar_path = row[0] if row else None
 
-        # Delete player from DB
-        cur.execute("DELETE FROM players WHERE id = ?", (player_id,))
-        conn.commit()
+            # Delete player from DB
+            cur.execute("DELETE FROM players WHERE id = ?", (player_id,))
+            conn.commit()
 
         # Normalize path and delete image
         if avatar_path:
             normalized_path = os.path.normpath(avatar_path)
             if os.path.exists(normalized_path):
                 os.remove(normalized_path)
+                invalidate_thumbnails(normalized_path)
                 print(f"✅ Deleted avatar: {normalized_path}")
             else:
                 print(f"❌ Avatar path does not exist: {normalized_path}")
@@ -110,15 +107,10 @@ def delete_player(player_id):
     except Exception as e:
         print("Error deleting player:", e)
         return False
-    finally:
-        conn.close()
 
 def get_player_id_by_username(username):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM players WHERE username = ?", (username,))
-    row = cur.fetchone()
-    conn.close()
+    with connection() as conn:
+        row = conn.execute("SELECT id FROM players WHERE username = ?", (username,)).fetchone()
     if row:
         return row[0]
     return None
@@ -151,17 +143,15 @@ def save_avatar_image(player_id, image):
             f.write(image)
     else:
         raise ValueError("Unsupported image type")
+    invalidate_thumbnails(save_path)
+    warm_thumbnails(save_path)
 
     # Normalize path for DB storage
     normalized_path = save_path.replace("\\", "/")
 
     # ✅ Update the DB
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("UPDATE players SET avatar_path = ? WHERE id = ?", (normalized_path, player_id))
+    with connection() as conn:
+        conn.execute("UPDATE players SET avatar_path = ? WHERE id = ?", (normalized_path, player_id))
         conn.commit()
-    finally:
-        conn.close()
 
     return normalized_path
@@ -4,7 +4,9 @@ import pytz  # if you're using timezone-aware times
 import streamlit as st
 import sqlite3
 from utils import fetch_one, execute_query, fetch_all
-from db import get_connection
+from db import connection
+from round_calendar import DEADLINE_MARGIN, get_round_calendar
+from data_version import cached_section
 
 # Functions resposilbe for deadline
 # Define your timezone once globally
@@ -18,77 +20,12 @@ local_tz = ZoneInfo("Africa/Cairo")
 
 def get_next_round_info():
     now_utc = datetime.now(timezone.utc)
-    now_local = now_utc.astimezone(local_tz)
-
-    # Step 1: Try current round
-    current_round = fetch_one("""
-        SELECT *
-        FROM rounds
-        WHERE DATE(start_date) <= DATE(?) AND DATE(end_date) >= DATE(?)
-        ORDER BY DATE(start_date)
-        LIMIT 1
-    """, (now_local.date().isoformat(), now_local.date().isoformat()))
-
-    if current_round:
-        round_id = current_round["id"]
-        round_name = current_round["name"]
-
-        match = fetch_one("""
-            SELECT *
-            FROM matches
-            WHERE round_id = ?
-            ORDER BY match_datetime
-            LIMIT 1
-        """, (round_id,))
-
-        if match:
-            first_match_local = datetime.fromisoformat(match["match_datetime"]).replace(tzinfo=local_tz)
-            first_match_utc = first_match_local.astimezone(timezone.utc)
-            deadline_utc = first_match_utc - timedelta(hours=2)
-
-            if deadline_utc > now_utc:
-                match_time_local = first_match_utc.astimezone(local_tz)
-
-                match_count = fetch_one("""
-                    SELECT COUNT(*) AS count FROM matches WHERE round_id = ?
-                """, (round_id,))["count"]
-
-                return round_name, deadline_utc, match_time_local, match_count
-
-    # Step 2: Try the next round
-    next_round = fetch_one("""
-        SELECT *
-        FROM rounds
-        WHERE DATE(start_date) > DATE(?)
-        ORDER BY DATE(start_date)
-        LIMIT 1
-    """, (now_local.date().isoformat(),))
-
-    if next_round:
-        round_id = next_round["id"]
-        round_name = next_round["name"]
-
-        match = fetch_one("""
-            SELECT *
-            FROM matches
-            WHERE round_id = ?
-            ORDER BY match_datetime
-            LIMIT 1
-        """, (round_id,))
-
-        if match:
-            first_match_local = datetime.fromisoformat(match["match_datetime"]).replace(tzinfo=local_tz)
-            first_match_utc = first_match_local.astimezone(timezone.utc)
-            deadline_utc = first_match_utc - timedelta(hours=2)
-
-            if deadline_utc > now_utc:
-                match_time_local = first_match_utc.astimezone(local_tz)
-
-                match_count = fetch_one("""
-                    SELECT COUNT(*) AS count FROM matches WHERE round_id = ?
-                """, (round_id,))["count"]
 
-                return round_name, deadline_utc, match_time_local, match_count
+    # Current round if its deadline is still ahead, otherwise the next one
+    open_round = get_round_calendar().open_round(now_utc)
+    if open_round:
+        match_time_local = open_round["first_kickoff_utc"].astimezone(local_tz)
+        return open_round["name"], open_round["deadline_utc"], match_time_local, open_round["match_count"]
 
     return None, None, None, 0
 
@@ -114,30 +51,15 @@ def format_time_left(deadline_utc):
         return f"{days} day(s) left", "📅"
 
 def get_predicted_match_count(round_name, player_id):
-    # Step 1: Get round_id from round name
-    round_query = "SELECT id FROM rounds WHERE name = ?"
-    round_result = fetch_one(round_query, (round_name,))
-    if not round_result:
-        return 0  # Round not found
-
-    round_id = round_result[0]
-
-    # Step 2: Get all match_ids from this round
-    match_ids_query = "SELECT id FROM matches WHERE round_id = ?"
-    match_ids_result = fetch_all(match_ids_query, (round_id,))
-    if not match_ids_result:
-        return 0  # No matches in this round
-
-    match_ids = [row[0] for row in match_ids_result]
-
-    # Step 3: Count predictions made by this player for matches in this round
-    placeholders = ','.join('?' for _ in match_ids)
-    prediction_query = f"""
-        SELECT COUNT(*) FROM predictions 
-        WHERE player_id = ? AND match_id IN ({placeholders})
+    query = """
+        SELECT COUNT(p.id)
+        FROM rounds r
+        JOIN matches m ON m.round_id = r.id
+        JOIN predictions p ON p.match_id = m.id AND p.player_id = ?
+        WHERE r.name = ?
     """
-    prediction_result = fetch_one(prediction_query, (player_id, *match_ids))
-    return prediction_result[0] if prediction_result else 0
+    result = fetch_one(query, (player_id, round_name))
+    return result[0] if result else 0
 
 
 # functions responsible for fetching matches and rounds
@@ -149,31 +71,29 @@ def get_round_id_by_name(round_name):
     return fetch_one("SELECT id FROM rounds WHERE name = ?", (round_name,))[0]
 
 def get_matches_by_round(round_id):
-    conn = get_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        SELECT matches.*,
-               home_team.name AS home_team_name,
-               away_team.name AS away_team_name,
-               leagues.name AS league_name,
-               stages.name AS stage_name
-        FROM matches
-        JOIN teams AS home_team ON matches.home_team_id = home_team.id
-        JOIN teams AS away_team ON matches.away_team_id = away_team.id
-        JOIN leagues ON matches.league_id = leagues.id
-        LEFT JOIN stages ON matches.stage_id = stages.id
-        WHERE matches.round_id = ?
-        ORDER BY leagues.name ASC, match_datetime ASC
-        """, (round_id,)
-    )
-
-    rows = cursor.fetchall()
-    columns = [col[0] for col in cursor.description]
+    with connection() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            SELECT matches.*,
+                   home_team.name AS home_team_name,
+                   away_team.name AS away_team_name,
+                   leagues.name AS league_name,
+                   stages.name AS stage_name
+            FROM matches
+            JOIN teams AS home_team ON matches.home_team_id = home_team.id
+            JOIN teams AS away_team ON matches.away_team_id = away_team.id
+            JOIN leagues ON matches.league_id = leagues.id
+            LEFT JOIN stages ON matches.stage_id = stages.id
+            WHERE matches.round_id = ?
+            ORDER BY leagues.name ASC, match_datetime ASC
+            """, (round_id,)
+        )
+
+        rows = cursor.fetchall()
+        columns = [col[0] for col in cursor.description]
 
-    conn.close()
     return [dict(zip(columns, row)) for row in rows]
 
 
@@ -293,36 +213,100 @@ def get_match_timing_display(match_datetime_str, status):
     
 import sqlite3
 
+def _player_names():
+    return {row["id"]: row["username"] for row in fetch_all("SELECT id, username FROM players")}
+
 def get_player_name(player_id):
-    conn = get_connection()
-    cursor = conn.cursor()
+    # One id -> username map per players version, shared by every session
+    return cached_section("player_names", None, ("players",), _player_names).get(player_id, "Unknown Player")
+
+def get_prediction_deadline_for_round(round_id):
+    round_info = get_round_calendar().by_id(round_id)
+    return round_info["deadline_utc"] if round_info else None
+
+def deadline_from_first_kickoff(match_datetime):
+    # Assume match_datetime is stored in Cairo local time
+    earliest_match_local = datetime.fromisoformat(match_datetime).replace(tzinfo=local_tz)
+    return earliest_match_local.astimezone(timezone.utc) - DEADLINE_MARGIN
+
+
+ROUND_VIEW_QUERY = """
+    SELECT m.*,
+           ht.name AS home_team_name, ht.logo_path AS home_logo,
+           at.name AS away_team_name, at.logo_path AS away_logo,
+           l.name AS league_name,
+           s.name AS stage_name, s.can_be_draw, s.must_have_winner, s.two_legs,
+           t.id AS tie_id, t.first_leg_match_id, t.second_leg_match_id,
+           p.predicted_home_score, p.predicted_away_score,
+           p.predicted_penalty_winner, p.score AS prediction_score,
+           p.id AS prediction_id,
+           MIN(m.match_datetime) OVER () AS first_kickoff
+    FROM matches m
+    JOIN teams ht ON ht.id = m.home_team_id
+    JOIN teams at ON at.id = m.away_team_id
+    JOIN leagues l ON l.id = m.league_id
+    LEFT JOIN stages s ON s.id = m.stage_id
+    LEFT JOIN two_legged_ties t ON t.id = (
+        SELECT id FROM two_legged_ties
+        WHERE first_leg_match_id = m.id OR second_leg_match_id = m.id
+        LIMIT 1
+    )
+    LEFT JOIN predictions p ON p.match_id = m.id AND p.player_id = ?
+    WHERE m.round_id = ?
+    ORDER BY l.name ASC, m.match_datetime ASC
+"""
+
+def load_round_view(round_id, player_id):
+    """
+    Everything the per-player round page needs, in two queries.
 
-    cursor.execute("SELECT username FROM players WHERE id = ?", (player_id,))
-    result = cursor.fetchone()
+    Returns {"round_id", "player_name", "deadline_utc", "matches", "predictions"}.
+    Each match dict carries its team names/logos, league and stage flags and
+    `tie` (first/second leg ids or None); `predictions` maps match id to this
+    player's prediction.
+    """
+    rows = fetch_all(ROUND_VIEW_QUERY, (player_id, round_id))
+
+    matches, predictions = [], {}
+    for row in rows:
+        match = dict(row)
+        if match.pop("tie_id") is not None:
+            match["tie"] = {
+                "first_leg_match_id": match["first_leg_match_id"],
+                "second_leg_match_id": match["second_leg_match_id"],
+            }
+        else:
+            match["tie"] = None
+        if match.pop("prediction_id") is not None:
+            predictions[match["id"]] = {
+                "predicted_home_score": match["predicted_home_score"],
+                "predicted_away_score": match["predicted_away_score"],
+                "score": match["prediction_score"],
+                "predicted_penalty_winner": match["predicted_penalty_winner"],
+            }
+        for key in ("first_leg_match_id", "second_leg_match_id", "predicted_home_score",
+                    "predicted_away_score", "predicted_penalty_winner", "prediction_score", "first_kickoff"):
+            match.pop(key)
+        matches.append(match)
+
+    first_kickoff = rows[0]["first_kickoff"] if rows else None
+    return {
+        "round_id": round_id,
+        "player_name": get_player_name(player_id),
+        "deadline_utc": deadline_from_first_kickoff(first_kickoff) if first_kickoff else None,
+        "matches": matches,
+        "predictions": predictions,
+    }
 
-    conn.close()
 
-    if result:
-        return result[0]
-    return "Unknown Player"
+ROUND_LIVE_QUERY = """
+    SELECT m.id, m.status, m.home_score, m.away_score, m.penalty_winner,
+           p.score AS prediction_score
+    FROM matches m
+    LEFT JOIN predictions p ON p.match_id = m.id AND p.player_id = ?
+    WHERE m.round_id = ?
+"""
 
-def get_prediction_deadline_for_round(round_id):
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT MIN(match_datetime)
-        FROM matches
-        WHERE round_id = ?
-    """, (round_id,))
-
-    result = cursor.fetchone()
-    conn.close()
-
-    if result and result[0]:
-        # Assume match_datetime is stored in Cairo local time
-        earliest_match_local = datetime.fromisoformat(result[0]).replace(tzinfo=local_tz)
-        deadline_utc = earliest_match_local.astimezone(timezone.utc) - timedelta(hours=2)
-        return deadline_utc
-    else:
-        return None
+def load_round_live(round_id, player_id):
+    """{match id: status, scores, penalty winner and this player's prediction score} for a round."""
+    return {row["id"]: dict(row) for row in fetch_all(ROUND_LIVE_QUERY, (player_id, round_id))}
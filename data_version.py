@@ -0,0 +1,193 @@
+# data_version.py
+"""
+Data versions for skipping work on reruns.
+
+Triggers bump a per-table counter in `data_versions` on every insert,
+update and delete on the game tables (DATA_VERSION_TABLES), so one
+cheap query tells whether anything a page shows has changed, whichever
+process made the write. The counters are read at most once every
+DATA_VERSION_MAX_AGE seconds per process (sooner after a local commit to
+one of the tables), and a counter that moved because of another process
+also invalidates that table in the query cache.
+
+cached_section() keeps a page section's computed payload until the
+versions of the tables it reads move; refresh_interval_ms() tells the
+self-refreshing widgets how often to tick.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from db import connection
+from query_cache import get_cache
+from round_calendar import get_round_calendar
+
+DATA_VERSION_TABLES = (
+    "players", "rounds", "matches", "predictions", "legs", "two_legged_ties",
+    "teams", "leagues", "stages", "player_standings", "achievements",
+)
+DATA_VERSION_MAX_AGE = float(os.getenv("DATA_VERSION_MAX_AGE", "1"))
+SECTION_CACHE_SIZE = int(os.getenv("SECTION_CACHE_SIZE", "256"))
+
+# Refresh interval while matches are live or a kickoff/deadline is near, and otherwise
+REFRESH_LIVE_MS = int(os.getenv("REFRESH_LIVE_MS", "5000"))
+REFRESH_IDLE_MS = int(os.getenv("REFRESH_IDLE_MS", "60000"))
+REFRESH_SOON_MINUTES = float(os.getenv("REFRESH_SOON_MINUTES", "60"))
+
+local_tz = ZoneInfo("Africa/Cairo")
+
+
+def create_data_version_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS data_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for table in DATA_VERSION_TABLES:
+        if table not in existing:
+            continue
+        conn.execute("INSERT OR IGNORE INTO data_versions (table_name) VALUES (?)", (table,))
+        for op in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_data_version_{table}_{op.lower()}
+                AFTER {op} ON {table}
+                BEGIN
+                    UPDATE data_versions SET version = version + 1 WHERE table_name = '{table}';
+                END
+            """)
+
+
+# ---------- reading versions ----------
+
+_lock = threading.Lock()
+_versions = None
+_token = None
+_read_at = 0.0
+
+
+def current_versions():
+    """{table: version}, shared by every session in the process."""
+    global _versions, _token, _read_at
+    token = get_cache().generations(DATA_VERSION_TABLES)
+    with _lock:
+        if (_versions is not None and token == _token
+                and time.monotonic() - _read_at < DATA_VERSION_MAX_AGE):
+            return _versions
+
+    with connection() as conn:
+        versions = dict(conn.execute("SELECT table_name, version FROM data_versions").fetchall())
+
+    with _lock:
+        previous = _versions
+        moved = [t for t, v in versions.items() if previous is not None and previous.get(t) != v]
+    if moved:
+        # Includes other processes' writes, which the query cache can't see itself
+        get_cache().invalidate(moved)
+        if any(versions[t] < previous.get(t, 0) for t in moved):
+            _sections.clear()  # counters went back (e.g. a restored snapshot)
+
+    with _lock:
+        _versions, _read_at = versions, time.monotonic()
+        _token = get_cache().generations(DATA_VERSION_TABLES)
+    return versions
+
+
+def data_version(tables=DATA_VERSION_TABLES):
+    """Global data version: grows whenever any of `tables` is written."""
+    versions = current_versions()
+    return sum(versions.get(t, 0) for t in tables)
+
+
+# ---------- section cache ----------
+
+class SectionCache:
+    def __init__(self, max_entries=SECTION_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (name, key) -> (versions, value)
+        self._stats = {}               # name -> {"hits", "misses"}
+
+    def get_or_load(self, name, key, tables, loader):
+        versions = current_versions()
+        token = tuple(versions.get(t, 0) for t in tables)
+        cache_key = (name, key)
+        with self._lock:
+            stats = self._stats.setdefault(name, {"hits": 0, "misses": 0})
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[0] == token:
+                self._entries.move_to_end(cache_key)
+                stats["hits"] += 1
+                return entry[1]
+            stats["misses"] += 1
+
+        value = loader()
+
+        with self._lock:
+            self._entries[cache_key] = (token, value)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            rows = [{"section": name, **counts} for name, counts in self._stats.items()]
+            size = len(self._entries)
+        return {"entries": size, "max_entries": self.max_entries, "sections": rows}
+
+
+_sections = SectionCache()
+
+
+def cached_section(name, key, tables, loader):
+    """
+    loader()'s result for section `name` and `key` (e.g. a player id),
+    recomputed only when one of `tables` changed. The value is shared
+    between sessions, so callers must not mutate it.
+    """
+    return _sections.get_or_load(name, key, tables, loader)
+
+
+def section_cache_stats():
+    return {**_sections.stats(), "data_version": data_version()}
+
+
+# ---------- adaptive refresh ----------
+
+REFRESH_STATE_QUERY = """
+    SELECT EXISTS (SELECT 1 FROM matches WHERE status = 'live') AS live,
+           (SELECT MIN(match_datetime) FROM matches WHERE status = 'upcoming') AS next_kickoff
+"""
+
+
+def _refresh_state():
+    with connection() as conn:
+        row = conn.execute(REFRESH_STATE_QUERY).fetchone()
+    return bool(row["live"]), row["next_kickoff"]
+
+
+def refresh_interval_ms(now_utc=None):
+    """REFRESH_LIVE_MS while a match is live or a kickoff or prediction deadline is near, else REFRESH_IDLE_MS."""
+    now_utc = now_utc or datetime.now(timezone.utc)
+    live, next_kickoff = cached_section("refresh_state", None, ("matches",), _refresh_state)
+    if live:
+        return REFRESH_LIVE_MS
+
+    soon = now_utc + timedelta(minutes=REFRESH_SOON_MINUTES)
+    if next_kickoff:
+        kickoff_utc = datetime.fromisoformat(next_kickoff).replace(tzinfo=local_tz).astimezone(timezone.utc)
+        if kickoff_utc <= soon:
+            return REFRESH_LIVE_MS
+    open_round = get_round_calendar().open_round(now_utc)
+    if open_round and open_round["deadline_utc"] and open_round["deadline_utc"] <= soon:
+        return REFRESH_LIVE_MS
+    return REFRESH_IDLE_MS
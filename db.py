@@ -1,6 +1,10 @@
 # db.py
 import os
 import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,7 +12,376 @@ load_dotenv()
 DB_FILE = os.getenv("DB_FILE", "game_database.db")
 DB_PASSWORD = os.getenv("DB_PASSWORD", None)  # we won't use it in sqlite for now
 
-def get_connection():
-    conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
+# Upper bound on open connections per process and how long a checkout may
+# block waiting for one to be released before giving up.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+
+# Pragmas applied to every new connection. WAL lets the autorefresh readers
+# keep going while a writer commits; busy_timeout makes writers queue on the
+# lock instead of failing with "database is locked".
+DB_PROFILE = {
+    "journal_mode": os.getenv("DB_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("DB_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size": int(os.getenv("DB_CACHE_SIZE", "-16000")),  # negative = KiB
+    "mmap_size": int(os.getenv("DB_MMAP_SIZE", str(64 * 1024 * 1024))),
+    "temp_store": os.getenv("DB_TEMP_STORE", "MEMORY"),
+}
+# Apply pending migrations (migrations.py) when the pool is first created.
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "1") == "1"
+# Seconds between passive WAL checkpoints run by the pool on release.
+DB_CHECKPOINT_INTERVAL = float(os.getenv("DB_CHECKPOINT_INTERVAL", "60"))
+
+# The rollback-journal defaults, kept for comparison benchmarks.
+LEGACY_PROFILE = {
+    "journal_mode": "DELETE",
+    "synchronous": "FULL",
+    "busy_timeout": 5000,  # sqlite3.connect()'s default 5 s timeout
+    "cache_size": -2000,
+    "mmap_size": 0,
+    "temp_store": "DEFAULT",
+}
+
+_PROFILE_ORDER = ("busy_timeout", "journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store")
+
+
+def apply_profile(conn, profile=None):
+    """Apply a pragma profile (DB_PROFILE by default) to an open connection."""
+    profile = DB_PROFILE if profile is None else profile
+    for pragma in _PROFILE_ORDER:
+        if pragma in profile and profile[pragma] is not None:
+            conn.execute(f"PRAGMA {pragma} = {profile[pragma]}")
     return conn
+
+
+def checkpoint(conn, mode="PASSIVE"):
+    """Run a WAL checkpoint; returns (busy, wal_pages, checkpointed_pages)."""
+    return tuple(conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone())
+
+
+_commit_listeners = []
+
+
+def add_commit_listener(listener):
+    """
+    Call `listener(conn)` after every commit on a pooled connection, and
+    again when the connection is released (which also catches `with conn:`
+    commits that bypass commit()).
+    """
+    _commit_listeners.append(listener)
+
+
+def _notify_commit(conn):
+    for listener in _commit_listeners:
+        try:
+            listener(conn)
+        except Exception as e:
+            print(f"[db] commit listener failed: {e}")
+
+
+_statement_listeners = []
+
+
+def add_statement_listener(listener):
+    """
+    Call `listener(conn, sql)` before every statement run on a pooled
+    connection, whether through the connection or one of its cursors.
+    """
+    _statement_listeners.append(listener)
+
+
+def _notify_statement(conn, sql):
+    for listener in _statement_listeners:
+        try:
+            listener(conn, sql)
+        except Exception as e:
+            print(f"[db] statement listener failed: {e}")
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Raised when no pooled connection became available in time."""
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3 connection owned by a ConnectionPool.
+
+    close() hands the connection back to its pool instead of closing the file,
+    so existing `conn = get_connection() ... conn.close()` code keeps working.
+    Every statement and commit is reported to the registered listeners.
+    """
+
+    pool = None
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or PooledCursor)
+
+    def execute(self, sql, *args):
+        _notify_statement(self, sql)
+        return super().execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        _notify_statement(self, sql)
+        return super().executemany(sql, *args)
+
+    def executescript(self, script):
+        _notify_statement(self, script)
+        return super().executescript(script)
+
+    def commit(self):
+        super().commit()
+        _notify_commit(self)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            super().close()
+
+    def close_physical(self):
+        super().close()
+
+
+class PooledCursor(sqlite3.Cursor):
+    """Cursor of a PooledConnection; reports its statements like the connection does."""
+
+    def execute(self, sql, *args):
+        _notify_statement(self.connection, sql)
+        return super().execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        _notify_statement(self.connection, sql)
+        return super().executemany(sql, *args)
+
+    def executescript(self, script):
+        _notify_statement(self.connection, script)
+        return super().executescript(script)
+
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections with per-thread reuse.
+
+    A thread that checks out a connection keeps getting the same one for
+    nested checkouts until the outermost checkout is released; released
+    connections go back to an idle list and are reused by any thread.
+    """
+
+    def __init__(self, db_file=DB_FILE, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT,
+                 profile=None, checkpoint_interval=DB_CHECKPOINT_INTERVAL):
+        self.db_file = db_file
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.profile = DB_PROFILE if profile is None else profile
+        self.checkpoint_interval = checkpoint_interval
+        self._last_checkpoint = time.monotonic()
+        self._local = threading.local()
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._owners = {}  # connection -> owning thread
+        self._created = 0
+        self._closed = False
+        self._stats = {
+            "hits": 0,          # checkout served by a thread-local or idle connection
+            "misses": 0,        # checkout had to open a new connection
+            "waits": 0,         # checkout blocked because the pool was exhausted
+            "wait_time": 0.0,   # total seconds spent blocked
+            "timeouts": 0,
+            "reclaimed": 0,     # connections recovered from dead threads
+            "checkpoints": 0,
+        }
+
+    # ---------- connection lifecycle ----------
+
+    def _open(self):
+        busy_seconds = (self.profile.get("busy_timeout") or 0) / 1000
+        conn = sqlite3.connect(
+            self.db_file, timeout=busy_seconds, check_same_thread=False, factory=PooledConnection
+        )
+        conn.row_factory = sqlite3.Row
+        apply_profile(conn, self.profile)
+        conn.pool = self
+        return conn
+
+    def _checkpoint_due(self):
+        # Called with the lock held; claims the next checkpoint slot.
+        if not self.checkpoint_interval:
+            return False
+        if time.monotonic() - self._last_checkpoint < self.checkpoint_interval:
+            return False
+        self._last_checkpoint = time.monotonic()
+        return True
+
+    def _run_checkpoint(self, conn):
+        try:
+            checkpoint(conn)
+            with self._cond:
+                self._stats["checkpoints"] += 1
+        except sqlite3.Error as e:
+            print(f"[db] WAL checkpoint failed: {e}")
+
+    def _reclaim_dead_owners(self):
+        # Connections checked out by threads that exited without closing them
+        # (e.g. a finished Streamlit script run) are returned to the idle list.
+        for conn, thread in list(self._owners.items()):
+            if not thread.is_alive():
+                del self._owners[conn]
+                self._reset(conn)
+                self._idle.append(conn)
+                self._stats["reclaimed"] += 1
+
+    @staticmethod
+    def _reset(conn):
+        if conn.in_transaction:
+            conn.rollback()
+
+    def acquire(self):
+        local = self._local
+        conn = getattr(local, "conn", None)
+        if conn is not None:
+            local.depth += 1
+            with self._cond:
+                self._stats["hits"] += 1
+            return conn
+
+        with self._cond:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Connection pool is closed.")
+
+            started = None
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    self._stats["hits"] += 1
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    self._stats["misses"] += 1
+                    conn = None
+                    break
+                self._reclaim_dead_owners()
+                if self._idle:
+                    continue
+
+                if started is None:
+                    started = time.monotonic()
+                    self._stats["waits"] += 1
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._stats["wait_time"] += time.monotonic() - started
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(f"No database connection available after {self.timeout}s.")
+                self._cond.wait(remaining)
+
+            if started is not None:
+                self._stats["wait_time"] += time.monotonic() - started
+
+        if conn is None:
+            try:
+                conn = self._open()
+            except Exception:
+                with self._cond:
+                    self._created -= 1
+                    self._cond.notify()
+                raise
+
+        with self._cond:
+            self._owners[conn] = threading.current_thread()
+        local.conn = conn
+        local.depth = 1
+        return conn
+
+    def release(self, conn):
+        local = self._local
+        if getattr(local, "conn", None) is conn:
+            local.depth -= 1
+            if local.depth > 0:
+                return
+            local.conn = None
+
+        with self._cond:
+            if self._owners.get(conn) is not threading.current_thread():
+                return  # already released, or owned by another thread
+            del self._owners[conn]
+            checkpoint_due = self._checkpoint_due()
+
+        self._reset(conn)
+        _notify_commit(conn)
+        if checkpoint_due:
+            self._run_checkpoint(conn)
+
+        with self._cond:
+            if self._closed:
+                conn.close_physical()
+                self._created -= 1
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close every idle connection and refuse new checkouts."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._idle.pop().close_physical()
+                self._created -= 1
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                **self._stats,
+                "size": self.size,
+                "open": self._created,
+                "idle": len(self._idle),
+                "in_use": len(self._owners),
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                pool = ConnectionPool()
+                if DB_AUTO_MIGRATE:
+                    from migrations import run_migrations
+                    with pool.connection() as conn:
+                        run_migrations(conn)
+                _pool = pool
+    return _pool
+
+
+def get_connection():
+    """Check out a pooled connection; call close() on it to give it back."""
+    return get_pool().acquire()
+
+
+def connection():
+    """Context manager around a pooled connection checkout."""
+    return get_pool().connection()
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def pool_stats():
+    return get_pool().stats()
@@ -0,0 +1,334 @@
+# email_outbox.py
+"""
+Persistent email outbox and pooled SMTP dispatcher.
+
+Messages are rendered up front and written to `email_outbox` in one
+transaction, one row per recipient. dispatch_outbox() then claims due rows
+in chunks and hands each chunk to one of EMAIL_WORKERS threads; every
+worker keeps its own SMTP connection open across chunks and reconnects
+after EMAIL_MESSAGES_PER_CONNECTION messages or a dropped session.
+
+Each row ends up 'sent' or 'failed'. Temporary errors are retried with
+exponential backoff (EMAIL_RETRY_BASE_SECONDS * 2**attempts) up to
+EMAIL_MAX_ATTEMPTS; a refused address fails only its own row. Rows left
+'sending' by a crashed process are picked up again once their claim is
+EMAIL_STALE_CLAIM_SECONDS old, and (batch, recipient) is unique, so
+re-enqueueing a batch never sends twice.
+
+Retries and stale claims belong to no particular caller: dispatch_outbox()
+without a batch drains everything due, and the reminder scheduler calls it
+whenever seconds_until_due() says something is waiting.
+"""
+import os
+import smtplib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from dotenv import load_dotenv
+
+from db import connection
+
+load_dotenv()
+
+SMTP_SERVER = os.getenv("SMTP_SERVER")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") == "1"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+SENDER_EMAIL = os.getenv("SENDER_EMAIL")
+SENDER_PASSWORD = os.getenv("SENDER_PASSWORD")
+
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", "4"))
+EMAIL_CHUNK_SIZE = int(os.getenv("EMAIL_CHUNK_SIZE", "50"))
+EMAIL_MESSAGES_PER_CONNECTION = int(os.getenv("EMAIL_MESSAGES_PER_CONNECTION", "500"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+# A 'sending' claim older than this belongs to a dispatcher that died.
+EMAIL_STALE_CLAIM_SECONDS = float(os.getenv("EMAIL_STALE_CLAIM_SECONDS", "600"))
+
+OUTBOX_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS email_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        batch TEXT NOT NULL,
+        recipient TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        body TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending'
+            CHECK (status IN ('pending', 'sending', 'sent', 'failed')),
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        next_attempt_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        claimed_at TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        sent_at TEXT,
+        UNIQUE (batch, recipient)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox(status, next_attempt_at)",
+]
+
+
+def create_outbox_schema(conn):
+    for statement in OUTBOX_SCHEMA:
+        conn.execute(statement)
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def enqueue_emails(batch, messages):
+    """
+    Queue [(recipient, subject, body)] under `batch` in one transaction.
+    Recipients already queued for this batch are skipped; returns how many were added.
+    """
+    rows = [(batch, recipient, subject, body) for recipient, subject, body in messages if recipient]
+    with connection() as conn:
+        before = conn.total_changes
+        conn.executemany(
+            "INSERT OR IGNORE INTO email_outbox (batch, recipient, subject, body) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        conn.commit()
+        return conn.total_changes - before
+
+
+# ---------- claiming and recording ----------
+
+def _claim(limit, batch=None):
+    now = _now()
+    stale = (datetime.now(timezone.utc) - timedelta(seconds=EMAIL_STALE_CLAIM_SECONDS)).strftime("%Y-%m-%d %H:%M:%S")
+    batch_filter = "AND batch = ?" if batch else ""
+    params = [now, stale] + ([batch] if batch else []) + [limit]
+    with connection() as conn:
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(f"""
+                SELECT id, recipient, subject, body, attempts
+                FROM email_outbox
+                WHERE ((status = 'pending' AND next_attempt_at <= ?)
+                    OR (status = 'sending' AND claimed_at <= ?))
+                  {batch_filter}
+                ORDER BY id
+                LIMIT ?
+            """, params).fetchall()
+            conn.executemany(
+                "UPDATE email_outbox SET status = 'sending', claimed_at = ? WHERE id = ?",
+                [(now, row["id"]) for row in rows],
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return [dict(row) for row in rows]
+
+
+def _record(results):
+    # results: [(id, attempts, error, permanent)] with error None on success
+    now = datetime.now(timezone.utc)
+    sent, retry, failed = [], [], []
+    for message_id, attempts, error, permanent in results:
+        attempts += 1
+        if error is None:
+            sent.append((attempts, now.strftime("%Y-%m-%d %H:%M:%S"), message_id))
+        elif permanent or attempts >= EMAIL_MAX_ATTEMPTS:
+            failed.append((attempts, error, message_id))
+        else:
+            due = now + timedelta(seconds=EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+            retry.append((attempts, error, due.strftime("%Y-%m-%d %H:%M:%S"), message_id))
+
+    with connection() as conn:
+        conn.executemany(
+            "UPDATE email_outbox SET status = 'sent', attempts = ?, sent_at = ?, last_error = NULL WHERE id = ?",
+            sent,
+        )
+        conn.executemany(
+            "UPDATE email_outbox SET status = 'pending', attempts = ?, last_error = ?, next_attempt_at = ? WHERE id = ?",
+            retry,
+        )
+        conn.executemany(
+            "UPDATE email_outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+            failed,
+        )
+        conn.commit()
+    return len(sent), len(retry), len(failed)
+
+
+# ---------- SMTP ----------
+
+def _open_smtp():
+    server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    server.ehlo()
+    if SMTP_STARTTLS and server.has_extn("starttls"):
+        server.starttls()
+        server.ehlo()
+    if SENDER_EMAIL and SENDER_PASSWORD:
+        server.login(SENDER_EMAIL, SENDER_PASSWORD)
+    return server
+
+
+def _build_message(recipient, subject, body):
+    message = MIMEMultipart()
+    message["From"] = SENDER_EMAIL or ""
+    message["To"] = recipient
+    message["Subject"] = subject
+    message.attach(MIMEText(body, "plain"))
+    return message.as_string()
+
+
+class _Sender:
+    """One worker's SMTP session, reused across chunks."""
+
+    def __init__(self, open_smtp):
+        self.open_smtp = open_smtp
+        self.server = None
+        self.sent_on_connection = 0
+        self.connect_error = None  # set when the server can't be reached at all
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.server = None
+
+    def send(self, row):
+        """Returns (error, permanent); error is None on success."""
+        for attempt in (1, 2):  # one silent reconnect if the session dropped
+            try:
+                if self.server is None or self.sent_on_connection >= EMAIL_MESSAGES_PER_CONNECTION:
+                    self.close()
+                    try:
+                        self.server = self.open_smtp()
+                    except (smtplib.SMTPException, OSError) as e:
+                        self.connect_error = str(e)
+                        return self.connect_error, False
+                    self.sent_on_connection = 0
+                self.server.sendmail(
+                    SENDER_EMAIL or "", [row["recipient"]],
+                    _build_message(row["recipient"], row["subject"], row["body"]),
+                )
+                self.sent_on_connection += 1
+                return None, False
+            except smtplib.SMTPRecipientsRefused as e:
+                # 4xx on RCPT (e.g. greylisting, mailbox busy) is temporary
+                codes = [code for code, _ in e.recipients.values()]
+                return str(e.recipients), all(code >= 500 for code in codes)
+            except smtplib.SMTPServerDisconnected as e:
+                self.server = None
+                if attempt == 2:
+                    return str(e), False
+            except smtplib.SMTPResponseException as e:
+                # 5xx is a permanent rejection of this message, 4xx is worth retrying
+                return f"{e.smtp_code} {e.smtp_error!r}", 500 <= e.smtp_code < 600
+            except (smtplib.SMTPException, OSError) as e:
+                self.close()
+                return str(e), False
+
+
+# ---------- dispatcher ----------
+
+_dispatch_lock = threading.Lock()
+
+
+def dispatch_outbox(batch=None, workers=EMAIL_WORKERS, chunk_size=EMAIL_CHUNK_SIZE, open_smtp=_open_smtp):
+    """
+    Send every due message and return {"sent", "retry", "failed"} for this
+    run. Due means new, scheduled for a retry that has come round, or
+    claimed by a dispatcher that died; messages scheduled for a later retry
+    are left for the next run. `batch` restricts the run to one batch, for
+    tools only: callers that just enqueued should drain everything.
+    """
+    totals = {"sent": 0, "retry": 0, "failed": 0}
+    if not _dispatch_lock.acquire(blocking=False):
+        return totals  # another dispatcher in this process is already draining the outbox
+
+    local = threading.local()
+    senders = []
+
+    def sender():
+        if not hasattr(local, "sender"):
+            local.sender = _Sender(open_smtp)
+            senders.append(local.sender)
+        return local.sender
+
+    def send_chunk(rows):
+        s = sender()
+        s.connect_error = None
+        results = []
+        for row in rows:
+            if s.connect_error:
+                # Server unreachable: don't hammer it once per recipient, retry the rest later
+                results.append((row["id"], row["attempts"], s.connect_error, False))
+                continue
+            error, permanent = s.send(row)
+            results.append((row["id"], row["attempts"], error, permanent))
+        return _record(results)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="smtp") as pool:
+            while True:
+                rows = _claim(chunk_size * max(1, workers), batch)
+                if not rows:
+                    break
+                chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+                for sent, retry, failed in pool.map(send_chunk, chunks):
+                    totals["sent"] += sent
+                    totals["retry"] += retry
+                    totals["failed"] += failed
+        for s in senders:
+            s.close()
+    finally:
+        _dispatch_lock.release()
+    return totals
+
+
+def seconds_until_due(now=None):
+    """
+    Seconds until the next retry or stale claim is due (0 if one already is),
+    None if nothing is waiting. `now` is an aware datetime.
+    """
+    now = now or datetime.now(timezone.utc)
+    with connection() as conn:
+        row = conn.execute("""
+            SELECT MIN(CASE status
+                           WHEN 'pending' THEN next_attempt_at
+                           ELSE datetime(claimed_at, ?)
+                       END)
+            FROM email_outbox
+            WHERE status IN ('pending', 'sending')
+        """, (f"+{int(EMAIL_STALE_CLAIM_SECONDS)} seconds",)).fetchone()
+    if not row or not row[0]:
+        return None
+    # Stored times are UTC, as SQLite's CURRENT_TIMESTAMP and datetime() write them
+    due = datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    return max(0.0, (due - now).total_seconds())
+
+
+def dispatch_in_background(batch=None):
+    """Drain the outbox on a daemon thread so the caller (a Streamlit run) returns at once."""
+    def run():
+        try:
+            totals = dispatch_outbox(batch)
+            print(f"📨 Outbox dispatch finished: {totals}")
+        except Exception as e:
+            print(f"❌ Outbox dispatch failed: {e}")
+
+    thread = threading.Thread(target=run, name="outbox-dispatch", daemon=True)
+    thread.start()
+    return thread
+
+
+def outbox_status(batch=None):
+    """{status: count} for one batch, or for the whole outbox."""
+    query = "SELECT status, COUNT(*) FROM email_outbox"
+    params = ()
+    if batch:
+        query += " WHERE batch = ?"
+        params = (batch,)
+    with connection() as conn:
+        return dict(conn.execute(query + " GROUP BY status", params).fetchall())
@@ -0,0 +1,271 @@
+# fixture_importer.py
+"""
+Bulk fixture import from football-data.org match JSON.
+
+import_fixtures() maps a competition's matches onto our tables in one
+transaction:
+
+- teams are matched by name or official name (case and surrounding
+  spaces ignored) against the API's name and shortName;
+- each kickoff is converted to Cairo time and placed in the round whose
+  dates contain it, creating Saturday-Friday rounds
+  (get_week_saturday_to_friday) where none exists yet;
+- stages are created per matchday / knockout stage;
+- matches are upserted by `external_id` (the API match id), so running
+  the same import again only moves rescheduled fixtures. A match entered
+  by hand for the same round and teams is adopted, not duplicated;
+- knockout pairings played home and away become two-legged ties.
+
+    python fixture_importer.py PL --league "Premier League"          # fetch via football_data
+    python fixture_importer.py PL_matches.json --league "Premier League"
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from db import connection
+from round_calendar import CALENDAR_QUERY, RoundCalendar, get_week_saturday_to_friday
+
+local_tz = ZoneInfo("Africa/Cairo")
+
+MATCHDAY_STAGES = ("REGULAR_SEASON", "GROUP_STAGE", "LEAGUE_STAGE")
+KNOCKOUT_STAGES = (
+    "PRELIMINARY_ROUND", "QUALIFICATION", "PLAYOFFS", "LAST_64", "LAST_32", "LAST_16",
+    "QUARTER_FINALS", "SEMI_FINALS", "THIRD_PLACE", "FINAL",
+)
+
+
+def add_external_id_column(conn):
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(matches)")]
+    if "external_id" not in columns:
+        conn.execute("ALTER TABLE matches ADD COLUMN external_id INTEGER")
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_matches_external_id ON matches(external_id) "
+        "WHERE external_id IS NOT NULL"
+    )
+
+
+def _key(name):
+    return (name or "").strip().lower()
+
+
+def _local_kickoff(utc_date):
+    kickoff = datetime.fromisoformat(utc_date.replace("Z", "+00:00"))
+    return kickoff.astimezone(local_tz).replace(tzinfo=None).isoformat(timespec="seconds")
+
+
+def _stage_label(stage, matchday):
+    if stage in MATCHDAY_STAGES and matchday:
+        return f"Round {matchday}"
+    return stage.replace("_", " ").title()
+
+
+def load_matches_file(path):
+    """Matches from a saved API response (a list, or a dict with "matches")."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data.get("matches", []) if isinstance(data, dict) else data
+
+
+def _team_index(conn):
+    index = {}
+    for team_id, name, official_name in conn.execute("SELECT id, name, Official_name FROM teams"):
+        for value in (official_name, name):
+            if value:
+                index.setdefault(_key(value), team_id)
+    return index
+
+
+def _resolve_team(index, team):
+    for value in (team.get("name"), team.get("shortName")):
+        team_id = index.get(_key(value))
+        if team_id:
+            return team_id
+    return None
+
+
+def _resolve_rounds(conn, days):
+    """{day: round_id}, creating Saturday-Friday rounds for days no round covers."""
+    calendar = RoundCalendar(conn.execute(CALENDAR_QUERY).fetchall())
+    found, missing_weeks = {}, {}
+    for day in days:
+        row = calendar.round_for_date(day)
+        if row:
+            found[day] = row["id"]
+        else:
+            missing_weeks.setdefault(get_week_saturday_to_friday(day), []).append(day)
+
+    if missing_weeks:
+        last = conn.execute("SELECT name FROM rounds ORDER BY id DESC LIMIT 1").fetchone()
+        try:
+            number = int(last[0].split(" ")[1]) if last else 0
+        except (IndexError, ValueError):
+            number = 0
+        for start_date, end_date in sorted(missing_weeks):
+            number += 1
+            round_id = conn.execute(
+                "INSERT INTO rounds (name, start_date, end_date) VALUES (?, ?, ?)",
+                (f"Round {number}", start_date, end_date),
+            ).lastrowid
+            for day in missing_weeks[(start_date, end_date)]:
+                found[day] = round_id
+    return found, len(missing_weeks)
+
+
+def import_fixtures(matches, league_id):
+    """
+    Upsert the API `matches` for our league `league_id` in one transaction.
+    Returns a summary dict; fixtures with unknown teams are skipped and listed.
+    """
+    summary = {"inserted": 0, "updated": 0, "adopted": 0, "rounds_created": 0,
+               "stages_created": 0, "ties_created": 0, "skipped": []}
+
+    with connection() as conn:
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            league = conn.execute("SELECT name, country FROM leagues WHERE id = ?", (league_id,)).fetchone()
+            if not league:
+                raise ValueError(f"league {league_id} not found")
+            prefix = ", ".join(p for p in ("Football", league["country"], league["name"]) if p)
+
+            teams = _team_index(conn)
+            fixtures = []
+            for m in matches:
+                home = _resolve_team(teams, m.get("homeTeam") or {})
+                away = _resolve_team(teams, m.get("awayTeam") or {})
+                if not home or not away or not m.get("utcDate"):
+                    summary["skipped"].append(
+                        f"{(m.get('homeTeam') or {}).get('name')} vs {(m.get('awayTeam') or {}).get('name')}"
+                    )
+                    continue
+                kickoff = _local_kickoff(m["utcDate"])
+                fixtures.append({
+                    "external_id": m["id"],
+                    "home": home,
+                    "away": away,
+                    "kickoff": kickoff,
+                    "stage": m.get("stage") or "REGULAR_SEASON",
+                    "label": _stage_label(m.get("stage") or "REGULAR_SEASON", m.get("matchday")),
+                    "matchday": m.get("matchday") or 0,
+                })
+
+            # Home-and-away knockout pairings become two-legged ties
+            by_pair = {}
+            for f in fixtures:
+                if f["stage"] not in MATCHDAY_STAGES:
+                    by_pair.setdefault((f["stage"], frozenset((f["home"], f["away"]))), []).append(f)
+            tie_pairs = [sorted(legs, key=lambda f: f["kickoff"]) for legs in by_pair.values() if len(legs) == 2]
+            two_legged = {legs[0]["label"] for legs in tie_pairs}
+
+            # Stages
+            max_matchday = max((f["matchday"] for f in fixtures), default=0)
+            stage_rows = {}
+            for f in fixtures:
+                name = f"{prefix}, {f['label']}"
+                f["stage_name"] = name
+                if name in stage_rows:
+                    continue
+                if f["stage"] in MATCHDAY_STAGES:
+                    stage_rows[name] = (league_id, name, f["matchday"], 1, 0, 0)
+                else:
+                    order = max_matchday + 1 + (KNOCKOUT_STAGES.index(f["stage"]) if f["stage"] in KNOCKOUT_STAGES else 0)
+                    stage_rows[name] = (league_id, name, order, 1, int(f["label"] in two_legged), 1)
+            summary["stages_created"] = conn.executemany(
+                "INSERT OR IGNORE INTO stages (league_id, name, stage_order, can_be_draw, two_legs, must_have_winner) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                list(stage_rows.values()),
+            ).rowcount
+            stage_ids = {name: stage_id for stage_id, name in conn.execute(
+                "SELECT id, name FROM stages WHERE league_id = ?", (league_id,)
+            )}
+
+            # Rounds
+            rounds, summary["rounds_created"] = _resolve_rounds(conn, sorted({f["kickoff"][:10] for f in fixtures}))
+
+            # Matches: by external id, else an existing hand-entered row for the same round and teams
+            existing = {row["external_id"]: row["id"] for row in conn.execute(
+                "SELECT id, external_id FROM matches WHERE external_id IS NOT NULL"
+            )}
+            by_teams = {(row["round_id"], row["home_team_id"], row["away_team_id"]): row["id"] for row in conn.execute(
+                "SELECT id, round_id, home_team_id, away_team_id FROM matches WHERE league_id = ? AND external_id IS NULL",
+                (league_id,),
+            )}
+            updates, inserts = [], []
+            for f in fixtures:
+                round_id, stage_id = rounds[f["kickoff"][:10]], stage_ids[f["stage_name"]]
+                match_id = existing.get(f["external_id"])
+                if match_id is None:
+                    match_id = by_teams.pop((round_id, f["home"], f["away"]), None)
+                    if match_id is not None:
+                        summary["adopted"] += 1
+                if match_id is None:
+                    inserts.append((round_id, league_id, f["home"], f["away"], f["kickoff"], stage_id, f["external_id"]))
+                else:
+                    updates.append((round_id, f["home"], f["away"], f["kickoff"], stage_id, f["external_id"], match_id))
+
+            # rowcount, not total_changes: the change log triggers add rows of their own
+            summary["updated"] = conn.executemany(
+                "UPDATE matches SET round_id = ?, home_team_id = ?, away_team_id = ?, match_datetime = ?, "
+                "stage_id = ?, external_id = ? "
+                "WHERE id = ? AND NOT (round_id IS ? AND home_team_id IS ? AND away_team_id IS ? "
+                "AND match_datetime IS ? AND stage_id IS ? AND external_id IS ?)",
+                [u + u[:-1] for u in updates],
+            ).rowcount
+            conn.executemany(
+                "INSERT INTO matches (round_id, league_id, home_team_id, away_team_id, match_datetime, stage_id, external_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                inserts,
+            )
+            summary["inserted"] = len(inserts)
+
+            # Two-legged ties
+            if tie_pairs:
+                ids = {row["external_id"]: row["id"] for row in conn.execute(
+                    "SELECT id, external_id FROM matches WHERE league_id = ? AND external_id IS NOT NULL", (league_id,)
+                )}
+                summary["ties_created"] = conn.executemany(
+                    "INSERT OR IGNORE INTO two_legged_ties (first_leg_match_id, second_leg_match_id) VALUES (?, ?)",
+                    [(ids[first["external_id"]], ids[second["external_id"]]) for first, second in tie_pairs],
+                ).rowcount
+
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return summary
+
+
+def import_competition(code, league_id):
+    """Fetch a competition's matches through football_data and import them."""
+    from football_data import get_client
+    return import_fixtures(get_client().competition_matches(code), league_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import fixtures from football-data.org JSON")
+    parser.add_argument("source", help="a competition code (e.g. PL) or a saved matches .json file")
+    parser.add_argument("--league", required=True, help="our league id or name")
+    args = parser.parse_args()
+
+    with connection() as conn:
+        row = conn.execute(
+            "SELECT id FROM leagues WHERE id = ? OR name = ?", (args.league, args.league)
+        ).fetchone()
+    if not row:
+        print(f"❌ League {args.league!r} not found.")
+        raise SystemExit(1)
+
+    if os.path.exists(args.source):
+        summary = import_fixtures(load_matches_file(args.source), row["id"])
+    else:
+        summary = import_competition(args.source, row["id"])
+    skipped = summary.pop("skipped")
+    print(f"✅ Import finished: {summary}")
+    for fixture in skipped:
+        print(f"⚠️ Skipped (unknown team): {fixture}")
+
+
+if __name__ == '__main__':
+    main()
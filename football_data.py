@@ -0,0 +1,287 @@
+# football_data.py
+"""
+Client for the football-data.org v4 API.
+
+- One pooled requests.Session per client with retries on connection
+  errors and 5xx responses.
+- Conditional requests: the last response for each URL is kept on disk
+  (FOOTBALL_DATA_CACHE_DIR) with its ETag/Last-Modified, and sent back as
+  If-None-Match/If-Modified-Since; a 304 is answered from the cache. A
+  response younger than `max_age` seconds is served without asking at all.
+- A token bucket sized to the account's per-minute quota
+  (FOOTBALL_DATA_REQUESTS_PER_MINUTE); the quota headers the API returns
+  and any 429 pause the bucket until the window resets.
+- fetch_many() runs many requests concurrently on a thread pool that
+  shares the session and the bucket.
+
+The token comes from FOOTBALL_DATA_TOKEN (or the `token` argument).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+load_dotenv()
+
+FOOTBALL_DATA_URL = os.getenv("FOOTBALL_DATA_URL", "https://api.football-data.org/v4")
+FOOTBALL_DATA_TOKEN = os.getenv("FOOTBALL_DATA_TOKEN")
+FOOTBALL_DATA_CACHE_DIR = os.getenv("FOOTBALL_DATA_CACHE_DIR", os.path.join("assets", "API_Requests", "cache"))
+FOOTBALL_DATA_REQUESTS_PER_MINUTE = int(os.getenv("FOOTBALL_DATA_REQUESTS_PER_MINUTE", "10"))
+FOOTBALL_DATA_TIMEOUT = float(os.getenv("FOOTBALL_DATA_TIMEOUT", "15"))
+FOOTBALL_DATA_MAX_AGE = float(os.getenv("FOOTBALL_DATA_MAX_AGE", "60"))
+FOOTBALL_DATA_WORKERS = int(os.getenv("FOOTBALL_DATA_WORKERS", "4"))
+
+
+class FootballDataError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class TokenBucket:
+    """`rate` requests per `per` seconds, with bursts of up to `rate`."""
+
+    def __init__(self, rate, per=60.0, clock=time.monotonic, sleep=time.sleep):
+        self.capacity = float(rate)
+        self.refill_per_second = rate / per
+        self.tokens = float(rate)
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def acquire(self):
+        """Block until a request may be sent; returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                else:
+                    delay = (1 - self.tokens) / self.refill_per_second
+            self.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        """Hold every request for `seconds`, e.g. until the server's quota window resets."""
+        with self._lock:
+            now = self.clock()
+            self.paused_until = max(self.paused_until, now + seconds)
+            self.tokens = 0.0
+            self.updated = now
+
+    def observe(self, available, reset_seconds):
+        """Trust the server's count of requests left in this window."""
+        with self._lock:
+            self._refill(self.clock())
+            self.tokens = min(self.tokens, float(available))
+        if available <= 0 and reset_seconds:
+            self.pause(reset_seconds)
+
+
+class ResponseCache:
+    """Last response per URL on disk, with its validators."""
+
+    def __init__(self, folder=FOOTBALL_DATA_CACHE_DIR):
+        self.folder = folder
+
+    def _path(self, key):
+        return os.path.join(self.folder, f"{hashlib.sha256(key.encode()).hexdigest()}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, entry):
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            path = self._path(key)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[football_data] could not cache {key}: {e}")
+
+
+def _session(pool_size):
+    session = requests.Session()
+    retry = Retry(
+        total=3,
+        connect=3,
+        read=2,
+        status=3,
+        backoff_factor=0.5,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=("GET",),
+        respect_retry_after_header=False,  # 429s go to the token bucket instead
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class FootballDataClient:
+    def __init__(self, token=None, base_url=FOOTBALL_DATA_URL, cache_dir=FOOTBALL_DATA_CACHE_DIR,
+                 requests_per_minute=FOOTBALL_DATA_REQUESTS_PER_MINUTE, timeout=FOOTBALL_DATA_TIMEOUT,
+                 max_age=FOOTBALL_DATA_MAX_AGE, workers=FOOTBALL_DATA_WORKERS):
+        token = token or FOOTBALL_DATA_TOKEN
+        if not token:
+            raise FootballDataError("No API token: set FOOTBALL_DATA_TOKEN or pass token=")
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_age = max_age
+        self.workers = workers
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self.bucket = TokenBucket(requests_per_minute)
+        self.session = _session(max(workers, 1))
+        self.session.headers.update({"X-Auth-Token": token, "Accept-Encoding": "gzip"})
+        self.stats = {"requests": 0, "not_modified": 0, "fresh_hits": 0, "throttled": 0}
+        self._stats_lock = threading.Lock()
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _observe_quota(self, response):
+        available = response.headers.get("X-Requests-Available-Minute")
+        reset = response.headers.get("X-RequestCounter-Reset")
+        if available is not None:
+            try:
+                self.bucket.observe(int(available), float(reset or 0))
+            except ValueError:
+                pass
+
+    def get(self, path, params=None, max_age=None):
+        """GET `path` (relative to the API root) and return the decoded JSON."""
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        key = url + ("?" + "&".join(f"{k}={v}" for k, v in sorted(params.items())) if params else "")
+        max_age = self.max_age if max_age is None else max_age
+
+        cached = self.cache.get(key) if self.cache else None
+        if cached and max_age and time.time() - cached["fetched_at"] < max_age:
+            self._count("fresh_hits")
+            return cached["body"]
+
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        for _ in range(3):
+            self.bucket.acquire()
+            self._count("requests")
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except requests.RequestException as e:
+                raise FootballDataError(f"GET {url} failed: {e}")
+            self._observe_quota(response)
+            if response.status_code != 429:
+                break
+            self._count("throttled")
+            self.bucket.pause(float(response.headers.get("Retry-After")
+                                    or response.headers.get("X-RequestCounter-Reset") or 60))
+
+        if response.status_code == 304 and cached:
+            self._count("not_modified")
+            cached["fetched_at"] = time.time()
+            self.cache.put(key, cached)
+            return cached["body"]
+        if response.status_code != 200:
+            raise FootballDataError(f"GET {url}: {response.status_code} {response.text[:200]}", response.status_code)
+
+        body = response.json()
+        if self.cache:
+            self.cache.put(key, {
+                "url": key,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": time.time(),
+                "body": body,
+            })
+        return body
+
+    def fetch_many(self, requests_, max_age=None):
+        """
+        Run [(path, params)] concurrently; returns results in the same order,
+        with a FootballDataError in place of any request that failed.
+        """
+        def fetch(item):
+            path, params = item
+            try:
+                return self.get(path, params, max_age)
+            except FootballDataError as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="football-data") as pool:
+            return list(pool.map(fetch, requests_))
+
+    # ---------- endpoints ----------
+
+    def competitions(self):
+        return self.get("competitions").get("competitions", [])
+
+    def competition_teams(self, code):
+        return self.get(f"competitions/{code}/teams").get("teams", [])
+
+    def competition_matches(self, code, **filters):
+        return self.get(f"competitions/{code}/matches", filters or None).get("matches", [])
+
+    def match(self, match_id):
+        return self.get(f"matches/{match_id}")
+
+    def matches_for_competitions(self, codes, **filters):
+        """{code: [matches]} for many competitions at once (errors are left out and printed)."""
+        results = self.fetch_many([(f"competitions/{code}/matches", filters or None) for code in codes])
+        out = {}
+        for code, result in zip(codes, results):
+            if isinstance(result, FootballDataError):
+                print(f"[football_data] {code}: {result}")
+                continue
+            out[code] = result.get("matches", [])
+        return out
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide client, so every caller shares one session, cache and bucket."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = FootballDataClient()
+        return _client
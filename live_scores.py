@@ -0,0 +1,223 @@
+# live_scores.py
+"""
+Live score ingestion from football-data.org.
+
+Only imported fixtures (matches.external_id, see fixture_importer.py) that
+are in their window are polled: from LIVE_LEAD_MINUTES before kickoff
+until they are finished, or LIVE_WINDOW_HOURS after kickoff at the latest.
+The API's status, score and shoot-out winner are diffed against the
+stored rows; changed rows are written in one transaction, and only those
+matches' predictions are rescored, in the same transaction.
+
+Between polls the worker waits LIVE_POLL_SECONDS while matches are in
+their window, otherwise until the next one opens. Failed polls back off
+exponentially up to LIVE_MAX_BACKOFF_SECONDS, whether the API, the
+network, the database or a malformed payload failed.
+
+    python live_scores.py            # run forever
+    python live_scores.py --once     # one poll, then exit
+"""
+import argparse
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from db import connection
+from football_data import FootballDataError, get_client
+from scoring import score_matches
+
+local_tz = ZoneInfo("Africa/Cairo")
+
+LIVE_POLL_SECONDS = float(os.getenv("LIVE_POLL_SECONDS", "60"))
+LIVE_IDLE_SECONDS = float(os.getenv("LIVE_IDLE_SECONDS", "1800"))
+LIVE_MAX_BACKOFF_SECONDS = float(os.getenv("LIVE_MAX_BACKOFF_SECONDS", "900"))
+LIVE_LEAD_MINUTES = float(os.getenv("LIVE_LEAD_MINUTES", "10"))
+LIVE_WINDOW_HOURS = float(os.getenv("LIVE_WINDOW_HOURS", "4"))
+LIVE_IDS_PER_REQUEST = 50
+
+# football-data status -> ours (None: leave the stored status alone)
+STATUS_MAP = {
+    "SCHEDULED": "upcoming",
+    "TIMED": "upcoming",
+    "IN_PLAY": "live",
+    "PAUSED": "live",
+    "LIVE": "live",
+    "FINISHED": "finished",
+    "AWARDED": "finished",
+    "CANCELLED": "cancelled",
+    "POSTPONED": None,
+    "SUSPENDED": None,
+}
+
+IN_WINDOW_QUERY = """
+    SELECT id, external_id, home_team_id, away_team_id, status, home_score, away_score, penalty_winner
+    FROM matches
+    WHERE external_id IS NOT NULL
+      AND status IN ('upcoming', 'live')
+      AND datetime(match_datetime) <= ?
+      AND (datetime(match_datetime) >= ? OR status = 'live')
+"""
+
+NEXT_WINDOW_QUERY = """
+    SELECT MIN(datetime(match_datetime)) FROM matches
+    WHERE external_id IS NOT NULL AND status = 'upcoming' AND datetime(match_datetime) > ?
+"""
+
+
+def _now():
+    return datetime.now(local_tz).replace(tzinfo=None)
+
+
+def _sql_datetime(value):
+    # The form SQLite's datetime() returns; match_datetime is stored with a 'T' or a space
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def in_window_matches(conn, now=None):
+    """Imported matches to poll now: kicking off soon, or kicked off and not finished."""
+    now = now or _now()
+    opens = _sql_datetime(now + timedelta(minutes=LIVE_LEAD_MINUTES))
+    closes = _sql_datetime(now - timedelta(hours=LIVE_WINDOW_HOURS))
+    return conn.execute(IN_WINDOW_QUERY, (opens, closes)).fetchall()
+
+
+def next_window_opens(conn, now=None):
+    """When the next imported upcoming match enters its window, or None."""
+    now = now or _now()
+    row = conn.execute(NEXT_WINDOW_QUERY, (_sql_datetime(now + timedelta(minutes=LIVE_LEAD_MINUTES)),)).fetchone()
+    if not row or not row[0]:
+        return None
+    return datetime.fromisoformat(row[0]) - timedelta(minutes=LIVE_LEAD_MINUTES)
+
+
+def _goals(part):
+    return (part or {}).get("home"), (part or {}).get("away")
+
+
+def result_from_api(api_match, stored):
+    """(status, home_score, away_score, penalty_winner) for an API match, given our stored row."""
+    status = STATUS_MAP.get(api_match.get("status"), None) or stored["status"]
+    score = api_match.get("score") or {}
+    home, away = _goals(score.get("fullTime"))
+    penalty_winner = stored["penalty_winner"]
+
+    if score.get("duration") == "PENALTY_SHOOTOUT":
+        # fullTime includes the shoot-out; predictions are on the score after extra time
+        regular_home, regular_away = _goals(score.get("regularTime"))
+        extra_home, extra_away = _goals(score.get("extraTime"))
+        if regular_home is not None:
+            home = regular_home + (extra_home or 0)
+            away = regular_away + (extra_away or 0)
+        winner = score.get("winner")
+        if winner == "HOME_TEAM":
+            penalty_winner = stored["home_team_id"]
+        elif winner == "AWAY_TEAM":
+            penalty_winner = stored["away_team_id"]
+
+    if home is None or away is None:
+        home, away = stored["home_score"], stored["away_score"]
+    return status, home, away, penalty_winner
+
+
+def fetch_api_matches(client, external_ids):
+    """{external id: API match} for the given ids, LIVE_IDS_PER_REQUEST per request."""
+    ids = list(external_ids)
+    chunks = [ids[i:i + LIVE_IDS_PER_REQUEST] for i in range(0, len(ids), LIVE_IDS_PER_REQUEST)]
+    results = client.fetch_many([("matches", {"ids": ",".join(map(str, chunk))}) for chunk in chunks], max_age=0)
+    found = {}
+    for result in results:
+        if isinstance(result, FootballDataError):
+            raise result
+        for match in result.get("matches", []):
+            found[match["id"]] = match
+    return found
+
+
+def poll_once(client=None, now=None):
+    """
+    One ingestion pass. Returns {"polled", "updated", "rescored"}:
+    matches asked about, rows changed, prediction scores changed.
+    """
+    with connection() as conn:
+        stored = {row["external_id"]: row for row in in_window_matches(conn, now)}
+    summary = {"polled": len(stored), "updated": 0, "rescored": 0}
+    if not stored:
+        return summary
+
+    api_matches = fetch_api_matches(client or get_client(), stored)
+
+    updates = []
+    for external_id, api_match in api_matches.items():
+        row = stored.get(external_id)
+        if row is None:
+            continue
+        result = result_from_api(api_match, row)
+        if result != (row["status"], row["home_score"], row["away_score"], row["penalty_winner"]):
+            updates.append(result + (row["id"],))
+    if not updates:
+        return summary
+
+    with connection() as conn:
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "UPDATE matches SET status = ?, home_score = ?, away_score = ?, penalty_winner = ? WHERE id = ?",
+                updates,
+            )
+            # score_matches commits the score updates together with the match rows
+            summary["rescored"] = score_matches(conn, [u[-1] for u in updates])
+        except Exception:
+            conn.rollback()
+            raise
+    summary["updated"] = len(updates)
+    return summary
+
+
+def seconds_until_next_poll(now=None):
+    now = now or _now()
+    with connection() as conn:
+        if in_window_matches(conn, now):
+            return LIVE_POLL_SECONDS
+        opens = next_window_opens(conn, now)
+    if opens is None:
+        return LIVE_IDLE_SECONDS
+    return max(LIVE_POLL_SECONDS, min((opens - now).total_seconds(), LIVE_IDLE_SECONDS))
+
+
+def run_forever(stop_event=None, client=None):
+    stop_event = stop_event or threading.Event()
+    failures = 0
+    while not stop_event.is_set():
+        try:
+            summary = poll_once(client)
+            if summary["updated"]:
+                print(f"⚽ Live scores: {summary}")
+            failures = 0
+            delay = seconds_until_next_poll()
+        except (FootballDataError, OSError, sqlite3.Error, KeyError, ValueError, TypeError) as e:
+            # API, network, database and malformed-payload errors all back off the same way
+            failures += 1
+            delay = min(LIVE_POLL_SECONDS * 2 ** failures, LIVE_MAX_BACKOFF_SECONDS)
+            print(f"❌ Live score poll failed ({e}); retrying in {delay:.0f}s")
+        stop_event.wait(delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live score ingestion worker")
+    parser.add_argument("--once", action="store_true", help="poll once and exit")
+    args = parser.parse_args()
+
+    if args.once:
+        print(f"⚽ Live scores: {poll_once()}")
+        return
+    print("⏱️ Live score worker started.")
+    try:
+        run_forever()
+    except KeyboardInterrupt:
+        print("👋 Live score worker stopped.")
+
+
+if __name__ == '__main__':
+    main()
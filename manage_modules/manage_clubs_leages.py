@@ -1,4 +1,5 @@
 import streamlit as st
+from asset_store import logo_image
 import os
 # from controllers.manage_clubs_leagues_controller import (
 #     get_leagues, add_league, update_league, delete_league,
@@ -203,7 +204,7 @@ def render_edit_team_form(team, leagues):
         # Show old logo if exists
         if "logo_path" in team and team["logo_path"]:
             st.markdown("**Current Logo:**")
-            st.image(team["logo_path"], width=150)  # adjust width as needed
+            st.image(logo_image(team["logo_path"], 150) or "assets/no_image.png", width=150)  # adjust width as needed
 
         name = st.text_input("Name", team["name"])
         official_name = st.text_input("official_name")
@@ -368,8 +369,9 @@ def render_team_management():
             st.markdown('<div class="centered">', unsafe_allow_html=True)
             logo_path = team.get("logo_path")
             try:
-                if logo_path and os.path.exists(logo_path):
-                    st.image(logo_path, width=40)
+                logo = logo_image(logo_path, 40)
+                if logo:
+                    st.image(logo, width=40)
                 else:
                     st.image("assets/no_image.png", width=40)
             except:
@@ -8,7 +8,7 @@ from controllers.manage_matches_controller import get_all_leagues, get_teams_by_
 # View match part
 from controllers.manage_matches_controller import (fetch_rounds, fetch_matches_by_round, delete_match_by_id, 
                                                    update_match_partial, fetch_leagues, fetch_teams, 
-                                                   change_match_status, insert_or_replace_leg, fetch_legs_by_match_id,
+                                                   insert_or_replace_leg, fetch_legs_by_match_id,
                                                    fetch_stage_by_id)
 from controllers.manage_predictions_controller import update_scores_for_match
 from itertools import groupby
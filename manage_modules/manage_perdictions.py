@@ -9,7 +9,7 @@ from controllers.manage_predictions_controller import (
     fetch_match_by_id
 )
 from controllers.manage_matches_controller import (fetch_rounds, fetch_matches_by_round, delete_match_by_id, update_match_partial, 
-                                                   fetch_leagues, fetch_teams, change_match_status, insert_or_replace_leg, 
+                                                   fetch_leagues, fetch_teams, insert_or_replace_leg, 
                                                    fetch_legs_by_match_id)
 from itertools import groupby
 from render_helpers.render_predictions import render_prediction_input
@@ -172,7 +172,6 @@ def render():
             minutes_left = int(total_seconds_left / 60)
             match_date = match_time.date()
             time_str = match_time.strftime('%I:%M %p')
-            change_match_status(match)
 
             if 0 < minutes_left < 1:
                 date_display = "<span style='color: orange; font-weight: bold;'>⏰ Less than 1 min!</span>"
@@ -7,14 +7,11 @@ import hashlib
 AVATAR_FOLDER = os.path.join("assets", "Avatars")  
 DEFAULT_AVATAR_PATH = os.path.join("assets", "default_avatar.png")
 
-import base64
+from thumbnails import thumbnail_data_uri
 
 def _render_circular_avatar(img_path, size=50):
-    try:
-        with open(img_path, "rb") as f:
-            img_bytes = f.read()
-            b64_img = base64.b64encode(img_bytes).decode()
-
+    data_uri = thumbnail_data_uri(img_path, size)
+    if data_uri:
         avatar_html = f"""
         <div style="
             display: flex;
@@ -27,11 +24,11 @@ def _render_circular_avatar(img_path, size=50):
             border: 2px solid #4A90E2;
             box-shadow: 0 0 4px rgba(0,0,0,0.2);
         ">
-            <img src="data:image/png;base64,{b64_img}" style="width: 100%; height: auto;" />
+            <img src="{data_uri}" style="width: 100%; height: auto;" />
         </div>
         """
         st.markdown(avatar_html, unsafe_allow_html=True)
-    except Exception:
+    else:
         st.write("👤")
 
 
@@ -63,7 +60,7 @@ def render():
             avatar_filename = player.get("avatar_path")
             full_avatar_path = os.path.join(AVATAR_FOLDER, avatar_filename) if avatar_filename else None
 
-            if avatar_filename and os.path.exists(full_avatar_path):
+            if full_avatar_path and thumbnail_data_uri(full_avatar_path, 50):
                 _render_circular_avatar(full_avatar_path)
             else:
                 _render_circular_avatar(DEFAULT_AVATAR_PATH)
@@ -3,8 +3,11 @@ from modules import under_update
 from auto_push_db import auto_push_db
 from controllers.predictions_controllers import format_time_left, get_next_round_info
 from send_email import send_reminder_email_to_all
-from controllers.manage_predictions_controller import update_scores_for_match
+from controllers.manage_predictions_controller import update_scores_for_dirty_matches
 from utils import fetch_all
+from query_cache import cache_stats, get_cache
+from status_engine import status_engine_stats
+from data_version import section_cache_stats
 def render():
     st.markdown("""
         <h2 style="text-align:center; color:#3b82f6; font-weight:700;">⚙️ Admin Tournament Tools</h2>
@@ -31,29 +34,68 @@ def render():
 
     with col4:
         if st.button("📧 Send Reminder Emails", type="primary", help="Send reminder emails to all players."):
-            with st.spinner("📨 Sending email reminders..."):
+            with st.spinner("📨 Queueing email reminders..."):
                 round_name, deadline, match_time, match_count = get_next_round_info()
-                send_reminder_email_to_all(round_name, deadline, match_time, match_count, "test")
-                st.success("✅ Reminder emails sent successfully!")
+                if send_reminder_email_to_all(round_name, deadline, match_time, match_count, "test"):
+                    st.success("✅ Reminder emails queued; they are being sent in the background.")
+                else:
+                    st.error("❌ Could not queue the reminder emails.")
 
     with col5:
         if st.button("🏆 Start the Cup", type="primary", help="Kick off the tournament with style!"):
             st.toast("⚠️ Start Cup is not active yet", icon="⚠️")
     
     with col6:
-        if st.button("📊 Calculate Points", type="primary", help="This will calculate the score for all matches"):
-            with st.spinner("🧮 Calculating points for all matches..."):
+        if st.button("📊 Calculate Points", type="primary", help="This will calculate the score for matches whose result changed"):
+            with st.spinner("🧮 Calculating points for changed matches..."):
                 try:
-                    query = "SELECT id FROM matches"
-                    matches = fetch_all(query)
-                    count = 0
+                    scored, skipped, changed = update_scores_for_dirty_matches()
 
-                    for match in matches:
-                        match_id = match["id"]
-                        update_scores_for_match(match_id)
-                        count += 1
-
-                    st.success(f"✅ Points successfully updated for {count} matches.")
+                    if scored:
+                        st.success(f"✅ Points updated for {scored} matches ({changed} predictions changed, {skipped} unchanged matches skipped).")
+                    else:
+                        st.info(f"ℹ️ Nothing to recalculate: all {skipped} finished matches are up to date.")
                 except Exception as e:
                     st.error(f"❌ Error while calculating points:\n{e}")
-                    
\ No newline at end of file
+                    
+
+    # Query cache diagnostics
+    with st.expander("🗄️ Query Cache Stats"):
+        stats = cache_stats()
+        queries = stats["queries"]
+        hits = sum(q["hits"] for q in queries)
+        misses = sum(q["misses"] for q in queries)
+
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Cached entries", f"{stats['entries']} / {stats['max_entries']}")
+        c2.metric("Hits", hits)
+        c3.metric("Misses", misses)
+
+        if queries:
+            st.dataframe(queries, use_container_width=True)
+        else:
+            st.info("ℹ️ No cached queries yet.")
+
+        sections = section_cache_stats()
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Data version", sections["data_version"])
+        c2.metric("Section hits", sum(q["hits"] for q in sections["sections"]))
+        c3.metric("Section misses", sum(q["misses"] for q in sections["sections"]))
+
+        if st.button("🧹 Clear Query Cache"):
+            get_cache().clear()
+            st.success("✅ Query cache cleared.")
+
+    # Match status engine diagnostics
+    with st.expander("⏱️ Match Status Engine"):
+        engine = status_engine_stats()
+        c1, c2, c3 = st.columns(3)
+        if engine["next_transition_at"]:
+            c1.metric("Next transition", engine["next_transition_at"].replace("T", " "),
+                      f"match {engine['next_transition_match']} → {engine['next_transition_status']}",
+                      delta_color="off")
+        else:
+            c1.metric("Next transition", "—")
+        c2.metric("Pending", engine["pending"])
+        c3.metric("Applied", engine["applied"])
+        st.caption(f"Last run: {engine['last_run'] or 'never'} · schedule rebuilds: {engine['rebuilds']}")
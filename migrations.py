@@ -0,0 +1,200 @@
+# migrations.py
+"""
+Versioned schema migrations for game_database.db.
+
+Each migration is (version, name, steps); a step is either a SQL string or a
+callable taking the connection. A migration's steps and its row in
+`schema_migrations` commit together in one transaction, so steps must not
+commit themselves; every step is written to be safe to re-run.
+
+    python migrations.py            # apply pending migrations
+    python migrations.py --check    # fail if a hot query scans a table it should not
+                                    # (tests/test_query_plans.py runs the same check)
+"""
+import sys
+import sqlite3
+from datetime import datetime
+
+from asset_store import migrate_logo_paths
+from changelog import create_change_log_schema, recreate_change_log_triggers
+from data_version import create_data_version_schema
+from email_outbox import create_outbox_schema
+from fixture_importer import add_external_id_column
+from scoring import create_dirty_matches_schema, mark_all_matches_dirty
+from standings import create_standings_schema, rebuild_player_standings, recreate_prediction_triggers
+
+MIGRATIONS = [
+    (1, "hot path indexes", [
+        "CREATE INDEX IF NOT EXISTS idx_matches_round_datetime ON matches(round_id, match_datetime)",
+        "CREATE INDEX IF NOT EXISTS idx_matches_datetime ON matches(match_datetime)",
+        "CREATE INDEX IF NOT EXISTS idx_predictions_match ON predictions(match_id)",
+        "CREATE INDEX IF NOT EXISTS idx_predictions_player_score ON predictions(player_id, score)",
+        "CREATE INDEX IF NOT EXISTS idx_rounds_dates ON rounds(start_date, end_date)",
+        "CREATE INDEX IF NOT EXISTS idx_two_legged_ties_second_leg ON two_legged_ties(second_leg_match_id)",
+        "DROP TABLE IF EXISTS matches_new",
+    ]),
+    (2, "materialized player standings", [
+        create_standings_schema,
+        rebuild_player_standings,
+    ]),
+    (3, "suspendable standings triggers for bulk scoring", [
+        recreate_prediction_triggers,
+        rebuild_player_standings,
+    ]),
+    (4, "dirty match queue for incremental scoring", [
+        create_dirty_matches_schema,
+        mark_all_matches_dirty,
+    ]),
+    (5, "content-addressed logo store", [
+        migrate_logo_paths,
+    ]),
+    (6, "email outbox", [
+        create_outbox_schema,
+    ]),
+    (7, "reminder ledger", [
+        """
+        CREATE TABLE IF NOT EXISTS reminder_ledger (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            round_id INTEGER NOT NULL,
+            level TEXT NOT NULL,
+            fire_at TEXT NOT NULL,
+            status TEXT NOT NULL CHECK (status IN ('sent', 'skipped')),
+            batch TEXT,
+            recorded_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (round_id, level)
+        )
+        """,
+    ]),
+    (8, "change log for replication", [
+        create_change_log_schema,
+    ]),
+    (9, "external match ids for fixture imports", [
+        add_external_id_column,
+        recreate_change_log_triggers,  # the matches triggers must log the new column
+    ]),
+    (10, "data version counters", [
+        create_data_version_schema,
+    ]),
+    (11, "match status index for the background workers", [
+        "CREATE INDEX IF NOT EXISTS idx_matches_status_datetime ON matches(status, match_datetime)",
+    ]),
+]
+
+
+def _ensure_migrations_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    """)
+    conn.commit()
+
+
+def applied_versions(conn):
+    _ensure_migrations_table(conn)
+    return {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+
+
+def run_migrations(conn, migrations=MIGRATIONS):
+    """Apply every pending migration in order; returns the versions applied."""
+    done = applied_versions(conn)
+    applied = []
+    for version, name, steps in sorted(migrations, key=lambda m: m[0]):
+        if version in done:
+            continue
+        try:
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")  # DDL too, or a failed step leaves earlier ones applied
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                (version, name, datetime.now().isoformat(timespec="seconds")),
+            )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ Migration {version} ({name}) failed: {e}")
+            raise
+        applied.append(version)
+        print(f"✅ Applied migration {version}: {name}")
+    return applied
+
+
+# ===== Query plan regression check =====
+
+def hot_queries():
+    """
+    {name: (sql, params, intended_scans)} for the queries run on every page
+    render or worker tick, imported from the modules that execute them so
+    the check follows the code. Parameters only need the right shape.
+    intended_scans are the SCAN lines of queries that really do read every
+    row of a small table (all players for the leaderboard, all rounds for
+    the calendar).
+    """
+    from controllers.leaderboard_controller import LEADERBOARD_QUERY
+    from controllers.predictions_controllers import ROUND_LIVE_QUERY, ROUND_VIEW_QUERY
+    from data_version import REFRESH_STATE_QUERY
+    from live_scores import IN_WINDOW_QUERY, NEXT_WINDOW_QUERY
+    from round_calendar import CALENDAR_QUERY
+    from scoring import SCORE_SELECT_SQL
+    from send_email import REMINDER_AUDIENCE_QUERY
+    from status_engine import OPEN_MATCHES_QUERY
+
+    kickoff = "2025-01-01 00:00:00"
+    return {
+        "round_view": (ROUND_VIEW_QUERY, (1, 1), set()),
+        "round_live": (ROUND_LIVE_QUERY, (1, 1), set()),
+        "leaderboard": (
+            LEADERBOARD_QUERY,
+            {"offset": 0, "limit": 10, "player_id": 1, "radius": 1},
+            {"SCAN p", "SCAN ranked", "SCAN me"},
+        ),
+        "reminder_audience": (REMINDER_AUDIENCE_QUERY, (1,), {"SCAN pl", "SCAN m"}),
+        "round_calendar": (CALENDAR_QUERY, (), {"SCAN r"}),
+        "score_matches": (SCORE_SELECT_SQL.format(match_filter="AND m.id IN (?)"), (1,), set()),
+        "status_engine_open_matches": (OPEN_MATCHES_QUERY, (), set()),
+        "live_scores_in_window": (IN_WINDOW_QUERY, (kickoff, kickoff), set()),
+        "live_scores_next_window": (NEXT_WINDOW_QUERY, (kickoff,), set()),
+        "refresh_state": (REFRESH_STATE_QUERY, (), set()),
+    }
+
+
+def find_full_scans(conn, queries=None):
+    """Return [(query_name, plan_detail)] for every unintended table scan in the hot queries."""
+    queries = hot_queries() if queries is None else queries
+    offenders = []
+    for name, (sql, params, intended) in queries.items():
+        for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+            detail = row[-1]
+            if not detail.startswith("SCAN ") or detail in intended:
+                continue
+            if detail == "SCAN CONSTANT ROW" or detail.startswith("SCAN (subquery-"):
+                continue
+            offenders.append((name, detail))
+    return offenders
+
+
+def main():
+    from db import DB_FILE
+    conn = sqlite3.connect(DB_FILE)
+    try:
+        run_migrations(conn)
+        if "--check" in sys.argv:
+            offenders = find_full_scans(conn)
+            for name, detail in offenders:
+                print(f"❌ {name}: {detail}")
+            if offenders:
+                sys.exit(1)
+            print(f"✅ {len(hot_queries())} hot queries use indexes.")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
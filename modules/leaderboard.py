@@ -1,17 +1,15 @@
 import streamlit as st
 from datetime import datetime
-from controllers.players_controller import get_player_info
-from controllers.manage_predictions_controller import fetch_all_players
+from controllers.leaderboard_controller import get_leaderboard
+from data_version import cached_section
 from utils import fetch_one
-import base64
+from round_calendar import get_round_calendar
+from thumbnails import thumbnail_data_uri
 import os
 
 def get_current_round():
     today = datetime.now().date().isoformat()
-    round_data = fetch_one("""
-        SELECT name FROM rounds
-        WHERE start_date <= ? AND end_date >= ?
-        """, (today, today))
+    round_data = get_round_calendar().round_for_date(today)
     return round_data['name'] if round_data else "Unknown Round"
 
 AVATAR_FOLDER = os.path.join("assets", "Avatars")  
@@ -20,11 +18,9 @@ DEFAULT_AVATAR_PATH = os.path.join("Assets", "default_avatar.png")
 
 
 def _render_circular_avatar(img_path, size=50):
-    try:
-        with open(img_path, "rb") as f:
-            img_bytes = f.read()
-            b64_img = base64.b64encode(img_bytes).decode()
-
+    # Pre-sized thumbnail from the in-memory cache; no file I/O after the first render
+    data_uri = thumbnail_data_uri(img_path, size)
+    if data_uri:
         avatar_html = f"""
         <div style="
             display: flex;
@@ -37,18 +33,16 @@ def _render_circular_avatar(img_path, size=50):
             border: 2px solid #4A90E2;
             box-shadow: 0 0 4px rgba(0,0,0,0.2);
         ">
-            <img src="data:image/png;base64,{b64_img}" style="width: 100%; height: auto;" />
+            <img src="{data_uri}" style="width: 100%; height: auto;" />
         </div>
         """
         st.markdown(avatar_html, unsafe_allow_html=True)
-    except Exception:
+    else:
         st.write("👤")
 
 def get_avatar_html(img_path, size=45):
-    try:
-        with open(img_path, "rb") as f:
-            img_bytes = f.read()
-        b64_img = base64.b64encode(img_bytes).decode()
+    data_uri = thumbnail_data_uri(img_path, size)
+    if data_uri:
         return f"""
         <div style="
             width: {size}px;
@@ -58,36 +52,82 @@ def get_avatar_html(img_path, size=45):
             border: 2px solid #4A90E2;
             box-shadow: 0 0 4px rgba(0,0,0,0.2);
         ">
-            <img src="data:image/png;base64,{b64_img}" style="width: 100%; height: 100%; object-fit: cover;" />
+            <img src="{data_uri}" style="width: 100%; height: 100%; object-fit: cover;" />
         </div>
         """
-    except Exception:
+    else:
         return "<div style='width: 45px; height: 45px; border-radius: 50%; background: #ccc;'></div>"
 
 
+def _render_leaderboard_row(player, player_id):
+    is_you = player['player_id'] == player_id
+    background = (
+        "linear-gradient(to right, #ffe082, #ffca28)" if is_you else
+        "linear-gradient(to right, #e3f2fd, #90caf9)"
+    )
+    border = "3px solid #fdd835" if is_you else "1px solid #90caf9"
+    medal = "🏅"
+
+    box_shadow = (
+        "0 0 15px 4px rgba(255, 214, 0, 0.6)" if is_you else
+        "0 2px 6px rgba(0,0,0,0.1)"
+    )
+    text_color = "#000000" if is_you else "#1a237e"
+
+    # Get avatar path
+    avatar_filename = player.get("avatar_path")
+    full_avatar_path = os.path.join(AVATAR_FOLDER, avatar_filename) if avatar_filename else DEFAULT_AVATAR_PATH
+
+    with st.container():
+        cols = st.columns([1, 1.2, 5, 2])  # Avatar, Rank, Username, Points
+
+        with cols[0]:
+            _render_circular_avatar(full_avatar_path, size=45)
+
+        with cols[1]:
+            st.markdown(f"""
+                <div style="background: {background}; border: {border}; padding: 10px;
+                            border-radius: 10px; box-shadow: {box_shadow}; text-align: center;
+                            color: {text_color}; font-weight: bold;">
+                    {medal} #{player['rank']}
+                </div>
+            """, unsafe_allow_html=True)
+
+        with cols[2]:
+            st.markdown(f"""
+                <div style="background: {background}; border: {border}; padding: 10px;
+                            border-radius: 10px; box-shadow: {box_shadow}; text-align: center;
+                            color: {text_color}; font-weight: bold;">
+                    {player['username']}
+                </div>
+            """, unsafe_allow_html=True)
+
+        with cols[3]:
+            st.markdown(f"""
+                <div style="background: {background}; border: {border}; padding: 10px;
+                            border-radius: 10px; box-shadow: {box_shadow}; text-align: center;
+                            color: {text_color}; font-weight: bold;">
+                    {player['points']} pts
+                </div>
+            """, unsafe_allow_html=True)
+
+
 def render(player_id):
     st.markdown("## 🏆 Ultimate Leaderboard")
 
     current_round = get_current_round()
-    players = fetch_all_players()
-    leaderboard = []
-
-    for p in players:
-        info = get_player_info(p['id'])
-        leaderboard.append({
-            'id': p['id'],
-            'username': info.get('username', 'Unknown'),
-            'points': info.get('total_points', 0),
-            'avatar_path': info.get('avatar_path')
-        })
-
-    leaderboard.sort(key=lambda x: x['points'], reverse=True)
-
-    current_info = get_player_info(player_id)
-    current_points = current_info.get('total_points', 0)
-    current_username = current_info.get('username', 'You')
-    avatar_path = current_info.get('avatar_path')
-    current_rank = next((i + 1 for i, p in enumerate(leaderboard) if p['id'] == player_id), None)
+
+    # Top 10 plus the players ranked right around you, in one query
+    rows = cached_section(
+        "leaderboard", player_id, ("players", "player_standings"),
+        lambda: get_leaderboard(offset=0, limit=10, around_player_id=player_id, radius=1),
+    )
+    top_players = [row for row in rows if row['in_page']]
+    neighborhood = [row for row in rows if not row['in_page']]
+
+    current = next((row for row in rows if row['is_you']), None)
+    current_points = current['points'] if current else 0
+    current_rank = current['rank'] if current else None
 
     # === Top summary cards ===
     st.markdown(f"""
@@ -114,54 +154,11 @@ def render(player_id):
     # === Leaderboard Cards ===
     st.markdown("### 🪄 Player Rankings")
 
-    for idx, player in enumerate(leaderboard[:10], start=1):
-        is_you = player['id'] == player_id
-        background = (
-            "linear-gradient(to right, #ffe082, #ffca28)" if is_you else
-            "linear-gradient(to right, #e3f2fd, #90caf9)"
-        )
-        border = "3px solid #fdd835" if is_you else "1px solid #90caf9"
-        medal = "🏅"
-
-        box_shadow = (
-            "0 0 15px 4px rgba(255, 214, 0, 0.6)" if is_you else
-            "0 2px 6px rgba(0,0,0,0.1)"
-        )
-        text_color = "#000000" if is_you else "#1a237e"
-
-        # Get avatar path
-        avatar_filename = player.get("avatar_path")
-        full_avatar_path = os.path.join(AVATAR_FOLDER, avatar_filename) if avatar_filename else DEFAULT_AVATAR_PATH
-
-        with st.container():
-            cols = st.columns([1, 1.2, 5, 2])  # Avatar, Rank, Username, Points
-
-            with cols[0]:
-                _render_circular_avatar(full_avatar_path, size=45)
-
-            with cols[1]:
-                st.markdown(f"""
-                    <div style="background: {background}; border: {border}; padding: 10px;
-                                border-radius: 10px; box-shadow: {box_shadow}; text-align: center;
-                                color: {text_color}; font-weight: bold;">
-                        {medal} #{idx}
-                    </div>
-                """, unsafe_allow_html=True)
-
-            with cols[2]:
-                st.markdown(f"""
-                    <div style="background: {background}; border: {border}; padding: 10px;
-                                border-radius: 10px; box-shadow: {box_shadow}; text-align: center;
-                                color: {text_color}; font-weight: bold;">
-                        {player['username']}
-                    </div>
-                """, unsafe_allow_html=True)
-
-            with cols[3]:
-                st.markdown(f"""
-                    <div style="background: {background}; border: {border}; padding: 10px;
-                                border-radius: 10px; box-shadow: {box_shadow}; text-align: center;
-                                color: {text_color}; font-weight: bold;">
-                        {player['points']} pts
-                    </div>
-                """, unsafe_allow_html=True)
+    for player in top_players:
+        _render_leaderboard_row(player, player_id)
+
+    # === Your neighborhood (only when you're outside the top 10) ===
+    if current and not current['in_page'] and neighborhood:
+        st.markdown("### 🧭 Around You")
+        for player in neighborhood:
+            _render_leaderboard_row(player, player_id)
@@ -1,18 +1,13 @@
 import os
-import io
-import base64
-from PIL import Image
 import streamlit as st
 from streamlit_cropper import st_cropper
 from controllers.players_controller import get_player_info, update_player_info, save_avatar_image, delete_player
 from streamlit_extras.metric_cards import style_metric_cards
-import glob
+from thumbnails import get_avatar_gallery, thumbnail_data_uri
+from data_version import cached_section
 
-def image_to_base64(img: Image.Image) -> str:
-    buffered = io.BytesIO()
-    img.save(buffered, format="PNG")
-    return base64.b64encode(buffered.getvalue()).decode()
 AVATAR_FOLDER = "assets/Avatars"
+GALLERY_THUMB_SIZE = 100
 
 def render(player_id):
     st.markdown("""
@@ -68,7 +63,8 @@ def render(player_id):
     """, unsafe_allow_html=True)
 
     st.markdown('<div class="animated-header">⚽ My Profile ⚽</div>', unsafe_allow_html=True)
-    player = get_player_info(player_id)
+    player = cached_section("profile", player_id, ("players", "player_standings", "achievements"),
+                            lambda: get_player_info(player_id))
     if not player:
         st.error("Player info not found!")
         return
@@ -93,27 +89,36 @@ def render(player_id):
     col1, col2, col3 = st.columns([1, 2, 3])
 
     with col1:
+        # Gallery index is rebuilt only when the folder changes; previews come from the thumbnail cache
+        gallery = get_avatar_gallery(AVATAR_FOLDER, GALLERY_THUMB_SIZE)
         selected = st.session_state.get("selected_avatar_name") or player.get("avatar_path")
-        preview_path = os.path.join(AVATAR_FOLDER, selected) if selected and os.path.exists(os.path.join(AVATAR_FOLDER, selected)) else None
+        preview_uri = thumbnail_data_uri(os.path.join(AVATAR_FOLDER, selected), 160) if selected and selected in gallery else None
 
-        if preview_path:
-            img = Image.open(preview_path)
-            b64 = image_to_base64(img)
-            st.markdown(f"<div class='avatar-frame' style='background-image:url(data:image/png;base64,{b64});'></div>", unsafe_allow_html=True)
+        if preview_uri:
+            st.markdown(f"<div class='avatar-frame' style='background-image:url({preview_uri});'></div>", unsafe_allow_html=True)
         else:
             st.markdown("<div class='avatar-frame' style='display:flex;align-items:center;justify-content:center;color:#999;'>No Avatar</div>", unsafe_allow_html=True)
 
         if st.session_state.get("edit_mode", False):
             st.markdown("### 🎨 Choose Your Avatar")
-            files = sorted(glob.glob(os.path.join(AVATAR_FOLDER, "*.png")) + glob.glob(os.path.join(AVATAR_FOLDER, "*.jpg")))
-            if not files:
+            if not gallery.names:
                 st.warning("Add avatar images to Assets/Avatars folder.")
             else:
+                # The sprite sheet is sent once; every tile is a window onto it
+                st.markdown(f"""
+                    <style>
+                    .avatar-sprite {{
+                        width: {GALLERY_THUMB_SIZE}px;
+                        height: {GALLERY_THUMB_SIZE}px;
+                        background-image: url({gallery.sprite_uri});
+                        background-repeat: no-repeat;
+                        display: inline-block;
+                    }}
+                    </style>
+                """, unsafe_allow_html=True)
                 gallery_cols = st.columns(4)
-                for idx, fpath in enumerate(files):
-                    fname = os.path.basename(fpath)
-                    img = Image.open(fpath).resize((100, 100))
-                    b64 = image_to_base64(img)
+                for idx, fname in enumerate(gallery.names):
+                    x, y = gallery.positions[fname]
                     border = "4px solid #3b82f6" if fname == st.session_state.get("selected_avatar_name") else "2px solid #ccc"
                     with gallery_cols[idx % 4]:
                         st.markdown(f"<div class='avatar-card'>", unsafe_allow_html=True)
@@ -121,7 +126,7 @@ def render(player_id):
                             st.session_state.selected_avatar_name = fname
                             st.rerun()
                         st.markdown(
-                            f"<img class='avatar-thumb' src='data:image/png;base64,{b64}' style='width:100px;height:100px;border:{border};'/>",
+                            f"<div class='avatar-thumb avatar-sprite' style='background-position:-{x}px -{y}px;border:{border};border-radius:50%;'></div>",
                             unsafe_allow_html=True
                         )
                         st.markdown("</div>", unsafe_allow_html=True)
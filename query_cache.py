@@ -0,0 +1,238 @@
+# query_cache.py
+"""
+Read-through cache for utils.fetch_one / fetch_all.
+
+Entries are keyed on whitespace-normalized SQL plus params, expire after
+QUERY_CACHE_TTL seconds and are evicted least-recently-used beyond
+QUERY_CACHE_SIZE. Every entry remembers the generation of each table its
+query reads; a committed write bumps the generations of the tables it
+touched (plus whatever the schema's triggers write in turn), so a stale
+entry is never served after a write made through the pool.
+
+Every statement run on a pooled connection is parsed for the tables it
+writes, whichever module runs it. Only writes whose tables can't be
+named (schema changes, or changes seen at commit with no statement
+noted) bump every table. Writes from other processes are only bounded
+by the TTL (and data_version.py).
+
+Per-query hit/miss counters are kept for the QUERY_CACHE_STATS_SIZE most
+recently used statements.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from db import add_commit_listener, add_statement_listener
+
+QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "1") == "1"
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "30"))
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "512"))
+QUERY_CACHE_STATS_SIZE = int(os.getenv("QUERY_CACHE_STATS_SIZE", "256"))
+
+_READ_TABLES = re.compile(r"\b(?:FROM|JOIN)\s+[\"`\[]?(\w+)", re.IGNORECASE)
+_WRITE_TABLES = re.compile(
+    r"\b(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+[\"`\[]?(\w+)",
+    re.IGNORECASE,
+)
+# Statements that change the schema; what they touch can't be tracked per table.
+_SCHEMA_CHANGES = ("CREATE", "DROP", "ALTER")
+# Results that depend on the clock or chance are never cached.
+_VOLATILE = re.compile(r"'now'|\bCURRENT_(?:DATE|TIME|TIMESTAMP)\b|\bRANDOM\s*\(", re.IGNORECASE)
+
+
+def normalize_sql(query):
+    return " ".join(query.split())
+
+
+def read_tables(query):
+    return frozenset(name.lower() for name in _READ_TABLES.findall(query))
+
+
+def written_tables(query):
+    return frozenset(name.lower() for name in _WRITE_TABLES.findall(query))
+
+
+def is_cacheable(query):
+    head = query.lstrip().split(None, 1)[0].upper() if query.strip() else ""
+    return head in ("SELECT", "WITH") and not written_tables(query) and not _VOLATILE.search(query)
+
+
+class QueryCache:
+    def __init__(self, ttl=QUERY_CACHE_TTL, max_entries=QUERY_CACHE_SIZE, max_stats=QUERY_CACHE_STATS_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_stats = max_stats
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (sql, params) -> (expires_at, generations, value)
+        self._generations = {}         # table -> generation
+        self._epoch = 0                # bumped when every table is invalidated
+        self._trigger_targets = None   # table -> tables its triggers write
+        self._stats = OrderedDict()    # sql -> {"hits", "misses", "invalidated"}, LRU
+
+    # ---------- lookups ----------
+
+    def _snapshot(self, tables):
+        return (self._epoch, tuple(sorted((t, self._generations.get(t, 0)) for t in tables)))
+
+    def _query_stats(self, sql):
+        stats = self._stats.get(sql)
+        if stats is None:
+            stats = self._stats[sql] = {"hits": 0, "misses": 0, "invalidated": 0}
+            while len(self._stats) > self.max_stats:
+                self._stats.popitem(last=False)
+        else:
+            self._stats.move_to_end(sql)
+        return stats
+
+    def get_or_load(self, query, params, loader):
+        """Return the cached result for (query, params), calling loader() on a miss."""
+        sql = normalize_sql(query)
+        try:
+            key = (sql, tuple(params))
+            hash(key)
+        except TypeError:
+            return loader()  # unhashable params, e.g. a list of dicts
+
+        tables = read_tables(sql)
+        now = time.monotonic()
+        with self._lock:
+            stats = self._query_stats(sql)
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, generations, value = entry
+                if expires_at > now and generations == self._snapshot(tables):
+                    self._entries.move_to_end(key)
+                    stats["hits"] += 1
+                    return value
+                del self._entries[key]
+                if expires_at > now:
+                    stats["invalidated"] += 1
+            stats["misses"] += 1
+            generations = self._snapshot(tables)
+
+        value = loader()
+
+        with self._lock:
+            # A write that committed while we were loading makes this result
+            # potentially stale; only store it if nothing moved.
+            if generations == self._snapshot(tables):
+                self._entries[key] = (now + self.ttl, generations, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    # ---------- invalidation ----------
+
+    def _expand(self, tables, conn):
+        if self._trigger_targets is None and conn is not None:
+            self._trigger_targets = _trigger_targets(conn)
+        targets = self._trigger_targets or {}
+        pending, seen = list(tables), set(tables)
+        while pending:
+            for table in targets.get(pending.pop(), ()):
+                if table not in seen:
+                    seen.add(table)
+                    pending.append(table)
+        return seen
+
+    def invalidate(self, tables=None, conn=None):
+        """Bump the given tables (and their trigger targets); None bumps everything."""
+        with self._lock:
+            if tables is None:
+                self._epoch += 1
+                self._trigger_targets = None  # the schema may have changed too
+                return
+            for table in self._expand({t.lower() for t in tables}, conn):
+                self._generations[table] = self._generations.get(table, 0) + 1
+
+    def generations(self, tables):
+        """Opaque token that changes whenever any of `tables` is written."""
+        with self._lock:
+            return self._snapshot({t.lower() for t in tables})
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+
+    def stats(self):
+        """Per-query hit/miss counters, busiest queries first."""
+        with self._lock:
+            rows = [{"query": sql, **counts} for sql, counts in self._stats.items()]
+            size = len(self._entries)
+        for row in rows:
+            total = row["hits"] + row["misses"]
+            row["hit_rate"] = round(row["hits"] / total, 3) if total else 0.0
+        rows.sort(key=lambda r: r["hits"] + r["misses"], reverse=True)
+        return {"entries": size, "max_entries": self.max_entries, "ttl": self.ttl,
+                "max_stats": self.max_stats, "queries": rows}
+
+
+def _trigger_targets(conn):
+    targets = {}
+    for table, sql in conn.execute("SELECT tbl_name, sql FROM sqlite_master WHERE type = 'trigger'"):
+        body = sql.split("BEGIN", 1)[-1] if sql else ""
+        targets.setdefault(table.lower(), set()).update(written_tables(body))
+    return targets
+
+
+_cache = QueryCache()
+
+
+def get_cache():
+    return _cache
+
+
+def cached(query, params, loader):
+    if not QUERY_CACHE_ENABLED:
+        return loader()
+    if not is_cacheable(query):
+        return loader()
+    return _cache.get_or_load(query, params, loader)
+
+
+@lru_cache(maxsize=1024)
+def _statement_writes(query):
+    """(tables the statement writes, whether it changes the schema)."""
+    head = query.lstrip().split(None, 1)[0].upper() if query.strip() else ""
+    return written_tables(query), head in _SCHEMA_CHANGES
+
+
+def note_write(conn, query):
+    """
+    Record the tables a statement writes so the next commit bumps only
+    those. Called for every statement on a pooled connection; reads note
+    nothing, schema changes make the next commit bump every table.
+    """
+    tables, schema_change = _statement_writes(query)
+    if tables:
+        pending = getattr(conn, "_written_tables", None)
+        conn._written_tables = (pending or set()) | tables
+    if schema_change:
+        conn._unknown_write = True
+
+
+def _on_commit(conn):
+    changes = conn.total_changes
+    changed = changes != getattr(conn, "_seen_changes", 0)
+    conn._seen_changes = changes
+    tables = getattr(conn, "_written_tables", None)
+    unknown = getattr(conn, "_unknown_write", False)
+    conn._written_tables, conn._unknown_write = None, False
+
+    if unknown or (changed and not tables):
+        _cache.invalidate(None)
+    elif tables:
+        _cache.invalidate(tables, conn)
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+add_statement_listener(note_write)
+add_commit_listener(_on_commit)
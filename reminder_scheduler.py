@@ -0,0 +1,203 @@
+# reminder_scheduler.py
+"""
+Deadline reminder scheduler, run as its own process instead of inside the
+Streamlit rerun loop:
+
+    python reminder_scheduler.py            # run forever
+    python reminder_scheduler.py --once     # fire whatever is due now, then exit
+    python reminder_scheduler.py --list     # show the upcoming schedule
+
+Fire times come from the round calendar: each level in REMINDER_LEVELS
+fires a fixed offset before the round's prediction deadline. Between
+events the process sleeps until the next one is due (capped at
+REMINDER_MAX_SLEEP_SECONDS so new or moved rounds are noticed).
+
+Delivery is exactly-once per (round, level): the outbox batch id is
+deterministic and unique per recipient, and `reminder_ledger` records the
+reminder once it is queued. A crash in between just re-queues the same
+batch, which is a no-op. A reminder that could not be queued at all (say
+the database was locked) stays out of the ledger and is tried again a
+minute later, within the grace period.
+
+The scheduler also drains the email outbox: messages left for a retry
+or claimed by a dispatcher that crashed are sent as soon as they are due,
+whichever reminder they belong to.
+
+Timing follows utils.should_trigger_reminder: an event counts as due from
+REMINDER_MARGIN_MINUTES before its fire time. One that was missed by more
+than REMINDER_GRACE_MINUTES (the scheduler was down) is recorded as
+skipped rather than sent late, and so is any level a later one has
+already overtaken.
+"""
+import argparse
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from db import connection
+from email_outbox import dispatch_outbox, seconds_until_due
+from round_calendar import get_round_calendar, local_tz
+from send_email import send_reminder_email_to_all
+from utils import should_trigger_reminder
+
+# (level, how long before the prediction deadline it fires)
+REMINDER_LEVELS = (
+    ("2days", timedelta(days=2)),
+    ("1day", timedelta(days=1)),
+    ("2hours", timedelta(hours=2)),
+)
+REMINDER_MARGIN_MINUTES = float(os.getenv("REMINDER_MARGIN_MINUTES", "1"))
+REMINDER_GRACE_MINUTES = float(os.getenv("REMINDER_GRACE_MINUTES", "180"))
+REMINDER_MAX_SLEEP_SECONDS = float(os.getenv("REMINDER_MAX_SLEEP_SECONDS", "900"))
+
+def _recorded():
+    with connection() as conn:
+        return {(row[0], row[1]) for row in conn.execute("SELECT round_id, level FROM reminder_ledger")}
+
+
+def _record(round_id, level, fire_at, status, batch=None):
+    with connection() as conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO reminder_ledger (round_id, level, fire_at, status, batch) VALUES (?, ?, ?, ?, ?)",
+            (round_id, level, fire_at.isoformat(), status, batch),
+        )
+        conn.commit()
+
+
+def planned_reminders(now=None):
+    """
+    Every reminder not yet in the ledger for rounds whose deadline is ahead
+    (or just passed, within the grace period), as dicts sorted by fire time.
+    """
+    now = now or datetime.now(timezone.utc)
+    grace = timedelta(minutes=REMINDER_GRACE_MINUTES)
+    done = _recorded()
+    planned = []
+    for round_info in get_round_calendar().rounds:
+        deadline = round_info["deadline_utc"]
+        if not deadline or deadline + grace < now:
+            continue
+        for level, before in REMINDER_LEVELS:
+            if (round_info["id"], level) in done:
+                continue
+            planned.append({
+                "round": round_info,
+                "level": level,
+                "fire_at": deadline - before,
+            })
+    planned.sort(key=lambda r: r["fire_at"])
+    return planned
+
+
+def _is_due(fire_at, now):
+    # should_trigger_reminder works on naive local times
+    naive = lambda t: t.astimezone(local_tz).replace(tzinfo=None)
+    return fire_at <= now or should_trigger_reminder(naive(fire_at), naive(now), REMINDER_MARGIN_MINUTES)
+
+
+def run_due_reminders(now=None, dry_run=False):
+    """Send (or skip) every reminder that is due; returns [(round name, level, status)]."""
+    now = now or datetime.now(timezone.utc)
+    grace = timedelta(minutes=REMINDER_GRACE_MINUTES)
+    outcomes = []
+
+    due = [r for r in planned_reminders(now) if _is_due(r["fire_at"], now)]
+    latest_due = {}
+    for reminder in due:  # sorted by fire time, so the last one per round wins
+        latest_due[reminder["round"]["id"]] = reminder["level"]
+
+    for reminder in due:
+        round_info, level, fire_at = reminder["round"], reminder["level"], reminder["fire_at"]
+        overtaken = latest_due[round_info["id"]] != level
+        if overtaken or now - fire_at > grace or round_info["deadline_utc"] <= now:
+            status, batch = "skipped", None
+        elif dry_run:
+            status, batch = "would send", None
+        else:
+            batch = send_reminder_email_to_all(
+                round_info["name"],
+                round_info["deadline_utc"],
+                round_info["first_kickoff_utc"].astimezone(local_tz),
+                round_info["match_count"],
+                level,
+                wait=True,
+                round_id=round_info["id"],
+            )
+            if batch is None:
+                # Nothing was queued: leave it out of the ledger so the next pass tries again
+                outcomes.append((round_info["name"], level, "failed"))
+                continue
+            status = "sent"
+        if not dry_run:
+            _record(round_info["id"], level, fire_at, status, batch)
+        outcomes.append((round_info["name"], level, status))
+    return outcomes
+
+
+def seconds_until_next(now=None):
+    now = now or datetime.now(timezone.utc)
+    upcoming = [r["fire_at"] for r in planned_reminders(now) if not _is_due(r["fire_at"], now)]
+    if not upcoming:
+        return REMINDER_MAX_SLEEP_SECONDS
+    wake_at = min(upcoming) - timedelta(minutes=REMINDER_MARGIN_MINUTES)
+    return max(0.0, min((wake_at - now).total_seconds(), REMINDER_MAX_SLEEP_SECONDS))
+
+
+def drain_outbox():
+    """Send whatever is due in the outbox (retries, stale claims); returns the totals or None."""
+    due_in = seconds_until_due()
+    if due_in is None or due_in > 0:
+        return None
+    totals = dispatch_outbox()
+    print(f"📨 Outbox drained: {totals}")
+    return totals
+
+
+def run_forever(stop_event=None):
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        try:
+            outcomes = run_due_reminders()
+            for round_name, level, status in outcomes:
+                print(f"📧 {round_name} / {level}: {status}")
+            drain_outbox()
+            delay = seconds_until_next()
+            if any(status == "failed" for _, _, status in outcomes):
+                delay = min(delay, 60)
+            outbox_due_in = seconds_until_due()
+            if outbox_due_in is not None:
+                delay = min(delay, max(outbox_due_in, 1.0))
+        except Exception as e:
+            print(f"❌ Reminder scheduler error: {e}")
+            delay = 60
+        stop_event.wait(delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prediction deadline reminder scheduler")
+    parser.add_argument("--once", action="store_true", help="handle due reminders and exit")
+    parser.add_argument("--list", action="store_true", help="print the upcoming schedule and exit")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be sent without sending")
+    args = parser.parse_args()
+
+    if args.list:
+        for reminder in planned_reminders():
+            fire_local = reminder["fire_at"].astimezone(local_tz)
+            print(f"{fire_local:%Y-%m-%d %H:%M}  {reminder['round']['name']}  {reminder['level']}")
+        return
+    if args.once or args.dry_run:
+        for round_name, level, status in run_due_reminders(dry_run=args.dry_run):
+            print(f"📧 {round_name} / {level}: {status}")
+        if args.once:
+            drain_outbox()
+        return
+
+    print("⏰ Reminder scheduler started.")
+    try:
+        run_forever()
+    except KeyboardInterrupt:
+        print("👋 Reminder scheduler stopped.")
+
+
+if __name__ == '__main__':
+    main()
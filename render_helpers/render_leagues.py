@@ -1,11 +1,12 @@
 import streamlit as st
+from asset_store import logo_image
 from controllers.manage_leagues_controller import (
     save_uploaded_file,get_leagues,add_league, 
     update_league, delete_league,
      update_league, get_stages_by_league, 
      update_stage, delete_stage, add_stage
     )
-from db import get_connection
+from db import connection
 LEAGUE_ICON = "🏆"
 TEAM_ICON = "⚽"
 EDIT_ICON = "✏️"
@@ -147,11 +148,8 @@ def render_add_league_form():
                 try:
                     add_league(name, country, logo)
 
-                    conn = get_connection()
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT id FROM leagues WHERE name = ?", (name,))
-                    league_id = cursor.fetchone()[0]
-                    conn.close()
+                    with connection() as conn:
+                        league_id = conn.execute("SELECT id FROM leagues WHERE name = ?", (name,)).fetchone()[0]
 
                     for stage in st.session_state.stages_list:
                         add_stage(
@@ -236,7 +234,10 @@ def render_league_list(leagues):
             if logo_path:
                 try:
                     st.markdown('<div class="logo-img">', unsafe_allow_html=True)
-                    st.image(logo_path, width=40)
+                    logo = logo_image(logo_path, 40)
+                    if logo is None:
+                        raise FileNotFoundError(logo_path)
+                    st.image(logo, width=40)
                     st.markdown('</div>', unsafe_allow_html=True)
                 except Exception as e:
                     # Fallback if image can't be loaded
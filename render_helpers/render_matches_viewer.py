@@ -7,12 +7,13 @@ from controllers.manage_matches_controller import get_all_leagues, get_teams_by_
 # View match part
 from controllers.manage_matches_controller import (fetch_rounds, fetch_matches_by_round, delete_match_by_id, 
                                                    update_match_partial, fetch_leagues, fetch_teams, 
-                                                   change_match_status, insert_or_replace_leg, fetch_legs_by_match_id,
+                                                   insert_or_replace_leg, fetch_legs_by_match_id,
                                                    fetch_stage_by_id, handle_two_leg_match_info)
 from controllers.manage_predictions_controller import update_scores_for_match
 from itertools import groupby
 from datetime import datetime, timedelta
 from utils import fetch_one, execute_query
+from asset_store import logo_image
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
 
@@ -357,7 +358,6 @@ def render_view_matches_tab():
             minutes_left = int(total_seconds_left / 60)
             match_date = match_time.date()
             time_str = match_time.strftime('%I:%M %p')
-            change_match_status(match)
 
             # 🧭 Display tag and live progress bar
             if 0 < minutes_left < 1:
@@ -455,8 +455,9 @@ def render_view_matches_tab():
             # Home Team
             with cols[0]:
                 st.markdown("<div style='text-align:center;'>", unsafe_allow_html=True)
-                if home_logo_path:
-                    st.image(home_logo_path, width=45)
+                home_logo_image = logo_image(home_logo_path, 45)
+                if home_logo_image:
+                    st.image(home_logo_image, width=45)
                 st.markdown(
                     f"<div style='font-weight:600;margin-top:5px;'>{match['home_team_name']}</div>",
                     unsafe_allow_html=True
@@ -489,8 +490,9 @@ def render_view_matches_tab():
             # Away Team
             with cols[2]:
                 st.markdown("<div style='text-align:center;'>", unsafe_allow_html=True)
-                if away_logo_path:
-                    st.image(away_logo_path, width=45)
+                away_logo_image = logo_image(away_logo_path, 45)
+                if away_logo_image:
+                    st.image(away_logo_image, width=45)
                 st.markdown(
                     f"<div style='font-weight:600;margin-top:5px;'>{match['away_team_name']}</div>",
                     unsafe_allow_html=True
@@ -1,10 +1,12 @@
 from controllers.predictions_controllers import (
     format_time_left, get_next_round_info,
     get_all_rounds, get_round_id_by_name, get_matches_by_round, get_team_info, get_user_prediction, format_time_left_detailed,
-    get_score_color, get_match_timing_display, get_player_name, get_prediction_deadline_for_round
+    get_score_color, get_match_timing_display, get_player_name, get_prediction_deadline_for_round,
+    load_round_view, load_round_live, get_predicted_match_count
 )
-from controllers.manage_matches_controller import change_match_status
+import os
 import streamlit as st
+from data_version import REFRESH_LIVE_MS, REFRESH_SOON_MINUTES, cached_section, refresh_interval_ms
 from datetime import datetime, timezone, timedelta
 from zoneinfo import ZoneInfo  # Python 3.9+
 from operator import itemgetter
@@ -19,7 +21,13 @@ from controllers.manage_predictions_controller import (
     fetch_match_by_id
 )
 from render_helpers.render_predictions import render_prediction_input
+from asset_store import logo_image
 local_tz = ZoneInfo("Africa/Cairo")
+# Tables load_round_view() reads
+ROUND_VIEW_TABLES = ("matches", "teams", "leagues", "stages", "two_legged_ties", "predictions", "players")
+# Countdowns and live scores are fragments on their own timers; the rest of the page only reruns on interaction
+COUNTDOWN_REFRESH_SECONDS = float(os.getenv("COUNTDOWN_REFRESH_SECONDS", "30"))
+LIVE_REFRESH_SECONDS = REFRESH_LIVE_MS / 1000
 def render_deadline(round_name, deadline_utc, match_count, number_of_predicted_matches=0):
     if not deadline_utc:
         st.warning("📅 No upcoming round or deadline found.")
@@ -120,7 +128,6 @@ def render_match_info(match_dt, status, home_score, away_score, prediction, matc
     match_result = render_match_result(match)
     date_display = render_match_timing(match_dt)
     time_str = match_dt.strftime('%I:%M %p')
-    change_match_status(match)
 
     # Default message
     prediction_display = "<b style='color: gray;'>Match not predicted yet.</b>"
@@ -159,8 +166,59 @@ def render_match_info(match_dt, status, home_score, away_score, prediction, matc
 
 
 
-    
-def render_match_card(match, player_id, round_id):
+
+def _deadline_banner(player_id):
+    round_name, deadline, match_time, match_count = get_next_round_info()
+    predicted = cached_section(
+        "predicted_count", (round_name, player_id), ("rounds", "matches", "predictions"),
+        lambda: get_predicted_match_count(round_name, player_id),
+    )
+    render_deadline(round_name, deadline, match_count, predicted)
+
+
+def render_deadline_live(player_id):
+    # Ticks every few seconds close to the deadline, otherwise every COUNTDOWN_REFRESH_SECONDS
+    run_every = min(refresh_interval_ms() / 1000, COUNTDOWN_REFRESH_SECONDS)
+    st.fragment(_deadline_banner, run_every=run_every)(player_id)
+
+
+def _live_match_info(match, prediction, player_id):
+    # Fragment reruns get the arguments of the last full run: re-read what can change since
+    live = cached_section(
+        "round_live", (match["round_id"], player_id), ("matches", "predictions"),
+        lambda: load_round_live(match["round_id"], player_id),
+    ).get(match["id"])
+    if live:
+        match = {**match, **{k: live[k] for k in ("status", "home_score", "away_score", "penalty_winner")}}
+        if prediction is not None:
+            prediction = {**prediction, "score": live["prediction_score"]}
+    match_dt = datetime.fromisoformat(match["match_datetime"]).replace(tzinfo=local_tz)
+    render_match_info(match_dt, match["status"], match["home_score"], match["away_score"], prediction, match)
+
+
+def _match_refresh_seconds(match):
+    status = (match["status"] or "").lower()
+    if status in ("finished", "cancelled"):
+        return None
+    if status == "live":
+        return LIVE_REFRESH_SECONDS
+    kickoff = datetime.fromisoformat(match["match_datetime"]).replace(tzinfo=local_tz)
+    if kickoff - datetime.now(timezone.utc) <= timedelta(minutes=REFRESH_SOON_MINUTES):
+        return LIVE_REFRESH_SECONDS
+    return COUNTDOWN_REFRESH_SECONDS
+
+
+def render_match_info_live(match, prediction, player_id):
+    """render_match_info() in a fragment that refreshes its countdown and score; finished matches are drawn once."""
+    run_every = _match_refresh_seconds(match)
+    if run_every is None:
+        _live_match_info(match, prediction, player_id)
+    else:
+        st.fragment(_live_match_info, run_every=run_every)(match, prediction, player_id)
+
+
+def render_match_card(match, player_id, round_id, view=None):
+    # `view` is the load_round_view() bundle; without it fall back to per-match lookups
     match_id = match["id"]
     home_id = match["home_team_id"]
     away_id = match["away_team_id"]
@@ -169,19 +227,24 @@ def render_match_card(match, player_id, round_id):
     home_score = match["home_score"]
     away_score = match["away_score"]
 
-    home_name, home_logo = get_team_info(home_id)
-    away_name, away_logo = get_team_info(away_id)
+    if view is not None:
+        home_name, home_logo = match["home_team_name"], match["home_logo"]
+        away_name, away_logo = match["away_team_name"], match["away_logo"]
+        prediction = view["predictions"].get(match_id)
+        selected_player_name = view["player_name"]
+        deadline_utc = view["deadline_utc"]
+    else:
+        home_name, home_logo = get_team_info(home_id)
+        away_name, away_logo = get_team_info(away_id)
+        prediction = get_user_prediction(player_id, match_id)
+        selected_player_name = get_player_name(player_id)
+        deadline_utc = get_prediction_deadline_for_round(match["round_id"])
+    selected_player_id = player_id
 
     # Convert match time from string to datetime with timezone info
     match_dt = datetime.fromisoformat(datetime_str).replace(tzinfo=local_tz)
 
-    prediction = get_user_prediction(player_id, match_id)
-    selected_player_name = get_player_name(player_id)
-    selected_player_id = player_id
-
     # Get the prediction deadline and current local time
-    round_id = match["round_id"]  # ensure using correct round
-    deadline_utc = get_prediction_deadline_for_round(round_id)
     deadline_local = deadline_utc.astimezone(local_tz) if deadline_utc else None
     now_local = datetime.now(timezone.utc).astimezone(local_tz)
 
@@ -192,19 +255,21 @@ def render_match_card(match, player_id, round_id):
     # Home Team
     with cols[0]:
         st.markdown("<div style='text-align:center;'>", unsafe_allow_html=True)
-        if home_logo:
-            st.image(home_logo, width=45)
+        home_logo_image = logo_image(home_logo, 45)
+        if home_logo_image:
+            st.image(home_logo_image, width=45)
         st.markdown(f"<div style='font-weight:600;margin-top:5px;'>{home_name}</div>", unsafe_allow_html=True)
 
     # Match Info Center
     with cols[1]:
-        render_match_info(match_dt, status, home_score, away_score, prediction, match, return_html=False)
+        render_match_info_live(match, prediction, player_id)
 
     # Away Team
     with cols[2]:
         st.markdown("<div style='text-align:center;'>", unsafe_allow_html=True)
-        if away_logo:
-            st.image(away_logo, width=45)
+        away_logo_image = logo_image(away_logo, 45)
+        if away_logo_image:
+            st.image(away_logo_image, width=45)
         st.markdown(f"<div style='font-weight:600;margin-top:5px;'>{away_name}</div>", unsafe_allow_html=True)
 
     # Prediction Button or Deadline Passed
@@ -244,8 +309,12 @@ def render_rounds(player_id, round_name):
     )
     selected_round_id = round_dict[selected_round_name]
 
-    # Fetch matches for selected round
-    matches = get_matches_by_round(selected_round_id)
+    # Fetch matches, teams, this player's predictions and the deadline in one go
+    view = cached_section(
+        "round_view", (selected_round_id, player_id), ROUND_VIEW_TABLES,
+        lambda: load_round_view(selected_round_id, player_id),
+    )
+    matches = view["matches"]
 
     st.markdown(f"## 🏟️ Matches in {selected_round_name}")
 
@@ -253,11 +322,11 @@ def render_rounds(player_id, round_name):
         st.info("No matches found for this round.")
         return
 
-    matches.sort(key=itemgetter('league_name'))
-    for league, group in groupby(matches, key=itemgetter('league_name')):
+    # `view` is shared through the section cache: sort a copy
+    for league, group in groupby(sorted(matches, key=itemgetter('league_name')), key=itemgetter('league_name')):
         st.markdown(f"""🏆 {league}""", unsafe_allow_html=True)
         for match in group:
-            render_match_card(match, player_id, selected_round_id)
+            render_match_card(match, player_id, selected_round_id, view)
 
 
 
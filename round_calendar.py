@@ -0,0 +1,156 @@
+# round_calendar.py
+"""
+In-memory round calendar.
+
+All rounds are loaded once, with their first kickoff and match count, into
+an array sorted by start date; date -> round and "current or next round"
+are answered with bisect instead of range scans over `rounds`. The
+calendar is rebuilt when a committed write touches `rounds` or `matches`
+(via the query cache's table generations), or after ROUND_CALENDAR_TTL
+seconds to pick up writes made by other processes.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from db import connection
+from query_cache import get_cache
+
+ROUND_CALENDAR_TTL = float(os.getenv("ROUND_CALENDAR_TTL", "60"))
+
+local_tz = ZoneInfo("Africa/Cairo")
+
+# Predictions close this long before the round's first kickoff.
+DEADLINE_MARGIN = timedelta(hours=2)
+
+CALENDAR_QUERY = """
+    SELECT r.id, r.name, r.start_date, r.end_date,
+           MIN(m.match_datetime) AS first_kickoff,
+           COUNT(m.id) AS match_count
+    FROM rounds r
+    LEFT JOIN matches m ON m.round_id = r.id
+    GROUP BY r.id
+"""
+
+
+def get_week_saturday_to_friday(date_str):
+    """
+    Given a date string 'YYYY-MM-DD', returns (start_date, end_date) of
+    the round week: Saturday to next Friday.
+    """
+    date_obj = datetime.strptime(date_str, "%Y-%m-%d")
+
+    # weekday(): Monday=0 ... Sunday=6
+    days_since_saturday = (date_obj.weekday() - 5) % 7  # Saturday=5
+    start_date = date_obj - timedelta(days=days_since_saturday)
+    end_date = start_date + timedelta(days=6)
+
+    return start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+
+
+def _day(value):
+    # Dates are stored as 'YYYY-MM-DD' (sometimes with a time part); compare by day.
+    return str(value)[:10]
+
+
+class RoundCalendar:
+    def __init__(self, rows):
+        rounds = []
+        for row in rows:
+            first_kickoff = row["first_kickoff"]
+            if first_kickoff:
+                kickoff_utc = datetime.fromisoformat(first_kickoff).replace(tzinfo=local_tz).astimezone(timezone.utc)
+            else:
+                kickoff_utc = None
+            rounds.append({
+                "id": row["id"],
+                "name": row["name"],
+                "start_date": _day(row["start_date"]),
+                "end_date": _day(row["end_date"]),
+                "first_kickoff_utc": kickoff_utc,
+                "deadline_utc": kickoff_utc - DEADLINE_MARGIN if kickoff_utc else None,
+                "match_count": row["match_count"],
+            })
+        rounds.sort(key=lambda r: (r["start_date"], r["id"]))
+
+        self.rounds = rounds
+        self._starts = [r["start_date"] for r in rounds]
+        self._by_id = {r["id"]: r for r in rounds}
+        # Running max of end dates, so overlapping rounds can't hide one another.
+        self._max_end = []
+        latest = ""
+        for r in rounds:
+            latest = max(latest, r["end_date"])
+            self._max_end.append(latest)
+
+    def by_id(self, round_id):
+        return self._by_id.get(round_id)
+
+    def round_for_date(self, date):
+        """The earliest-starting round whose [start, end] contains `date`, or None."""
+        day = _day(date)
+        i = bisect_right(self._starts, day) - 1
+        found = None
+        while i >= 0 and self._max_end[i] >= day:
+            if self.rounds[i]["end_date"] >= day:
+                found = self.rounds[i]
+            i -= 1
+        return found
+
+    def next_round_after(self, date):
+        """The first round starting strictly after `date`, or None."""
+        i = bisect_right(self._starts, _day(date))
+        return self.rounds[i] if i < len(self.rounds) else None
+
+    def rounds_between(self, start, end):
+        lo, hi = bisect_left(self._starts, _day(start)), bisect_right(self._starts, _day(end))
+        return self.rounds[lo:hi]
+
+    def open_round(self, now_utc=None):
+        """
+        The round players should be predicting now: the current round if its
+        deadline is still ahead, otherwise the next one. None if neither is open.
+        """
+        now_utc = now_utc or datetime.now(timezone.utc)
+        today = now_utc.astimezone(local_tz).date().isoformat()
+        for candidate in (self.round_for_date(today), self.next_round_after(today)):
+            if candidate and candidate["deadline_utc"] and candidate["deadline_utc"] > now_utc:
+                return candidate
+        return None
+
+
+_lock = threading.Lock()
+_calendar = None
+_calendar_token = None
+_built_at = 0.0
+
+
+def _tables_token():
+    return get_cache().generations(("rounds", "matches"))
+
+
+def get_round_calendar():
+    """The shared calendar, rebuilt if rounds/matches changed or the TTL ran out."""
+    global _calendar, _calendar_token, _built_at
+    token = _tables_token()
+    with _lock:
+        if (_calendar is not None and token == _calendar_token
+                and time.monotonic() - _built_at < ROUND_CALENDAR_TTL):
+            return _calendar
+
+    with connection() as conn:
+        calendar = RoundCalendar(conn.execute(CALENDAR_QUERY).fetchall())
+
+    with _lock:
+        # Keep the token read before loading: a write racing the load forces another rebuild.
+        _calendar, _calendar_token, _built_at = calendar, token, time.monotonic()
+    return calendar
+
+
+def invalidate_round_calendar():
+    global _calendar
+    with _lock:
+        _calendar = None
@@ -0,0 +1,206 @@
+# scoring.py
+"""
+Set-based prediction scoring.
+
+Scores every prediction of a set of finished matches with one SELECT that
+evaluates the same rules as utils_prediction.calculate_prediction_score:
+
+    3 points  exact score
+    1 point   right outcome (home win / draw / away win)
+    +1 point  predicted penalty winner matches the actual one
+
+and writes only the rows whose score changed with a single executemany in
+one transaction. The per-row standings triggers are suspended meanwhile and
+player_standings gets one aggregated update per affected player instead.
+"""
+from standings import (
+    apply_standings_deltas, refresh_standings_ranks,
+    resume_standings_triggers, suspend_standings_triggers,
+)
+
+DIRTY_MATCHES_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS dirty_matches (
+        match_id INTEGER PRIMARY KEY,
+        marked_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (match_id) REFERENCES matches(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_dirty_match_result
+    AFTER UPDATE OF home_score, away_score, penalty_winner ON matches
+    WHEN OLD.home_score IS NOT NEW.home_score
+      OR OLD.away_score IS NOT NEW.away_score
+      OR OLD.penalty_winner IS NOT NEW.penalty_winner
+    BEGIN
+        INSERT OR REPLACE INTO dirty_matches (match_id) VALUES (NEW.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_dirty_match_insert
+    AFTER INSERT ON matches
+    WHEN NEW.home_score IS NOT NULL AND NEW.away_score IS NOT NULL
+    BEGIN
+        INSERT OR REPLACE INTO dirty_matches (match_id) VALUES (NEW.id);
+    END
+    """,
+    # insert_or_replace_leg goes through INSERT OR REPLACE, which always
+    # lands here as an insert.
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_dirty_leg_insert
+    AFTER INSERT ON legs
+    BEGIN
+        INSERT OR REPLACE INTO dirty_matches (match_id) VALUES (NEW.match_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_dirty_leg_update
+    AFTER UPDATE OF home_score, away_score, winner_team_id ON legs
+    BEGIN
+        INSERT OR REPLACE INTO dirty_matches (match_id) VALUES (NEW.match_id);
+    END
+    """,
+    # Predictions entered or edited after the final whistle need scoring too.
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_dirty_prediction_insert
+    AFTER INSERT ON predictions
+    WHEN EXISTS (SELECT 1 FROM matches WHERE id = NEW.match_id AND home_score IS NOT NULL)
+    BEGIN
+        INSERT OR REPLACE INTO dirty_matches (match_id) VALUES (NEW.match_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_dirty_prediction_update
+    AFTER UPDATE OF predicted_home_score, predicted_away_score, predicted_penalty_winner, match_id ON predictions
+    WHEN EXISTS (SELECT 1 FROM matches WHERE id = NEW.match_id AND home_score IS NOT NULL)
+    BEGIN
+        INSERT OR REPLACE INTO dirty_matches (match_id) VALUES (NEW.match_id);
+    END
+    """,
+]
+
+# SQLite's default bound-parameter limit is 999 on older builds.
+MATCH_ID_CHUNK = 500
+
+SCORE_SELECT_SQL = """
+    SELECT p.id, p.player_id, p.score, new_score
+    FROM (
+        SELECT
+            p.id,
+            p.player_id,
+            p.score,
+            CASE
+                WHEN p.predicted_home_score = m.home_score
+                 AND p.predicted_away_score = m.away_score THEN 3
+                WHEN (p.predicted_home_score > p.predicted_away_score) - (p.predicted_home_score < p.predicted_away_score)
+                   = (m.home_score > m.away_score) - (m.home_score < m.away_score) THEN 1
+                ELSE 0
+            END
+            + CASE
+                WHEN pw.name IS NOT NULL AND pw.name = p.predicted_penalty_winner THEN 1
+                ELSE 0
+            END AS new_score
+        FROM predictions p
+        JOIN matches m ON m.id = p.match_id
+        LEFT JOIN teams pw ON pw.id = m.penalty_winner
+        WHERE m.home_score IS NOT NULL
+          AND m.away_score IS NOT NULL
+          {match_filter}
+    ) p
+    WHERE p.score IS NOT new_score
+"""
+
+
+def _changed_scores(conn, match_ids):
+    if match_ids is None:
+        return conn.execute(SCORE_SELECT_SQL.format(match_filter="")).fetchall()
+
+    rows = []
+    for i in range(0, len(match_ids), MATCH_ID_CHUNK):
+        chunk = match_ids[i:i + MATCH_ID_CHUNK]
+        placeholders = ",".join("?" for _ in chunk)
+        sql = SCORE_SELECT_SQL.format(match_filter=f"AND m.id IN ({placeholders})")
+        rows.extend(conn.execute(sql, chunk).fetchall())
+    return rows
+
+
+def create_dirty_matches_schema(conn):
+    for statement in DIRTY_MATCHES_SCHEMA:
+        conn.execute(statement)
+
+
+def mark_all_matches_dirty(conn):
+    """Queue every finished match, e.g. when the queue is first introduced."""
+    conn.execute("""
+        INSERT OR REPLACE INTO dirty_matches (match_id)
+        SELECT id FROM matches WHERE home_score IS NOT NULL AND away_score IS NOT NULL
+    """)
+
+
+def _clear_dirty(conn, match_ids):
+    finished = "SELECT id FROM matches WHERE home_score IS NOT NULL AND away_score IS NOT NULL"
+    if match_ids is None:
+        conn.execute(f"DELETE FROM dirty_matches WHERE match_id IN ({finished})")
+        return
+    for i in range(0, len(match_ids), MATCH_ID_CHUNK):
+        chunk = match_ids[i:i + MATCH_ID_CHUNK]
+        placeholders = ",".join("?" for _ in chunk)
+        conn.execute(
+            f"DELETE FROM dirty_matches WHERE match_id IN ({placeholders}) AND match_id IN ({finished})",
+            chunk,
+        )
+
+
+def score_matches(conn, match_ids=None):
+    """
+    Rescore predictions for `match_ids` (every match when None).
+
+    Matches without a final score are left alone (and stay queued in
+    dirty_matches). Returns the number of predictions whose score changed.
+    """
+    if match_ids is not None:
+        match_ids = list(dict.fromkeys(match_ids))
+        if not match_ids:
+            return 0
+
+    try:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")  # read and write the same snapshot
+        changed = _changed_scores(conn, match_ids)
+        if changed:
+            suspend_standings_triggers(conn)
+            conn.executemany(
+                "UPDATE predictions SET score = ? WHERE id = ?",
+                [(new_score, prediction_id) for prediction_id, _, _, new_score in changed],
+            )
+            resume_standings_triggers(conn)
+            apply_standings_deltas(conn, [row[1:] for row in changed])
+            refresh_standings_ranks(conn)
+        _clear_dirty(conn, match_ids)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(changed)
+
+
+def score_dirty_matches(conn):
+    """
+    Rescore only the finished matches queued in dirty_matches.
+
+    Returns (scored, skipped, changed): matches rescored, finished matches
+    left alone because nothing changed since they were last scored, and
+    prediction scores that changed.
+    """
+    dirty = [row[0] for row in conn.execute("""
+        SELECT d.match_id
+        FROM dirty_matches d
+        JOIN matches m ON m.id = d.match_id
+        WHERE m.home_score IS NOT NULL AND m.away_score IS NOT NULL
+        ORDER BY d.match_id
+    """)]
+    finished = conn.execute(
+        "SELECT COUNT(*) FROM matches WHERE home_score IS NOT NULL AND away_score IS NOT NULL"
+    ).fetchone()[0]
+    changed = score_matches(conn, dirty) if dirty else 0
+    return len(dirty), finished - len(dirty), changed
@@ -1,22 +1,16 @@
 import os
-import smtplib
-import sqlite3
 from datetime import datetime, timedelta
+from itertools import groupby
 from dotenv import load_dotenv
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from db import get_connection
-from utils import fetch_all
+from utils import fetch_all, fetch_one
+from email_outbox import dispatch_in_background, dispatch_outbox, enqueue_emails
 from controllers.predictions_controllers import format_time_left, get_next_round_info, get_predicted_match_count
 from zoneinfo import ZoneInfo
 
 # Load environment variables
 load_dotenv()
 
-SMTP_SERVER = os.getenv('SMTP_SERVER')
-SMTP_PORT = int(os.getenv('SMTP_PORT'))
 SENDER_EMAIL = os.getenv('SENDER_EMAIL')
-SENDER_PASSWORD = os.getenv('SENDER_PASSWORD')
 
 def get_all_player_emails():
     """Returns a list of all player emails and usernames."""
@@ -25,10 +19,71 @@ def get_all_player_emails():
     return [(row["username"], row["email"]) for row in rows]
 
 
-def send_reminder_email_to_all(round_name, deadline, match_time, match_count, level):
+# One row per player and upcoming match, in kickoff order; the rows are
+# grouped per player in Python so the fixture list keeps that order
+# (GROUP_CONCAT makes no ordering promise).
+REMINDER_AUDIENCE_QUERY = """
+    SELECT pl.id AS player_id, pl.username, pl.email,
+           pr.id IS NOT NULL AS predicted,
+           '• ' || ht.name || ' vs ' || at.name
+               || ' (' || substr(COALESCE(datetime(m.match_datetime), m.match_datetime), 1, 16) || ')' AS fixture
+    FROM players pl
+    CROSS JOIN (
+        SELECT id, home_team_id, away_team_id, match_datetime
+        FROM matches
+        WHERE round_id = ? AND status = 'upcoming'
+    ) m
+    JOIN teams ht ON ht.id = m.home_team_id
+    JOIN teams at ON at.id = m.away_team_id
+    LEFT JOIN predictions pr ON pr.player_id = pl.id AND pr.match_id = m.id
+    ORDER BY pl.id, datetime(m.match_datetime), m.id
+"""
+
+
+def get_reminder_audience(round_id):
+    """
+    Players who still have upcoming matches to predict in the round, from
+    one query: [{username, email, match_count, predicted, missing,
+    missing_fixtures}], missing_fixtures being one line per match in
+    kickoff order.
+    """
+    audience = []
+    rows = fetch_all(REMINDER_AUDIENCE_QUERY, (round_id,))
+    for _, player_rows in groupby(rows, key=lambda row: row["player_id"]):
+        player_rows = list(player_rows)
+        missing = [row["fixture"] for row in player_rows if not row["predicted"]]
+        if not missing:
+            continue
+        audience.append({
+            "username": player_rows[0]["username"],
+            "email": player_rows[0]["email"],
+            "match_count": len(player_rows),
+            "predicted": len(player_rows) - len(missing),
+            "missing": len(missing),
+            "missing_fixtures": "\n".join(missing),
+        })
+    return audience
+
+
+def _round_id_for_name(round_name):
+    row = fetch_one("SELECT id FROM rounds WHERE name = ? ORDER BY start_date DESC LIMIT 1", (round_name,))
+    return row["id"] if row else None
+
+
+def send_reminder_email_to_all(round_name, deadline, match_time, match_count, level, wait=False, round_id=None):
     """
     Send a customized reminder email based on level.
     Levels: "2days", "1day", "2hours", or "test"
+
+    Messages are rendered and queued in the email outbox, then sent by the
+    pooled dispatcher: on a background thread by default, inline with
+    wait=True. A round/level pair is only ever queued once per recipient
+    (test reminders get a fresh batch each time). Returns the batch id once
+    the messages are safely queued, or None if they could not be queued.
+    Send failures after that are the outbox's to retry.
+
+    Real reminders only go to players with unpredicted upcoming matches in
+    the round, and list exactly those fixtures; test reminders go to everyone.
     """
     tz = ZoneInfo("Africa/Cairo")
     now = datetime.now(tz)
@@ -45,7 +100,7 @@ The excitement is building! The round **{round_name}** kicks off soon.
 📊 Matches in this Round: {match_count}
 
 You've still got **2 full days** to make your predictions. Don’t miss out – the leaderboard is waiting!
-
+{missing_section}
 🔥 Show us your football wisdom!
 """
     elif level == "1day":
@@ -60,7 +115,7 @@ Only **1 day left** until the deadline for round **{round_name}**.
 📊 Matches in Round: {match_count}
 
 Your next big move could change the game. Submit your predictions now and stay ahead of the pack!
-
+{missing_section}
 💪 Let’s make it count!
 """
     elif level == "2hours":
@@ -72,8 +127,8 @@ Hi {username},
 
 Deadline: {deadline}
 
-⚠️ If you've already predicted – you're awesome. If not, now's your last chance!
-
+⚠️ Now's your last chance!
+{missing_section}
 🏁 Let's kick off in style!
 """
     elif level.lower() == "test":
@@ -100,34 +155,52 @@ This is a **TEST EMAIL** to preview reminders for the round **{round_name}**.
         print("⚠️ Invalid reminder level provided.")
         return
 
-    # Send Emails
-    recipients = get_all_player_emails()
+    # Render every message up front, queue them, and let the dispatcher send
+    fields = dict(
+        round_name=round_name,
+        match_time=match_time.strftime('%Y-%m-%d %H:%M'),
+        deadline=deadline.strftime('%Y-%m-%d %H:%M'),
+        match_count=match_count,
+    )
+    if level.lower() == "test":
+        recipients = get_all_player_emails()
+        messages = [
+            (email, subject, body_template.format(username=username, **fields))
+            for username, email in recipients
+        ]
+    else:
+        recipients = get_reminder_audience(round_id or _round_id_for_name(round_name))
+        messages = [
+            (player["email"], subject, body_template.format(
+                username=player["username"],
+                missing_section=(
+                    f"\n📝 Still to predict ({player['missing']} of {player['match_count']}):\n"
+                    f"{player['missing_fixtures']}\n"
+                ),
+                **fields,
+            ))
+            for player in recipients
+        ]
+
+    batch = f"reminder:{round_name}:{level}"
+    if level.lower() == "test":
+        batch += f":{now.strftime('%Y%m%d%H%M%S')}"
 
     try:
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SENDER_EMAIL, SENDER_PASSWORD)
-
-            for username, email in recipients:
-                formatted_body = body_template.format(
-                    username=username,
-                    round_name=round_name,
-                    match_time=match_time.strftime('%Y-%m-%d %H:%M'),
-                    deadline=deadline.strftime('%Y-%m-%d %H:%M'),
-                    match_count=match_count
-                )
-
-                message = MIMEMultipart()
-                message["From"] = SENDER_EMAIL
-                message["To"] = email
-                message["Subject"] = subject
-                message.attach(MIMEText(formatted_body, "plain"))
-
-                server.sendmail(SENDER_EMAIL, email, message.as_string())
-
-        print(f"✅ {level.upper()} reminder sent to {len(recipients)} players.")
+        queued = enqueue_emails(batch, messages)
     except Exception as e:
-        print(f"❌ Failed to send {level.upper()} reminder:", e)
-
-
+        print(f"❌ Failed to queue {level.upper()} reminder:", e)
+        return None
+    print(f"📨 {level.upper()} reminder queued for {queued} of {len(recipients)} players.")
 
+    # Drain the whole outbox, not just this batch, so earlier retries go out too
+    try:
+        if wait:
+            totals = dispatch_outbox()
+            print(f"✅ Outbox drained: {totals['sent']} sent, {totals['retry']} to retry, {totals['failed']} failed.")
+        else:
+            dispatch_in_background()
+    except Exception as e:
+        # Queued rows stay in the outbox and are retried by the next drain
+        print(f"❌ Failed to send {level.upper()} reminder now, will retry:", e)
+    return batch
@@ -0,0 +1,241 @@
+# standings.py
+"""
+Materialized player standings.
+
+`player_standings` holds one row per player with total_points, exact_hits
+(predictions scored 3+), outcome_hits (predictions scored 1-2) and a dense
+rank. Triggers on `predictions` and `players` keep the totals in step with
+every score change; ranks are refreshed once per scoring batch with
+refresh_standings_ranks().
+
+Bulk writers can switch the prediction triggers off for the duration of
+their own transaction with suspend_standings_triggers() and apply the
+aggregated deltas themselves via apply_standings_deltas().
+
+    python standings.py    # rebuild from scratch and report any drift
+"""
+import sqlite3
+
+STANDINGS_SCHEMA = [
+    # A row here (only ever visible inside the writer's own transaction)
+    # turns the per-row prediction triggers off.
+    "CREATE TABLE IF NOT EXISTS standings_suspended (id INTEGER PRIMARY KEY CHECK (id = 1))",
+    """
+    CREATE TABLE IF NOT EXISTS player_standings (
+        player_id INTEGER PRIMARY KEY,
+        total_points INTEGER NOT NULL DEFAULT 0,
+        exact_hits INTEGER NOT NULL DEFAULT 0,
+        outcome_hits INTEGER NOT NULL DEFAULT 0,
+        rank INTEGER,
+        last_updated TEXT DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (player_id) REFERENCES players(id) ON DELETE CASCADE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_player_standings_points ON player_standings(total_points)",
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_standings_player_insert
+    AFTER INSERT ON players
+    BEGIN
+        INSERT OR IGNORE INTO player_standings (player_id) VALUES (NEW.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_standings_player_delete
+    AFTER DELETE ON players
+    BEGIN
+        DELETE FROM player_standings WHERE player_id = OLD.id;
+        UPDATE player_standings SET rank = (
+            SELECT COUNT(DISTINCT s.total_points) + 1
+            FROM player_standings s
+            WHERE s.total_points > player_standings.total_points
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_standings_prediction_insert
+    AFTER INSERT ON predictions
+    WHEN NOT EXISTS (SELECT 1 FROM standings_suspended)
+    BEGIN
+        UPDATE player_standings SET
+            total_points = total_points + COALESCE(NEW.score, 0),
+            exact_hits = exact_hits + (COALESCE(NEW.score, 0) >= 3),
+            outcome_hits = outcome_hits + (COALESCE(NEW.score, 0) IN (1, 2)),
+            last_updated = CURRENT_TIMESTAMP
+        WHERE player_id = NEW.player_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_standings_prediction_update
+    AFTER UPDATE OF score, player_id ON predictions
+    WHEN (OLD.score IS NOT NEW.score OR OLD.player_id IS NOT NEW.player_id)
+     AND NOT EXISTS (SELECT 1 FROM standings_suspended)
+    BEGIN
+        UPDATE player_standings SET
+            total_points = total_points - COALESCE(OLD.score, 0),
+            exact_hits = exact_hits - (COALESCE(OLD.score, 0) >= 3),
+            outcome_hits = outcome_hits - (COALESCE(OLD.score, 0) IN (1, 2)),
+            last_updated = CURRENT_TIMESTAMP
+        WHERE player_id = OLD.player_id;
+        UPDATE player_standings SET
+            total_points = total_points + COALESCE(NEW.score, 0),
+            exact_hits = exact_hits + (COALESCE(NEW.score, 0) >= 3),
+            outcome_hits = outcome_hits + (COALESCE(NEW.score, 0) IN (1, 2)),
+            last_updated = CURRENT_TIMESTAMP
+        WHERE player_id = NEW.player_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_standings_prediction_delete
+    AFTER DELETE ON predictions
+    WHEN NOT EXISTS (SELECT 1 FROM standings_suspended)
+    BEGIN
+        UPDATE player_standings SET
+            total_points = total_points - COALESCE(OLD.score, 0),
+            exact_hits = exact_hits - (COALESCE(OLD.score, 0) >= 3),
+            outcome_hits = outcome_hits - (COALESCE(OLD.score, 0) IN (1, 2)),
+            last_updated = CURRENT_TIMESTAMP
+        WHERE player_id = OLD.player_id;
+    END
+    """,
+]
+
+# Totals computed straight from `predictions`; the reference the
+# incremental triggers must agree with.
+STANDINGS_FROM_SCRATCH_SQL = """
+    SELECT
+        p.id AS player_id,
+        COALESCE(SUM(pr.score), 0) AS total_points,
+        COALESCE(SUM(COALESCE(pr.score, 0) >= 3), 0) AS exact_hits,
+        COALESCE(SUM(COALESCE(pr.score, 0) IN (1, 2)), 0) AS outcome_hits
+    FROM players p
+    LEFT JOIN predictions pr ON pr.player_id = p.id
+    GROUP BY p.id
+"""
+
+# Dense rank: players level on points share a rank and the next one follows on.
+REFRESH_RANKS_SQL = """
+    UPDATE player_standings SET rank = (
+        SELECT COUNT(DISTINCT s.total_points) + 1
+        FROM player_standings s
+        WHERE s.total_points > player_standings.total_points
+    )
+"""
+
+
+PREDICTION_TRIGGERS = (
+    "trg_standings_prediction_insert",
+    "trg_standings_prediction_update",
+    "trg_standings_prediction_delete",
+)
+
+
+def create_standings_schema(conn):
+    for statement in STANDINGS_SCHEMA:
+        conn.execute(statement)
+
+
+def recreate_prediction_triggers(conn):
+    for trigger in PREDICTION_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    create_standings_schema(conn)
+
+
+def suspend_standings_triggers(conn):
+    """Disable the prediction triggers until the current transaction ends."""
+    conn.execute("INSERT OR IGNORE INTO standings_suspended (id) VALUES (1)")
+
+
+def resume_standings_triggers(conn):
+    conn.execute("DELETE FROM standings_suspended")
+
+
+def _hit_counts(score):
+    score = score or 0
+    return score, int(score >= 3), int(score in (1, 2))
+
+
+def apply_standings_deltas(conn, changes):
+    """
+    Fold score changes into player_standings in one executemany.
+
+    `changes` is an iterable of (player_id, old_score, new_score).
+    """
+    deltas = {}
+    for player_id, old_score, new_score in changes:
+        old, new = _hit_counts(old_score), _hit_counts(new_score)
+        total, exact, outcome = deltas.get(player_id, (0, 0, 0))
+        deltas[player_id] = (total + new[0] - old[0], exact + new[1] - old[1], outcome + new[2] - old[2])
+
+    conn.executemany("""
+        UPDATE player_standings SET
+            total_points = total_points + ?,
+            exact_hits = exact_hits + ?,
+            outcome_hits = outcome_hits + ?,
+            last_updated = CURRENT_TIMESTAMP
+        WHERE player_id = ?
+    """, [(*delta, player_id) for player_id, delta in deltas.items() if any(delta)])
+
+
+def refresh_standings_ranks(conn):
+    conn.execute(REFRESH_RANKS_SQL)
+
+
+def compute_standings(conn):
+    """Return {player_id: (total_points, exact_hits, outcome_hits)} from scratch."""
+    return {
+        row[0]: (row[1], row[2], row[3])
+        for row in conn.execute(STANDINGS_FROM_SCRATCH_SQL)
+    }
+
+
+def find_standings_drift(conn):
+    """Return [(player_id, stored, expected)] where the table disagrees with a full recount."""
+    expected = compute_standings(conn)
+    stored = {
+        row[0]: (row[1], row[2], row[3])
+        for row in conn.execute(
+            "SELECT player_id, total_points, exact_hits, outcome_hits FROM player_standings"
+        )
+    }
+    return [
+        (player_id, stored.get(player_id), expected.get(player_id))
+        for player_id in sorted(set(expected) | set(stored))
+        if stored.get(player_id) != expected.get(player_id)
+    ]
+
+
+def rebuild_player_standings(conn):
+    """
+    Recompute every row from `predictions` and re-rank.
+
+    Returns the drift found before the rebuild, so callers can tell whether
+    the incremental maintenance had gone wrong. Does not commit: migrations
+    run it inside their own transaction.
+    """
+    drift = find_standings_drift(conn)
+    conn.execute("DELETE FROM player_standings")
+    conn.execute(f"""
+        INSERT INTO player_standings (player_id, total_points, exact_hits, outcome_hits)
+        {STANDINGS_FROM_SCRATCH_SQL}
+    """)
+    refresh_standings_ranks(conn)
+    return drift
+
+
+def main():
+    from db import DB_FILE
+    from migrations import run_migrations
+    conn = sqlite3.connect(DB_FILE)
+    try:
+        run_migrations(conn)
+        drift = rebuild_player_standings(conn)
+        conn.commit()
+        for player_id, stored, expected in drift:
+            print(f"⚠️ player {player_id}: stored={stored} expected={expected}")
+        print(f"✅ Standings rebuilt ({len(drift)} player(s) had drifted).")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
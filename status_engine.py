@@ -0,0 +1,223 @@
+# status_engine.py
+"""
+Background match status transitions.
+
+Matches go upcoming -> live at kickoff and live -> finished
+STATUS_FINISH_HOURS later (imported matches, whose real status comes from
+live_scores.py, only after STATUS_IMPORTED_FINISH_HOURS, as a fallback).
+Render code no longer writes statuses; this engine does.
+
+The next transition of every open match sits in a min-heap keyed by its
+due time. The engine thread sleeps until the earliest one is due, applies
+everything due in one batched UPDATE and goes back to sleep. Each UPDATE
+re-checks the stored status and kickoff, so a heap entry made stale by a
+reschedule or a manual edit does nothing. The heap is rebuilt when a
+commit in this process touches `matches`, or every STATUS_RESYNC_SECONDS
+to pick up other processes' writes.
+
+    python status_engine.py    # run the engine in the foreground
+"""
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from db import add_commit_listener, connection
+from query_cache import get_cache
+
+local_tz = ZoneInfo("Africa/Cairo")
+
+STATUS_FINISH_HOURS = float(os.getenv("STATUS_FINISH_HOURS", "3"))
+STATUS_IMPORTED_FINISH_HOURS = float(os.getenv("STATUS_IMPORTED_FINISH_HOURS", "4"))
+STATUS_RESYNC_SECONDS = float(os.getenv("STATUS_RESYNC_SECONDS", "300"))
+
+OPEN_MATCHES_QUERY = """
+    SELECT id, match_datetime, status, external_id IS NOT NULL AS imported
+    FROM matches
+    WHERE status IN ('upcoming', 'live')
+"""
+
+# new status -> the status the match must still have
+TRANSITIONS = {
+    "live": "upcoming",
+    "finished": "live",
+}
+
+
+def _now():
+    # Kickoffs are stored as naive Cairo time
+    return datetime.now(local_tz).replace(tzinfo=None)
+
+
+def _finish_after(imported):
+    return timedelta(hours=STATUS_IMPORTED_FINISH_HOURS if imported else STATUS_FINISH_HOURS)
+
+
+def build_schedule(rows):
+    """Min-heap of (due_at, match_id, new_status, kickoff, imported) for the open matches."""
+    heap = []
+    for row in rows:
+        kickoff = datetime.fromisoformat(row["match_datetime"])
+        if row["status"] == "upcoming":
+            heap.append((kickoff, row["id"], "live", row["match_datetime"], row["imported"]))
+        else:
+            heap.append((kickoff + _finish_after(row["imported"]), row["id"], "finished",
+                         row["match_datetime"], row["imported"]))
+    heapq.heapify(heap)
+    return heap
+
+
+class StatusEngine:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._heap = []
+        self._token = None
+        self._loaded_at = 0.0
+        self._thread = None
+        self.stats = {"applied": 0, "batches": 0, "rebuilds": 0, "last_run": None}
+
+    # ---------- schedule ----------
+
+    def _matches_token(self):
+        return get_cache().generations(("matches",))
+
+    def reload(self):
+        token = self._matches_token()
+        with connection() as conn:
+            heap = build_schedule(conn.execute(OPEN_MATCHES_QUERY).fetchall())
+        with self._lock:
+            self._heap, self._token, self._loaded_at = heap, token, time.monotonic()
+            self.stats["rebuilds"] += 1
+
+    def _stale(self):
+        return (self._token != self._matches_token()
+                or time.monotonic() - self._loaded_at >= STATUS_RESYNC_SECONDS)
+
+    def on_commit(self, conn):
+        # Called after every pooled commit: wake up if `matches` moved.
+        if self._thread is not None and self._token != self._matches_token():
+            self._wake.set()
+
+    # ---------- transitions ----------
+
+    def apply_due(self, now=None):
+        """Apply every transition due by `now` in one transaction; returns how many rows changed."""
+        now = now or _now()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap))
+        if not due:
+            return 0
+
+        changed = 0
+        with connection() as conn:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for new_status, required in TRANSITIONS.items():
+                    batch = [(new_status, match_id, required, kickoff)
+                             for _, match_id, status, kickoff, _ in due if status == new_status]
+                    if batch:
+                        changed += conn.executemany(
+                            "UPDATE matches SET status = ? WHERE id = ? AND status = ? AND match_datetime = ?",
+                            batch,
+                        ).rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                with self._lock:
+                    for entry in due:
+                        heapq.heappush(self._heap, entry)
+                raise
+
+        with self._lock:
+            # Matches that just went live are due to finish later
+            for _, match_id, status, kickoff, imported in due:
+                if status == "live":
+                    finish_at = datetime.fromisoformat(kickoff) + _finish_after(imported)
+                    heapq.heappush(self._heap, (finish_at, match_id, "finished", kickoff, imported))
+            self._token = self._matches_token()  # our own write needs no rebuild
+            self.stats["applied"] += changed
+            self.stats["batches"] += 1
+            self.stats["last_run"] = now.isoformat(timespec="seconds")
+        return changed
+
+    def next_transition(self):
+        """(due_at, match_id, new_status) of the earliest pending transition, or None."""
+        with self._lock:
+            if not self._heap:
+                return None
+            due_at, match_id, status, _, _ = self._heap[0]
+            return due_at, match_id, status
+
+    def seconds_until_next(self, now=None):
+        upcoming = self.next_transition()
+        until_resync = max(0.0, STATUS_RESYNC_SECONDS - (time.monotonic() - self._loaded_at))
+        if upcoming is None:
+            return until_resync
+        return max(0.0, min((upcoming[0] - (now or _now())).total_seconds(), until_resync))
+
+    # ---------- thread ----------
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                if self._stale():
+                    self.reload()
+                changed = self.apply_due()
+                if changed:
+                    print(f"⏱️ Match status engine: {changed} matches moved on.")
+            except Exception as e:
+                print(f"❌ Match status engine error: {e}")
+                self._stop.wait(30)
+                continue
+            self._wake.wait(self.seconds_until_next())
+            self._wake.clear()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="match-status-engine", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+
+_engine = StatusEngine()
+_start_lock = threading.Lock()
+add_commit_listener(_engine.on_commit)
+
+
+def start_status_engine():
+    """Start the process-wide engine thread (idempotent; safe to call on every rerun)."""
+    with _start_lock:
+        return _engine.start()
+
+
+def status_engine_stats():
+    upcoming = _engine.next_transition()
+    with _engine._lock:
+        stats = {**_engine.stats, "pending": len(_engine._heap)}
+    stats["next_transition_at"] = upcoming[0].isoformat(timespec="seconds") if upcoming else None
+    stats["next_transition_match"] = upcoming[1] if upcoming else None
+    stats["next_transition_status"] = upcoming[2] if upcoming else None
+    stats["seconds_to_next"] = round((upcoming[0] - _now()).total_seconds()) if upcoming else None
+    return stats
+
+
+if __name__ == '__main__':
+    print("⏱️ Match status engine started.")
+    start_status_engine()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        _engine.stop()
+        print("👋 Match status engine stopped.")
@@ -0,0 +1,122 @@
+# tests/conftest.py
+"""
+Every test runs against a throwaway copy of game_database.db: DB_FILE is
+pointed at it before any app module (and so db.py) is imported, and the
+pool migrates it on first use. Files the app writes next to the database
+(logo store, thumbnails, API cache) go to the same temporary directory.
+
+The `football_api` fixture serves a stub football-data.org API on localhost;
+`add_match` inserts matches that are deleted again after the test.
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MATCH_TEMPLATE_COLUMNS = ("round_id", "league_id", "home_team_id", "away_team_id", "stage_id")
+
+_db_dir = tempfile.mkdtemp(prefix="game-db-")
+os.environ["DB_FILE"] = os.path.join(_db_dir, "game_database.db")
+os.environ["ASSET_STORE_DIR"] = os.path.join(_db_dir, "store")
+os.environ["THUMBNAIL_DIR"] = os.path.join(_db_dir, "thumbnails")
+os.environ["FOOTBALL_DATA_CACHE_DIR"] = os.path.join(_db_dir, "api_cache")
+shutil.copy(os.path.join(ROOT, "game_database.db"), os.environ["DB_FILE"])
+# Logo paths in the database are relative to its directory
+os.symlink(os.path.join(ROOT, "assets"), os.path.join(_db_dir, "assets"))
+
+API_TOKEN = "test-token"
+
+
+class StubAPI:
+    """
+    A football-data.org stand-in on localhost. Tests set `respond(path,
+    params, headers) -> (status, headers, body)`; requests with another
+    token get a 403 like the real API. Every request is kept in `requests`.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.respond = lambda path, params, headers: (404, {}, {"message": "not stubbed"})
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                path = url.path.removeprefix("/v4/")
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                headers = dict(self.headers)
+                with stub._lock:
+                    stub.requests.append((path, params, headers))
+                if self.headers.get("X-Auth-Token") != API_TOKEN:
+                    status, extra, body = 403, {}, {"message": "The resource you are looking for is restricted."}
+                else:
+                    status, extra, body = stub.respond(path, params, headers)
+                payload = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                for name, value in extra.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/v4"
+        threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def football_api():
+    api = StubAPI()
+    yield api
+    api.close()
+
+
+@pytest.fixture
+def add_match():
+    """
+    add_match(match_datetime, **columns) -> match id. Columns not given are
+    copied from the first stored match (round, league, teams, stage). The
+    matches and their predictions are deleted after the test.
+    """
+    from db import connection
+
+    added = []
+
+    def add(match_datetime, **columns):
+        with connection() as conn:
+            template = conn.execute(
+                f"SELECT {', '.join(MATCH_TEMPLATE_COLUMNS)} FROM matches ORDER BY id LIMIT 1"
+            ).fetchone()
+            values = {**dict(template), "match_datetime": match_datetime, **columns}
+            match_id = conn.execute(
+                f"INSERT INTO matches ({', '.join(values)}) VALUES ({', '.join('?' for _ in values)})",
+                tuple(values.values()),
+            ).lastrowid
+            conn.commit()
+        added.append(match_id)
+        return match_id
+
+    yield add
+    with connection() as conn:
+        placeholders = ",".join("?" for _ in added)
+        conn.execute(f"DELETE FROM predictions WHERE match_id IN ({placeholders})", added)
+        conn.execute(f"DELETE FROM matches WHERE id IN ({placeholders})", added)
+        conn.commit()
@@ -0,0 +1,61 @@
+import io
+import os
+import sqlite3
+
+from PIL import Image
+
+from asset_store import is_store_key, migrate_logo_paths
+from controllers.manage_leagues_controller import add_league, get_leagues, update_league
+from db import connection
+
+
+def _png(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class Upload(io.BytesIO):
+    """Stands in for a Streamlit UploadedFile."""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+def test_league_logo_uploads_go_to_the_store():
+    add_league("Store Test League", "Nowhere", Upload(_png("red"), "logo.png"))
+    league = next(l for l in get_leagues("Store Test League"))
+    try:
+        assert is_store_key(league["logo_path"])
+        assert os.path.exists(league["logo_path"])
+
+        # The same bytes under another name are the same asset
+        update_league(league["id"], league["name"], league["country"], Upload(_png("red"), "renamed.png"))
+        assert get_leagues("Store Test League")[0]["logo_path"] == league["logo_path"]
+    finally:
+        with connection() as conn:
+            conn.execute("DELETE FROM leagues WHERE id = ?", (league["id"],))
+            conn.commit()
+
+
+def test_migration_resolves_paths_against_the_database(tmp_path, monkeypatch, capsys):
+    (tmp_path / "assets" / "teams").mkdir(parents=True)
+    (tmp_path / "assets" / "teams" / "a.png").write_bytes(_png("blue"))
+    (tmp_path / "assets" / "teams" / "b.png").write_bytes(_png("green"))
+    conn = sqlite3.connect(tmp_path / "game.db")
+    conn.execute("CREATE TABLE teams (id INTEGER PRIMARY KEY, logo_path TEXT)")
+    conn.execute("CREATE TABLE leagues (id INTEGER PRIMARY KEY, logo_path TEXT)")
+    conn.executemany("INSERT INTO teams (logo_path) VALUES (?)", [
+        ("assets/teams/a.png",), ("assets\\teams\\b.png",), ("assets/teams/gone.png",),
+    ])
+    conn.execute("INSERT INTO leagues (logo_path) VALUES ('assets/teams/a.png')")
+
+    monkeypatch.chdir(tmp_path.parent)  # not where the logos are
+    assert migrate_logo_paths(conn) == (3, 1)
+
+    paths = [row[0] for row in conn.execute("SELECT logo_path FROM teams ORDER BY id")]
+    assert is_store_key(paths[0]) and is_store_key(paths[1])
+    assert paths[2] == "assets/teams/gone.png"
+    assert conn.execute("SELECT logo_path FROM leagues").fetchone()[0] == paths[0]
+    assert "gone.png" in capsys.readouterr().out
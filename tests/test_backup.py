@@ -0,0 +1,79 @@
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backup import (BackupError, LocalDirectorySink, create_snapshot, list_snapshots, prune_snapshots,
+                    restore_snapshot, verify_snapshot)
+from db import connection
+
+
+@pytest.fixture
+def sink(tmp_path):
+    return LocalDirectorySink(str(tmp_path / "backups"))
+
+
+def _dump(path):
+    conn = sqlite3.connect(path)
+    try:
+        return list(conn.iterdump())
+    finally:
+        conn.close()
+
+
+def test_unchanged_database_adds_no_blocks(sink):
+    first = create_snapshot(sink, codec="gzip")
+    second = create_snapshot(sink, codec="gzip")
+
+    assert first["new_blocks"] == len(first["blocks"]) > 0
+    assert second["new_blocks"] == 0
+    assert second["blocks"] == first["blocks"]
+    assert [m["id"] for m in list_snapshots(sink)] == [first["id"], second["id"]]
+
+
+def test_verify_catches_a_corrupt_block(sink):
+    manifest = create_snapshot(sink, codec="gzip")
+    assert verify_snapshot(manifest["id"], sink)["id"] == manifest["id"]
+
+    name = sink.list("blocks")[0]
+    sink.put(name, b"not gzip")
+    with pytest.raises(BackupError, match="cannot be decompressed"):
+        verify_snapshot(manifest["id"], sink)
+
+
+def test_restore_round_trip(sink, tmp_path):
+    manifest = create_snapshot(sink, codec="gzip")
+    target = str(tmp_path / "restored.db")
+
+    restore_snapshot(manifest["id"], target, sink)
+
+    with connection() as conn:
+        live = list(conn.iterdump())
+    assert _dump(target) == live
+
+
+def test_prune_keeps_policy_and_referenced_blocks(sink):
+    old, recent, newest = (create_snapshot(sink, codec="gzip") for _ in range(3))
+    now = datetime.now(timezone.utc)
+    for manifest, age in ((old, 20), (recent, 3)):
+        manifest["created_at"] = (now - timedelta(days=age)).isoformat()
+        sink.put(f"snapshots/{manifest['id']}.json", json.dumps(manifest).encode())
+    orphan = "blocks/ff/" + "f" * 64 + ".gz"
+    sink.put(orphan, b"unused")
+
+    assert prune_snapshots(sink, keep_last=1, keep_daily=14, now=now) == (1, 1)
+
+    assert {m["id"] for m in list_snapshots(sink)} == {recent["id"], newest["id"]}
+    assert not sink.exists(orphan)
+    verify_snapshot(recent["id"], sink)
+    verify_snapshot(newest["id"], sink)
+
+
+def test_prune_waits_for_a_running_snapshot(sink):
+    with sink.lock():
+        with pytest.raises(BackupError, match="held by another backup"):
+            with sink.lock(timeout=0.2):
+                pass
+    with sink.lock(timeout=0.2):
+        pass
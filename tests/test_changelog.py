@@ -0,0 +1,53 @@
+import sqlite3
+
+import pytest
+
+from changelog import apply_changes, export_changes, replica_position
+from db import connection
+
+
+@pytest.fixture
+def replica(tmp_path):
+    """A copy of the live database, opened the way `changelog.py apply` opens it."""
+    path = str(tmp_path / "replica.db")
+    target = sqlite3.connect(path)
+    with connection() as conn:
+        conn.backup(target)
+    target.close()
+    conn = sqlite3.connect(path, isolation_level=None)
+    yield conn
+    conn.close()
+
+
+def _table(conn, sql):
+    return sorted(tuple(row) for row in conn.execute(sql))
+
+
+def test_apply_round_trip_reranks_and_is_idempotent(replica, add_match, tmp_path):
+    since = replica_position(replica)
+    match_id = add_match("2099-05-01 18:00:00")
+    with connection() as conn:
+        last_player = conn.execute(
+            "SELECT player_id FROM player_standings ORDER BY total_points, player_id LIMIT 1"
+        ).fetchone()[0]
+        conn.execute(
+            "INSERT INTO predictions (player_id, match_id, predicted_home_score, predicted_away_score, score) "
+            "VALUES (?, ?, 1, 0, 1000)",
+            (last_player, match_id),
+        )
+        conn.commit()
+        live_predictions = _table(conn, "SELECT id, player_id, match_id, score FROM predictions")
+
+    path = str(tmp_path / "changes.jsonl.gz")
+    written, last_seq = export_changes(path, since)
+    assert written >= 2  # the match and the prediction
+
+    assert apply_changes(path, replica) == (written, last_seq)
+    assert _table(replica, "SELECT id, player_id, match_id, score FROM predictions") == live_predictions
+    assert replica.execute(
+        "SELECT rank FROM player_standings WHERE player_id = ?", (last_player,)
+    ).fetchone()[0] == 1
+
+    before = list(replica.iterdump())
+    assert apply_changes(path, replica) == (0, last_seq)
+    assert list(replica.iterdump()) == before
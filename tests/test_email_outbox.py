@@ -0,0 +1,133 @@
+# tests/test_email_outbox.py
+import smtplib
+import socket
+import uuid
+
+import pytest
+from aiosmtpd.controller import Controller
+
+import email_outbox
+from db import connection
+
+
+class Handler:
+    """Accepts mail, except for addresses that ask for a 4xx or 5xx."""
+
+    def __init__(self):
+        self.delivered = []
+
+    async def handle_DATA(self, server, session, envelope):
+        recipient = envelope.rcpt_tos[0]
+        if recipient.startswith("busy"):
+            return "451 4.3.0 Try again later"
+        if recipient.startswith("gone"):
+            return "550 5.1.1 No such user"
+        self.delivered.append(recipient)
+        return "250 OK"
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = Handler()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield handler, lambda: smtplib.SMTP(controller.hostname, controller.port)
+    controller.stop()
+
+
+def _batch(*recipients):
+    batch = f"test:{uuid.uuid4().hex}"
+    email_outbox.enqueue_emails(batch, [(r, "Subject", "Body") for r in recipients])
+    return batch
+
+
+def _rows(batch):
+    with connection() as conn:
+        return {row["recipient"]: dict(row) for row in conn.execute(
+            "SELECT * FROM email_outbox WHERE batch = ?", (batch,)
+        )}
+
+
+def test_accepted_message_is_sent(smtp_server):
+    handler, open_smtp = smtp_server
+    batch = _batch("ok@example.com")
+
+    totals = email_outbox.dispatch_outbox(open_smtp=open_smtp)
+
+    assert totals["sent"] >= 1
+    assert _rows(batch)["ok@example.com"]["status"] == "sent"
+    assert "ok@example.com" in handler.delivered
+
+
+def test_temporary_error_is_retried(smtp_server):
+    handler, open_smtp = smtp_server
+    batch = _batch("busy@example.com")
+
+    email_outbox.dispatch_outbox(open_smtp=open_smtp)
+    row = _rows(batch)["busy@example.com"]
+    assert row["status"] == "pending"
+    assert row["attempts"] == 1
+    assert row["last_error"].startswith("451")
+    assert row["next_attempt_at"] > email_outbox._now()
+
+    # Once the retry is due, an unfiltered dispatch (from any batch's caller) picks it up
+    with connection() as conn:
+        conn.execute("UPDATE email_outbox SET recipient = 'ok-now@example.com', next_attempt_at = '2000-01-01 00:00:00' "
+                     "WHERE batch = ?", (batch,))
+        conn.commit()
+    assert email_outbox.seconds_until_due() == 0
+    _batch("other@example.com")
+    email_outbox.dispatch_outbox(open_smtp=open_smtp)
+    assert _rows(batch)["ok-now@example.com"]["status"] == "sent"
+
+
+def test_permanent_error_fails(smtp_server):
+    handler, open_smtp = smtp_server
+    batch = _batch("gone@example.com", "fine@example.com")
+
+    email_outbox.dispatch_outbox(open_smtp=open_smtp)
+    rows = _rows(batch)
+
+    assert rows["gone@example.com"]["status"] == "failed"
+    assert rows["gone@example.com"]["last_error"].startswith("550")
+    assert rows["fine@example.com"]["status"] == "sent"
+
+
+def test_unreachable_server_leaves_rows_for_retry():
+    batch = _batch("a@example.com", "b@example.com")
+
+    def refuse():
+        raise ConnectionRefusedError("connection refused")
+
+    totals = email_outbox.dispatch_outbox(open_smtp=refuse)
+
+    assert totals["retry"] >= 2
+    assert {row["status"] for row in _rows(batch).values()} == {"pending"}
+
+
+def test_stale_claim_is_recovered(smtp_server):
+    handler, open_smtp = smtp_server
+    batch = _batch("crashed@example.com")
+
+    # A dispatcher claims the row and dies before recording anything
+    claimed = email_outbox._claim(1000)
+    assert any(row["recipient"] == "crashed@example.com" for row in claimed)
+    assert _rows(batch)["crashed@example.com"]["status"] == "sending"
+
+    # A fresh claim is left alone...
+    email_outbox.dispatch_outbox(open_smtp=open_smtp)
+    assert _rows(batch)["crashed@example.com"]["status"] == "sending"
+
+    # ...a stale one is picked up again
+    with connection() as conn:
+        conn.execute("UPDATE email_outbox SET claimed_at = '2000-01-01 00:00:00' WHERE batch = ?", (batch,))
+        conn.commit()
+    email_outbox.dispatch_outbox(open_smtp=open_smtp)
+    assert _rows(batch)["crashed@example.com"]["status"] == "sent"
+    assert handler.delivered.count("crashed@example.com") == 1
@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+from db import connection
+from fixture_importer import import_fixtures, load_matches_file
+from round_calendar import get_week_saturday_to_friday
+
+PAYLOAD = os.path.join(os.path.dirname(__file__), "payloads", "fixtures_laliga.json")
+
+
+def _id(conn, query, params):
+    return conn.execute(query, params).fetchone()[0]
+
+
+@pytest.fixture
+def laliga():
+    """LaLiga's id and the ids of the teams in the payload; undoes the import afterwards."""
+    with connection() as conn:
+        league_id = _id(conn, "SELECT id FROM leagues WHERE name = 'LaLiga'", ())
+        teams = {name: _id(conn, "SELECT id FROM teams WHERE Official_name = ?", (name,))
+                 for name in ("FC Barcelona", "Athletic Club")}
+        last_round = _id(conn, "SELECT MAX(id) FROM rounds", ())
+        last_stage = _id(conn, "SELECT MAX(id) FROM stages", ())
+    yield league_id, teams
+    with connection() as conn:
+        conn.execute("DELETE FROM matches WHERE external_id BETWEEN 7001 AND 7004")
+        conn.execute("DELETE FROM rounds WHERE id > ?", (last_round,))
+        conn.execute("DELETE FROM stages WHERE id > ?", (last_stage,))
+        conn.commit()
+
+
+def _imported():
+    with connection() as conn:
+        return {row["external_id"]: row for row in conn.execute("""
+            SELECT m.id, m.external_id, m.match_datetime, r.start_date, r.end_date
+            FROM matches m JOIN rounds r ON r.id = m.round_id
+            WHERE m.external_id BETWEEN 7001 AND 7004
+        """)}
+
+
+def test_new_season_creates_rounds(laliga):
+    league_id, _ = laliga
+    summary = import_fixtures(load_matches_file(PAYLOAD), league_id)
+
+    assert summary["inserted"] == 3
+    assert summary["rounds_created"] == 2
+    assert summary["skipped"] == ["Unknown Town FC vs Getafe CF"]
+    for row in _imported().values():
+        week = get_week_saturday_to_friday(row["match_datetime"][:10])
+        assert (row["start_date"], row["end_date"]) == week
+
+
+def test_reimport_changes_nothing(laliga):
+    league_id, _ = laliga
+    import_fixtures(load_matches_file(PAYLOAD), league_id)
+    before = {external_id: dict(row) for external_id, row in _imported().items()}
+
+    summary = import_fixtures(load_matches_file(PAYLOAD), league_id)
+    assert {k: v for k, v in summary.items() if k != "skipped"} == {
+        "inserted": 0, "updated": 0, "adopted": 0, "rounds_created": 0, "stages_created": 0, "ties_created": 0,
+    }
+    assert {external_id: dict(row) for external_id, row in _imported().items()} == before
+
+
+def test_hand_entered_match_is_adopted(laliga, add_match):
+    league_id, teams = laliga
+    start_date, end_date = get_week_saturday_to_friday("2099-08-15")
+    with connection() as conn:
+        round_id = conn.execute(
+            "INSERT INTO rounds (name, start_date, end_date) VALUES ('Hand round', ?, ?)", (start_date, end_date)
+        ).lastrowid
+        conn.commit()
+    hand_entered = add_match("2099-08-15 18:00:00", round_id=round_id, league_id=league_id,
+                             home_team_id=teams["FC Barcelona"], away_team_id=teams["Athletic Club"])
+
+    summary = import_fixtures(load_matches_file(PAYLOAD), league_id)
+
+    assert (summary["adopted"], summary["inserted"], summary["rounds_created"]) == (1, 2, 1)
+    adopted = _imported()[7001]
+    assert adopted["id"] == hand_entered
+    assert adopted["match_datetime"] != "2099-08-15 18:00:00"  # moved to the API's kickoff
@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+
+import football_data
+from conftest import API_TOKEN
+from football_data import FootballDataClient, FootballDataError, TokenBucket
+
+
+class FakeClock:
+    """Monotonic clock that only moves when the bucket sleeps."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def _client(api, clock=None, **kwargs):
+    client = FootballDataClient(token=kwargs.pop("token", API_TOKEN), base_url=api.url, **kwargs)
+    if clock is not None:
+        client.bucket = TokenBucket(10, clock=clock, sleep=clock.sleep)
+    return client
+
+
+def test_not_modified_is_served_from_cache(football_api, tmp_path):
+    body = {"competitions": [{"code": "PL", "name": "Premier League"}]}
+
+    def respond(path, params, headers):
+        if headers.get("If-None-Match") == '"v1"':
+            return 304, {"ETag": '"v1"'}, None
+        return 200, {"ETag": '"v1"'}, body
+    football_api.respond = respond
+
+    with _client(football_api, cache_dir=str(tmp_path)) as client:
+        assert client.get("competitions", max_age=0) == body
+        assert client.get("competitions", max_age=0) == body
+        assert client.get("competitions", max_age=60) == body  # fresh: not asked at all
+
+    assert len(football_api.requests) == 2
+    assert football_api.requests[1][2].get("If-None-Match") == '"v1"'
+    assert client.stats == {"requests": 2, "not_modified": 1, "fresh_hits": 1, "throttled": 0}
+
+
+def test_too_many_requests_pauses_until_retry_after(football_api):
+    calls = []
+
+    def respond(path, params, headers):
+        calls.append(path)
+        if len(calls) == 1:
+            return 429, {"Retry-After": "30"}, {"message": "You reached your request limit."}
+        return 200, {}, {"matches": []}
+    football_api.respond = respond
+
+    clock = FakeClock()
+    with _client(football_api, clock=clock, cache_dir=None) as client:
+        assert client.get("matches") == {"matches": []}
+    assert client.stats["throttled"] == 1
+    assert sum(clock.slept) == pytest.approx(30)
+
+
+def test_empty_quota_holds_the_next_request(football_api):
+    football_api.respond = lambda path, params, headers: (
+        200, {"X-Requests-Available-Minute": "0", "X-RequestCounter-Reset": "20"}, {"teams": []}
+    )
+    clock = FakeClock()
+    with _client(football_api, clock=clock, cache_dir=None) as client:
+        client.get("competitions/PL/teams")
+        assert clock.slept == []
+        client.get("competitions/PD/teams")
+    assert sum(clock.slept) == pytest.approx(20)
+
+
+def test_fetch_many_runs_concurrently_and_keeps_order(football_api):
+    lock = threading.Lock()
+    in_flight = [0]
+    peak = [0]
+
+    def respond(path, params, headers):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        if path == "competitions/XX/matches":
+            return 404, {}, {"message": "Not found"}
+        return 200, {}, {"path": path}
+    football_api.respond = respond
+
+    codes = ["PL", "PD", "XX", "SA", "BL1", "FL1"]
+    with _client(football_api, cache_dir=None, workers=4) as client:
+        results = client.fetch_many([(f"competitions/{code}/matches", None) for code in codes])
+
+    assert peak[0] > 1
+    for code, result in zip(codes, results):
+        if code == "XX":
+            assert isinstance(result, FootballDataError) and result.status == 404
+        else:
+            assert result == {"path": f"competitions/{code}/matches"}
+
+
+def test_bad_token_is_rejected(football_api, monkeypatch):
+    with _client(football_api, token="not-the-token", cache_dir=None) as client:
+        with pytest.raises(FootballDataError) as excinfo:
+            client.competitions()
+    assert excinfo.value.status == 403
+    assert len(football_api.requests) == 1  # 4xx is not retried
+
+    monkeypatch.setattr(football_data, "FOOTBALL_DATA_TOKEN", None)
+    with pytest.raises(FootballDataError):
+        FootballDataClient(base_url=football_api.url)
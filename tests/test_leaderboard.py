@@ -0,0 +1,41 @@
+import pytest
+
+from controllers.leaderboard_controller import get_leaderboard
+from db import connection
+
+
+@pytest.fixture
+def tied_players():
+    """30 new players on the same (zero) points."""
+    names = [f"tied-{i:02d}" for i in range(30)]
+    with connection() as conn:
+        conn.executemany(
+            "INSERT INTO players (username, email, password_hash) VALUES (?, ?, 'x')",
+            [(name, f"{name}@example.com") for name in names],
+        )
+        conn.commit()
+        ids = {row["username"]: row["id"] for row in conn.execute(
+            f"SELECT id, username FROM players WHERE username IN ({','.join('?' for _ in names)})", names
+        )}
+    yield ids
+    with connection() as conn:
+        conn.executemany("DELETE FROM player_standings WHERE player_id = ?", [(i,) for i in ids.values()])
+        conn.executemany("DELETE FROM players WHERE id = ?", [(i,) for i in ids.values()])
+        conn.commit()
+
+
+def test_neighbourhood_is_bounded_under_ties(tied_players):
+    me = tied_players["tied-15"]
+    rows = get_leaderboard(offset=0, limit=3, around_player_id=me, radius=1)
+
+    page = [row for row in rows if row["in_page"]]
+    around = [row for row in rows if not row["in_page"]]
+    assert [row["position"] for row in page] == [1, 2, 3]
+    assert [row["username"] for row in around] == ["tied-14", "tied-15", "tied-16"]
+    assert [row["is_you"] for row in around] == [False, True, False]
+    assert len({row["rank"] for row in around}) == 1  # still shown as tied
+
+
+def test_neighbourhood_is_clipped_at_the_top(tied_players):
+    rows = get_leaderboard(offset=5, limit=2, around_player_id=get_leaderboard(limit=1)[0]["player_id"], radius=2)
+    assert [row["position"] for row in rows] == [1, 2, 3, 6, 7]
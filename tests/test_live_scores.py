@@ -0,0 +1,110 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import pytest
+
+import live_scores
+from conftest import API_TOKEN
+from db import connection
+from football_data import FootballDataClient
+
+PAYLOADS = os.path.join(os.path.dirname(__file__), "payloads")
+NOW = datetime(2099, 6, 1, 20, 0)
+
+
+def test_window_compares_both_datetime_forms(add_match):
+    # Window at NOW: kickoff up to 20:10, or since 16:00 and not finished, or live
+    edge_space = add_match("2099-06-01 20:10:00", external_id=8001)
+    edge_t = add_match("2099-06-01T20:10:00", external_id=8002)
+    add_match("2099-06-01 20:30:00", external_id=8003)        # opens at 20:20
+    started_space = add_match("2099-06-01 16:30:00", external_id=8004)
+    add_match("2099-06-01T15:30:00", external_id=8005)        # too long ago
+    live_long_ago = add_match("2099-06-01 12:00:00", status="live", external_id=8006)
+    add_match("2099-06-01 20:05:00")                           # not imported
+    add_match("2099-06-01T21:00:00", external_id=8007)
+
+    with connection() as conn:
+        ids = {row["id"] for row in live_scores.in_window_matches(conn, NOW)}
+        opens = live_scores.next_window_opens(conn, NOW)
+    assert ids == {edge_space, edge_t, started_space, live_long_ago}
+    assert opens == datetime(2099, 6, 1, 20, 20)
+
+
+def _replay(name):
+    with open(os.path.join(PAYLOADS, name), encoding="utf-8") as f:
+        recorded = {match["id"]: match for match in json.load(f)["matches"]}
+
+    def respond(path, params, headers):
+        assert path == "matches"
+        ids = [int(i) for i in params["ids"].split(",")]
+        return 200, {}, {"matches": [recorded[i] for i in ids if i in recorded]}
+    return respond
+
+
+def test_poll_rescores_only_changed_matches(football_api, add_match, monkeypatch):
+    unchanged = add_match("2099-06-01 20:05:00", external_id=9001)
+    goal = add_match("2099-06-01T19:30:00", status="live", external_id=9002, home_score=0, away_score=0)
+    full_time = add_match("2099-06-01 17:00:00", status="live", external_id=9003, home_score=1, away_score=1)
+    with connection() as conn:
+        player_id = conn.execute("SELECT id FROM players ORDER BY id LIMIT 1").fetchone()[0]
+        conn.execute("""
+            INSERT INTO predictions (player_id, match_id, predicted_home_score, predicted_away_score)
+            VALUES (?, ?, 2, 1)
+        """, (player_id, full_time))
+        conn.commit()
+
+    rescored = []
+    real_score_matches = live_scores.score_matches
+
+    def score_matches(conn, match_ids):
+        rescored.append(sorted(match_ids))
+        return real_score_matches(conn, match_ids)
+
+    monkeypatch.setattr(live_scores, "score_matches", score_matches)
+    football_api.respond = _replay("matches_live.json")
+    client = FootballDataClient(token=API_TOKEN, base_url=football_api.url, cache_dir=None)
+
+    summary = live_scores.poll_once(client, NOW)
+    assert summary == {"polled": 3, "updated": 2, "rescored": 1}
+    assert rescored == [sorted([goal, full_time])]
+
+    with connection() as conn:
+        rows = {row["id"]: tuple(row[1:]) for row in conn.execute(
+            "SELECT id, status, home_score, away_score FROM matches WHERE id IN (?, ?, ?)",
+            (unchanged, goal, full_time),
+        )}
+        score = conn.execute("SELECT score FROM predictions WHERE match_id = ?", (full_time,)).fetchone()[0]
+    assert rows == {
+        unchanged: ("upcoming", None, None),
+        goal: ("live", 1, 0),
+        full_time: ("finished", 2, 1),
+    }
+    assert score == 3
+
+    # Replaying the same payloads changes nothing; the finished match has left the window
+    football_api.requests.clear()
+    assert live_scores.poll_once(client, NOW) == {"polled": 2, "updated": 0, "rescored": 0}
+    assert rescored == [sorted([goal, full_time])]
+    assert sorted(football_api.requests[0][1]["ids"].split(",")) == ["9001", "9002"]
+
+
+@pytest.mark.parametrize("error", [sqlite3.OperationalError("database is locked"), KeyError("score")])
+def test_worker_backs_off_on_database_and_payload_errors(error, monkeypatch):
+    stop = threading.Event()
+    delays = []
+
+    def poll_once(client):
+        raise error
+
+    def wait(delay):
+        delays.append(delay)
+        if len(delays) == 2:
+            stop.set()
+
+    monkeypatch.setattr(live_scores, "poll_once", poll_once)
+    monkeypatch.setattr(stop, "wait", wait)
+    live_scores.run_forever(stop)
+    assert delays == [live_scores.LIVE_POLL_SECONDS * 2, live_scores.LIVE_POLL_SECONDS * 4]
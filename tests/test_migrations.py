@@ -0,0 +1,44 @@
+import sqlite3
+
+import pytest
+
+from db import connection
+from migrations import applied_versions, run_migrations
+from standings import rebuild_player_standings
+
+
+@pytest.fixture
+def conn(tmp_path):
+    path = str(tmp_path / "copy.db")
+    target = sqlite3.connect(path)
+    with connection() as live:
+        live.backup(target)
+    yield target
+    target.close()
+
+
+def _fail(conn):
+    raise ValueError("step failed")
+
+
+def test_failed_migration_is_rolled_back_whole(conn):
+    conn.execute("UPDATE player_standings SET total_points = -1")
+    conn.commit()
+    steps = ["CREATE TABLE migration_probe (id INTEGER)", rebuild_player_standings, _fail]
+
+    with pytest.raises(ValueError):
+        run_migrations(conn, [(99, "half applied", steps)])
+
+    assert 99 not in applied_versions(conn)
+    assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'migration_probe'").fetchone()
+    assert {row[0] for row in conn.execute("SELECT total_points FROM player_standings")} == {-1}
+
+
+def test_migration_commits_steps_with_its_version(conn):
+    conn.execute("UPDATE player_standings SET total_points = -1")
+    conn.commit()
+
+    assert run_migrations(conn, [(99, "rebuild", [rebuild_player_standings])]) == [99]
+
+    assert 99 in applied_versions(conn)
+    assert not conn.execute("SELECT 1 FROM player_standings WHERE total_points = -1").fetchone()
@@ -0,0 +1,47 @@
+from db import connection
+from query_cache import QueryCache, get_cache
+
+
+def _token(*tables):
+    return get_cache().generations(tables)
+
+
+def test_pooled_writes_bump_only_their_tables():
+    before = {t: _token(t) for t in ("teams", "players", "email_outbox")}
+    with connection() as conn:
+        # Writes that bypass utils.execute_query: conn.execute, cursor().executemany
+        conn.execute("UPDATE teams SET name = name WHERE id = (SELECT MIN(id) FROM teams)")
+        conn.cursor().executemany(
+            "UPDATE email_outbox SET attempts = attempts WHERE id = ?", [(0,), (-1,)]
+        )
+        conn.commit()
+    assert _token("teams") != before["teams"]
+    assert _token("email_outbox") != before["email_outbox"]
+    assert _token("players") == before["players"]
+
+
+def test_reads_do_not_invalidate():
+    before = _token("players")
+    with connection() as conn:
+        conn.execute("SELECT COUNT(*) FROM players").fetchone()
+        conn.commit()
+    assert _token("players") == before
+
+
+def test_schema_change_bumps_everything():
+    before = _token("players")
+    with connection() as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS cache_test_scratch (id INTEGER PRIMARY KEY)")
+        conn.execute("DROP TABLE cache_test_scratch")
+        conn.commit()
+    assert _token("players") != before
+
+
+def test_query_stats_are_capped():
+    cache = QueryCache(max_stats=3)
+    for i in range(5):
+        cache.get_or_load(f"SELECT {i} FROM players", (), lambda: [])
+    cache.get_or_load("SELECT 2 FROM players", (), lambda: [])
+    queries = {row["query"]: row for row in cache.stats()["queries"]}
+    assert set(queries) == {"SELECT 2 FROM players", "SELECT 3 FROM players", "SELECT 4 FROM players"}
+    assert queries["SELECT 2 FROM players"]["hits"] == 1
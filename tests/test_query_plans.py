@@ -0,0 +1,18 @@
+import pytest
+
+from db import connection
+from migrations import find_full_scans, hot_queries
+
+
+@pytest.mark.parametrize("name", sorted(hot_queries()))
+def test_hot_query_uses_indexes(name):
+    with connection() as conn:
+        assert find_full_scans(conn, {name: hot_queries()[name]}) == []
+
+
+def test_full_scan_is_reported():
+    query = ("SELECT id FROM predictions WHERE score > ?", (0,), set())
+    with connection() as conn:
+        offenders = find_full_scans(conn, {"by_score": query})
+    assert [name for name, _ in offenders] == ["by_score"]
+    assert offenders[0][1].startswith("SCAN predictions")
@@ -0,0 +1,31 @@
+# tests/test_reminder_scheduler.py
+from datetime import timedelta
+
+import reminder_scheduler
+from db import connection
+from round_calendar import get_round_calendar
+
+
+def _ledger(round_id):
+    with connection() as conn:
+        return {row["level"]: row["status"] for row in conn.execute(
+            "SELECT level, status FROM reminder_ledger WHERE round_id = ?", (round_id,)
+        )}
+
+
+def test_reminder_is_only_recorded_once_queued(monkeypatch):
+    round_info = next(r for r in reversed(get_round_calendar().rounds) if r["deadline_utc"])
+    now = round_info["deadline_utc"] - timedelta(hours=2) + timedelta(minutes=1)
+    mine = lambda outcomes: [o for o in outcomes if o[0] == round_info["name"]]
+
+    # Queueing fails (e.g. database locked): nothing is recorded
+    monkeypatch.setattr(reminder_scheduler, "send_reminder_email_to_all", lambda *a, **k: None)
+    assert (round_info["name"], "2hours", "failed") in mine(reminder_scheduler.run_due_reminders(now))
+    assert "2hours" not in _ledger(round_info["id"])
+
+    # The next pass queues it and only then records it as sent
+    monkeypatch.setattr(reminder_scheduler, "send_reminder_email_to_all", lambda *a, **k: "batch")
+    outcomes = mine(reminder_scheduler.run_due_reminders(now + timedelta(minutes=1)))
+    assert (round_info["name"], "2hours", "sent") in outcomes
+    assert _ledger(round_info["id"])["2hours"] == "sent"
+    assert not mine(reminder_scheduler.run_due_reminders(now + timedelta(minutes=2)))
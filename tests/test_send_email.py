@@ -0,0 +1,45 @@
+import pytest
+
+from db import connection
+from send_email import get_reminder_audience
+
+
+@pytest.fixture
+def round_with_fixtures(add_match):
+    """A new round whose upcoming matches were inserted out of kickoff order, in both datetime forms."""
+    kickoffs = ["2099-07-03 18:00:00", "2099-07-01T21:00:00", "2099-07-02 15:30:00", "2099-07-01 20:00:00"]
+    with connection() as conn:
+        round_id = conn.execute(
+            "INSERT INTO rounds (name, start_date, end_date) VALUES ('Order test', '2099-07-01', '2099-07-07')"
+        ).lastrowid
+        conn.commit()
+    match_ids = [add_match(kickoff, round_id=round_id) for kickoff in kickoffs]
+    with connection() as conn:
+        player_id = conn.execute("SELECT id FROM players ORDER BY id LIMIT 1").fetchone()[0]
+        conn.execute("""
+            INSERT INTO predictions (player_id, match_id, predicted_home_score, predicted_away_score)
+            VALUES (?, ?, 1, 0)
+        """, (player_id, match_ids[2]))
+        conn.commit()
+    yield round_id, player_id
+    with connection() as conn:
+        conn.execute("DELETE FROM rounds WHERE id = ?", (round_id,))
+        conn.commit()
+
+
+def test_missing_fixtures_are_listed_in_kickoff_order(round_with_fixtures):
+    round_id, player_id = round_with_fixtures
+    with connection() as conn:
+        username = conn.execute("SELECT username FROM players WHERE id = ?", (player_id,)).fetchone()[0]
+        player_count = conn.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+
+    audience = {row["username"]: row for row in get_reminder_audience(round_id)}
+    assert len(audience) == player_count
+
+    me = audience[username]
+    assert (me["match_count"], me["predicted"], me["missing"]) == (4, 1, 3)
+    times = [line.rsplit("(", 1)[1].rstrip(")") for line in me["missing_fixtures"].split("\n")]
+    assert times == ["2099-07-01 20:00", "2099-07-01 21:00", "2099-07-03 18:00"]
+
+    everyone_else = [row for name, row in audience.items() if name != username]
+    assert all(row["missing"] == 4 for row in everyone_else)
@@ -0,0 +1,222 @@
+# thumbnails.py
+"""
+Avatar thumbnails.
+
+Each source image is resized once per size (square, centre-cropped) and
+written to THUMBNAIL_DIR as WebP (PNG if this Pillow build can't encode
+WebP), named by the source's content hash plus the size, so an unchanged
+avatar is never re-encoded, even across restarts. The ready-to-inline
+data URIs are kept in a bounded LRU keyed by (path, size): after the
+first render a page of avatars costs no file I/O or image decoding.
+
+save_avatar_image() calls invalidate_thumbnails(path) when a file is
+replaced; stale thumbnail files are harmless and simply stop being used.
+
+get_avatar_gallery() indexes a whole avatar folder: one sprite sheet with
+a coordinate map, rebuilt only when the folder listing (names, sizes,
+mtimes) changes. The folder is polled at most every GALLERY_POLL_SECONDS.
+"""
+import base64
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from PIL import Image, ImageOps
+
+THUMBNAIL_DIR = os.getenv("THUMBNAIL_DIR", os.path.join("assets", "thumbnails"))
+THUMBNAIL_CACHE_SIZE = int(os.getenv("THUMBNAIL_CACHE_SIZE", "1024"))
+THUMBNAIL_SIZES = (45, 50, 160)
+GALLERY_POLL_SECONDS = float(os.getenv("GALLERY_POLL_SECONDS", "5"))
+GALLERY_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+_lock = threading.Lock()
+_data_uris = OrderedDict()  # (normalized path, size) -> data URI ("" if unreadable)
+_stats = {"hits": 0, "misses": 0, "encoded": 0}
+_webp = None
+
+
+def _normalize(path):
+    return os.path.normcase(os.path.normpath(path))
+
+
+def webp_supported():
+    global _webp
+    if _webp is None:
+        try:
+            Image.new("RGB", (1, 1)).save(io.BytesIO(), format="WEBP")
+            _webp = True
+        except Exception:
+            _webp = False
+    return _webp
+
+
+def _square(image, size):
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("RGBA")
+    return ImageOps.fit(image, (size, size), Image.LANCZOS)
+
+
+def encode_image(image):
+    """Encode a PIL image as WebP (PNG fallback); returns (bytes, extension)."""
+    out = io.BytesIO()
+    if webp_supported():
+        image.save(out, format="WEBP", quality=85, method=4)
+        return out.getvalue(), "webp"
+    image.save(out, format="PNG", optimize=True)
+    return out.getvalue(), "png"
+
+
+def _encode(source_bytes, size):
+    return encode_image(_square(Image.open(io.BytesIO(source_bytes)), size))
+
+
+def _load_thumbnail(path, size):
+    with open(path, "rb") as f:
+        source = f.read()
+    digest = hashlib.sha256(source).hexdigest()[:20]
+
+    for ext in ("webp", "png"):
+        cached_file = os.path.join(THUMBNAIL_DIR, f"{digest}_{size}.{ext}")
+        if os.path.exists(cached_file):
+            with open(cached_file, "rb") as f:
+                return f.read(), ext
+
+    data, ext = _encode(source, size)
+    try:
+        os.makedirs(THUMBNAIL_DIR, exist_ok=True)
+        tmp = os.path.join(THUMBNAIL_DIR, f".{digest}_{size}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, os.path.join(THUMBNAIL_DIR, f"{digest}_{size}.{ext}"))
+    except OSError as e:
+        print(f"[thumbnails] could not store thumbnail for {path}: {e}")
+    with _lock:
+        _stats["encoded"] += 1
+    return data, ext
+
+
+def thumbnail_data_uri(path, size=45):
+    """Data URI of a `size`x`size` thumbnail of `path`, or None if it can't be read."""
+    if not path:
+        return None
+    key = (_normalize(path), int(size))
+    with _lock:
+        uri = _data_uris.get(key)
+        if uri is not None:
+            _data_uris.move_to_end(key)
+            _stats["hits"] += 1
+            return uri or None
+        _stats["misses"] += 1
+
+    try:
+        data, ext = _load_thumbnail(path, int(size))
+        uri = f"data:image/{ext};base64,{base64.b64encode(data).decode()}"
+    except (OSError, Image.DecompressionBombError, ValueError) as e:
+        print(f"[thumbnails] cannot thumbnail {path}: {e}")
+        uri = ""  # remembered too, so a missing file isn't retried every render
+
+    with _lock:
+        _data_uris[key] = uri
+        _data_uris.move_to_end(key)
+        while len(_data_uris) > THUMBNAIL_CACHE_SIZE:
+            _data_uris.popitem(last=False)
+    return uri or None
+
+
+def warm_thumbnails(path, sizes=THUMBNAIL_SIZES):
+    """Generate every standard size for `path` up front, e.g. right after an upload."""
+    return {size: thumbnail_data_uri(path, size) is not None for size in sizes}
+
+
+def invalidate_thumbnails(path=None):
+    """Forget cached data URIs for `path` (every path when None)."""
+    with _lock:
+        if path is None:
+            _data_uris.clear()
+            return
+        target = _normalize(path)
+        for key in [k for k in _data_uris if k[0] == target]:
+            del _data_uris[key]
+
+
+def thumbnail_stats():
+    with _lock:
+        return {**_stats, "entries": len(_data_uris), "max_entries": THUMBNAIL_CACHE_SIZE}
+
+
+# ===== Avatar gallery =====
+
+class AvatarGallery:
+    """Sprite sheet of every avatar in a folder plus {name: (x, y)} offsets."""
+
+    def __init__(self, folder, size, files):
+        self.folder = folder
+        self.size = size
+        self.positions = {}
+        self.sprite_uri = None
+
+        tiles = []
+        for name, path in files:
+            try:
+                with Image.open(path) as image:
+                    tiles.append((name, _square(image, size)))
+            except (OSError, Image.DecompressionBombError, ValueError) as e:
+                print(f"[thumbnails] skipping gallery image {path}: {e}")
+        self.names = [name for name, _ in tiles]
+        if not tiles:
+            return
+
+        columns = min(len(tiles), 8)
+        rows = (len(tiles) + columns - 1) // columns
+        sheet = Image.new("RGBA", (columns * size, rows * size), (0, 0, 0, 0))
+        for i, (name, tile) in enumerate(tiles):
+            x, y = (i % columns) * size, (i // columns) * size
+            sheet.paste(tile, (x, y))
+            self.positions[name] = (x, y)
+        data, ext = encode_image(sheet)
+        self.sprite_uri = f"data:image/{ext};base64,{base64.b64encode(data).decode()}"
+
+    def __contains__(self, name):
+        return name in self.positions
+
+
+_galleries = {}  # (folder, size) -> (signature, checked_at, AvatarGallery)
+
+
+def _gallery_listing(folder):
+    files, signature = [], []
+    try:
+        entries = sorted(os.scandir(folder), key=lambda e: e.name)
+    except OSError:
+        return files, ()
+    for entry in entries:
+        if entry.is_file() and entry.name.lower().endswith(GALLERY_EXTENSIONS):
+            stat = entry.stat()
+            files.append((entry.name, entry.path))
+            signature.append((entry.name, stat.st_size, stat.st_mtime_ns))
+    return files, tuple(signature)
+
+
+def get_avatar_gallery(folder, size=100):
+    """The folder's AvatarGallery, rebuilt only when its listing changes."""
+    key = (os.path.normpath(folder), int(size))
+    now = time.monotonic()
+    with _lock:
+        cached = _galleries.get(key)
+        if cached and now - cached[1] < GALLERY_POLL_SECONDS:
+            return cached[2]
+
+    files, signature = _gallery_listing(folder)
+    with _lock:
+        cached = _galleries.get(key)
+        if cached and cached[0] == signature:
+            _galleries[key] = (signature, now, cached[2])
+            return cached[2]
+
+    gallery = AvatarGallery(folder, int(size), files)
+    with _lock:
+        _galleries[key] = (signature, now, gallery)
+    return gallery
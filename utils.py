@@ -2,7 +2,8 @@
 import hashlib
 import bcrypt
 import streamlit as st
-from db import get_connection
+from db import connection
+from query_cache import cached
 from datetime import datetime, timedelta
 
 def hash_password(password: str) -> bytes:
@@ -15,20 +16,26 @@ def verify_password(password, hashed):
 
 
 def execute_query(query: str, params: tuple = ()):
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(query, params)
+        conn.commit()
+        return cur
 
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(query, params)
-    conn.commit()
-    return cur
+def _fetch_one(query, params):
+    with connection() as conn:
+        return conn.execute(query, params).fetchone()
+
+def _fetch_all(query, params):
+    with connection() as conn:
+        return conn.execute(query, params).fetchall()
 
 def fetch_one(query: str, params: tuple = ()):
-    cur = execute_query(query, params)
-    return cur.fetchone()
+    return cached(query, params, lambda: _fetch_one(query, params))
 
 def fetch_all(query: str, params: tuple = ()):
-    cur = execute_query(query, params)
-    return cur.fetchall()
+    # Callers get their own list; the cached rows themselves are immutable.
+    return list(cached(query, params, lambda: _fetch_all(query, params)))
 
 def get_team_id_by_name(teams, team_name):
     return next((team['id'] for team in teams if team['name'] == team_name), None)
@@ -252,13 +259,12 @@ def save_all_matches():
 
 def insert_two_legged_tie(first_leg_id, second_leg_id):
     try:
-        connection = get_connection()  # Get the connection
-        cursor = connection.cursor()   # Get the cursor from the connection
-        cursor.execute("""
-            INSERT INTO two_legged_ties (first_leg_match_id, second_leg_match_id)
-            VALUES (?, ?)
-        """, (first_leg_id, second_leg_id))
-        connection.commit()  # Commit using the same connection
+        with connection() as conn:
+            conn.execute("""
+                INSERT INTO two_legged_ties (first_leg_match_id, second_leg_match_id)
+                VALUES (?, ?)
+            """, (first_leg_id, second_leg_id))
+            conn.commit()
     except Exception as e:
         st.error(f"❌ Error saving two-legged tie: {e}")
 